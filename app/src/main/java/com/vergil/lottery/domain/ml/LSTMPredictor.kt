@@ -16,60 +16,70 @@ class LSTMPredictor(
 
     private var redInterpreter: Interpreter? = null
     private var blueInterpreter: Interpreter? = null
+    private var multiHeadInterpreter: Interpreter? = null
 
 
     private val config: LotteryConfig = when (lotteryType) {
         LotteryType.SSQ -> LotteryConfig(
             redModelFile = "lottery_lstm_red_ssq.tflite",
             blueModelFile = "lottery_lstm_blue_ssq.tflite",
+            multiHeadModelFile = "lottery_lstm_multi_ssq.tflite",
             numRedBalls = 33,
             numBlueBalls = 16
         )
         LotteryType.CJDLT -> LotteryConfig(
             redModelFile = "lottery_lstm_red_dlt.tflite",
             blueModelFile = "lottery_lstm_blue_dlt.tflite",
+            multiHeadModelFile = "lottery_lstm_multi_dlt.tflite",
             numRedBalls = 35,
             numBlueBalls = 12
         )
         LotteryType.QLC -> LotteryConfig(
             redModelFile = "lottery_lstm_red_qlc.tflite",
             blueModelFile = "lottery_lstm_blue_qlc.tflite",
+            multiHeadModelFile = "lottery_lstm_multi_qlc.tflite",
             numRedBalls = 30,
             numBlueBalls = 30  
         )
         LotteryType.FC3D -> LotteryConfig(
             redModelFile = "lottery_lstm_red_fc3d.tflite",
             blueModelFile = "lottery_lstm_blue_fc3d.tflite",
+            multiHeadModelFile = "lottery_lstm_multi_fc3d.tflite",
             numRedBalls = 10,
             numBlueBalls = 10  
         )
         LotteryType.QXC -> LotteryConfig(
             redModelFile = "lottery_lstm_red_qxc.tflite",
             blueModelFile = "lottery_lstm_blue_qxc.tflite",
+            multiHeadModelFile = "lottery_lstm_multi_qxc.tflite",
             numRedBalls = 10,
             numBlueBalls = 15  
         )
         LotteryType.PL3 -> LotteryConfig(
             redModelFile = "lottery_lstm_red_pl3.tflite",
             blueModelFile = "lottery_lstm_blue_pl3.tflite",
+            multiHeadModelFile = "lottery_lstm_multi_pl3.tflite",
             numRedBalls = 10,
             numBlueBalls = 10  
         )
         LotteryType.PL5 -> LotteryConfig(
             redModelFile = "lottery_lstm_red_pl5.tflite",
             blueModelFile = "lottery_lstm_blue_pl5.tflite",
+            multiHeadModelFile = "lottery_lstm_multi_pl5.tflite",
             numRedBalls = 10,
             numBlueBalls = 10  
         )
         LotteryType.KL8 -> LotteryConfig(
             redModelFile = "lottery_lstm_red_kl8.tflite",
             blueModelFile = "lottery_lstm_blue_kl8.tflite",
+            multiHeadModelFile = "lottery_lstm_multi_kl8.tflite",
             numRedBalls = 80,
             numBlueBalls = 1  
         )
         else -> LotteryConfig(
             redModelFile = "lottery_lstm_red_ssq.tflite",
             blueModelFile = "lottery_lstm_blue_ssq.tflite",
+            multiHeadModelFile = "lottery_lstm_multi_ssq.tflite",
             numRedBalls = 33,
             numBlueBalls = 16
         )
@@ -78,18 +88,27 @@ class LSTMPredictor(
     companion object {
         private const val SEQUENCE_LENGTH = 8  
         private const val NUM_THREADS = 4      
+
+        private const val MULTI_HEAD_INPUT = "draw_input"
+        private const val MULTI_HEAD_RED_OUTPUT = "red_output"
+        private const val MULTI_HEAD_BLUE_OUTPUT = "blue_output"
     }
 
 
     private data class LotteryConfig(
         val redModelFile: String,
         val blueModelFile: String,
+        val multiHeadModelFile: String,
         val numRedBalls: Int,
         val numBlueBalls: Int
     )
 
 
     fun initialize(): Boolean {
+        if (initializeMultiHead()) {
+            return true
+        }
+
         return try {
 
             val redModelBuffer = loadModelFile(config.redModelFile)
@@ -128,13 +147,39 @@ class LSTMPredictor(
     }
 
 
+    private fun initializeMultiHead(): Boolean {
+        val modelBuffer = try {
+            loadModelFile(config.multiHeadModelFile)
+        } catch (e: Exception) {
+            return false
+        }
+
+        return try {
+            multiHeadInterpreter = Interpreter(
+                modelBuffer,
+                Interpreter.Options().apply {
+                    setNumThreads(NUM_THREADS)
+                }
+            )
+
+            Timber.d("✅ TensorFlow Lite 多头 LSTM 模型加载成功 (彩种: ${lotteryType.code})")
+            Timber.d("   模型: ${config.multiHeadModelFile} (${config.numRedBalls}+${config.numBlueBalls}球)")
+            true
+        } catch (e: Exception) {
+            Timber.w(e, "⚠️ 多头模型加载失败，回退到红蓝球独立模型 (彩种: ${lotteryType.code})")
+            multiHeadInterpreter = null
+            false
+        }
+    }
+
+
     private fun loadModelFile(filename: String): ByteBuffer {
         return FileUtil.loadMappedFile(context, filename)
     }
 
 
     fun predict(recentHistory: List<DrawHistory>): Pair<Map<String, Float>, Map<String, Float>>? {
-        if (redInterpreter == null || blueInterpreter == null) {
+        if (multiHeadInterpreter == null && (redInterpreter == null || blueInterpreter == null)) {
             Timber.w("⚠️ 模型未初始化，无法预测")
             return null
         }
@@ -146,15 +191,26 @@ class LSTMPredictor(
 
         try {
 
-            val redInput = prepareRedInput(recentHistory)
-            val blueInput = prepareBlueInput(recentHistory)
-
-
             val redOutput = Array(1) { FloatArray(config.numRedBalls) }
             val blueOutput = Array(1) { FloatArray(config.numBlueBalls) }
 
-            redInterpreter!!.run(redInput, redOutput)
-            blueInterpreter!!.run(blueInput, blueOutput)
+            val multiHead = multiHeadInterpreter
+            if (multiHead != null) {
+                // 单次调用同时得到红球和蓝球输出
+                multiHead.runSignature(
+                    mapOf(MULTI_HEAD_INPUT to prepareCombinedInput(recentHistory)),
+                    mapOf(
+                        MULTI_HEAD_RED_OUTPUT to redOutput,
+                        MULTI_HEAD_BLUE_OUTPUT to blueOutput
+                    )
+                )
+            } else {
+                val redInput = prepareRedInput(recentHistory)
+                val blueInput = prepareBlueInput(recentHistory)
+
+                redInterpreter!!.run(redInput, redOutput)
+                blueInterpreter!!.run(blueInput, blueOutput)
+            }
 
 
             val redProbabilities = mutableMapOf<String, Float>()
@@ -226,11 +282,43 @@ class LSTMPredictor(
     }
 
 
+    private fun prepareCombinedInput(history: List<DrawHistory>): Array<Array<FloatArray>> {
+        val input = Array(1) {
+            Array(SEQUENCE_LENGTH) { FloatArray(config.numRedBalls + config.numBlueBalls) }
+        }
+
+
+        val recentDraws = history.take(SEQUENCE_LENGTH)
+
+        for (i in 0 until SEQUENCE_LENGTH) {
+            val draw = recentDraws[i]
+
+            for (num in draw.redNumbers) {
+                val index = num.toInt() - 1
+                if (index in 0 until config.numRedBalls) {
+                    input[0][i][index] = 1.0f
+                }
+            }
+
+            for (num in draw.blueNumbers) {
+                val index = num.toInt() - 1
+                if (index in 0 until config.numBlueBalls) {
+                    input[0][i][config.numRedBalls + index] = 1.0f
+                }
+            }
+        }
+
+        return input
+    }
+
+
     fun close() {
         redInterpreter?.close()
         blueInterpreter?.close()
+        multiHeadInterpreter?.close()
         redInterpreter = null
         blueInterpreter = null
+        multiHeadInterpreter = null
         Timber.d("TensorFlow Lite 模型已关闭")
     }
 
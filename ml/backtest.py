@@ -0,0 +1,367 @@
+"""
+滚动回测脚本
+
+按时间顺序回放训练之后的开奖（样本外），在每个截止点用之前的 sequence_length 期作为输入，
+统计模型 top-k 选号在下一期的命中数分布。所有截止点的窗口一次性构造，
+分成少量大批次推理，而不是每期调用一次模型
+
+序列长度、窗口内的时间顺序和训练截止期号取模型目录中的 training_meta.json，
+只回测期号晚于训练截止期号（或 --start_issue）的开奖；存在多头模型时优先使用多头模型
+
+依赖:
+    pip install tensorflow numpy
+
+使用方法:
+    python backtest.py --lottery_type ssq --history_file history_ssq.json --model_dir models/v1
+    python backtest.py --lottery_type all --history_file data/history_{lottery_type}.json \\
+        --model_dir models/batch/{lottery_type} --model_format tflite --last 2000
+    python backtest.py --lottery_type ssq --history_file history_ssq.json --model_dir models/v1 --start_issue 2024001
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from draw_store import issue_sort_key
+from history_dataset import encode_draws, load_history_file, sliding_windows, sort_chronologically
+from tflite_utils import top_k_indices
+from train_lstm_model import LOTTERY_CONFIG, MULTI_HEAD_INPUT, MULTI_HEAD_OUTPUTS, load_training_meta, tflite_file_name
+
+COLORS = ('red', 'blue')
+
+
+def find_backtest_models(model_dir: Path, model_format: str, time_order: str = 'newest_first') -> Dict[str, Path]:
+    """
+    查找模型文件，优先多头模型
+
+    TFLite 文件名与导出时一致，oldest_first 的模型带 _oldest_first 后缀（见 tflite_file_name）
+
+    Returns:
+        {'multi': path} 或 {'red': path, 'blue': path}（只含存在的颜色）
+    """
+    if model_format == 'keras':
+        name = lambda key: f"lottery_lstm_{key}.h5"
+    else:
+        name = lambda key: tflite_file_name(key, time_order)
+    multi = model_dir / name('multi')
+    if multi.exists():
+        return {'multi': multi}
+    paths = {color: model_dir / name(color) for color in COLORS}
+    return {color: path for color, path in paths.items() if path.exists()}
+
+
+def build_backtest_windows(
+    chronological: List[dict],
+    num_classes: Dict[str, int],
+    model_keys: List[str],
+    sequence_length: int,
+    start_issue: str,
+    time_order: str = 'newest_first',
+    last: Optional[int] = None
+):
+    """
+    构造目标期号晚于 start_issue 的截止点的输入窗口和目标
+
+    Args:
+        chronological: 最早一期在前的历史数据（需要期号）
+        num_classes: 各颜色的号码数
+        model_keys: red / blue / multi，多头模型的输入为红球在前、蓝球在后的拼接
+        time_order: 窗口内的时间顺序（newest_first 与 LSTMPredictor 的输入一致）
+        last: 只保留最近的若干个截止点
+
+    Returns:
+        inputs: {模型键: (n, sequence_length, input_dim)}
+        targets: {颜色: (n, num_classes)}
+        issues: 各截止点的目标期号
+    """
+    issues = [item.get('issue') for item in chronological[sequence_length:]]
+    if not all(issues):
+        raise ValueError("历史数据缺少期号，无法区分训练样本和回测样本")
+    start_key = issue_sort_key(str(start_issue))
+    rows = np.flatnonzero([issue_sort_key(str(issue)) > start_key for issue in issues])
+    if last is not None:
+        rows = rows[-last:]
+
+    matrices = {color: encode_draws(chronological, color, n) for color, n in num_classes.items()}
+    if 'multi' in model_keys:
+        matrices['multi'] = np.concatenate([matrices['red'], matrices['blue']], axis=1)
+
+    inputs = {}
+    targets = {}
+    for key, matrix in matrices.items():
+        X, y = sliding_windows(matrix, sequence_length)
+        if key in model_keys:
+            X = X[rows]
+            inputs[key] = X[:, ::-1] if time_order == 'newest_first' else X
+        if key in COLORS:
+            targets[key] = y[rows]
+    return inputs, targets, [str(issues[i]) for i in rows]
+
+
+class ModelRunner:
+    """统一 Keras (.h5) 和 TFLite、分开模型和多头模型的批量推理接口"""
+
+    def __init__(self, model_path: str, key: str, chunk_size: int = 1024):
+        """
+        Args:
+            key: red / blue（分开模型）或 multi（多头模型）
+        """
+        self.model_path = model_path
+        self.key = key
+        self.chunk_size = chunk_size
+        if model_path.endswith('.tflite'):
+            from tflite_utils import load_interpreter
+            self.interpreter = load_interpreter(model_path=model_path)
+            self.model = None
+        else:
+            import tensorflow as tf
+            self.model = tf.keras.models.load_model(model_path, compile=False)
+            self.interpreter = None
+
+    def _run_multi_head(self, X: np.ndarray) -> Dict[str, np.ndarray]:
+        runner = self.interpreter.get_signature_runner()
+        outputs = {name: [] for name in MULTI_HEAD_OUTPUTS.values()}
+        for start in range(0, len(X), self.chunk_size):
+            chunk = X[start:start + self.chunk_size]
+            try:
+                results = [runner(**{MULTI_HEAD_INPUT: chunk})]
+            except (ValueError, RuntimeError):
+                # 批次维固定的模型逐条推理
+                results = [runner(**{MULTI_HEAD_INPUT: row[np.newaxis]}) for row in chunk]
+            for result in results:
+                for name in outputs:
+                    outputs[name].append(np.asarray(result[name], dtype=np.float32))
+        return {color: np.concatenate(outputs[name]) for color, name in MULTI_HEAD_OUTPUTS.items()}
+
+    def predict(self, X: np.ndarray) -> Dict[str, np.ndarray]:
+        """返回各颜色的概率 {颜色: (n, num_classes)}"""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if self.interpreter is not None:
+            if self.key == 'multi':
+                return self._run_multi_head(X)
+            from tflite_utils import run_batch
+            return {self.key: run_batch(self.interpreter, X, chunk_size=self.chunk_size)}
+
+        outputs = self.model.predict(X, batch_size=self.chunk_size, verbose=0)
+        if self.key == 'multi':
+            if not isinstance(outputs, dict):
+                outputs = dict(zip(self.model.output_names, outputs))
+            return {color: np.asarray(outputs[name]) for color, name in MULTI_HEAD_OUTPUTS.items()}
+        return {self.key: np.asarray(outputs)}
+
+
+def score_hits(probabilities: np.ndarray, targets: np.ndarray, k: int) -> np.ndarray:
+    """每个截止点 top-k 选号的命中数"""
+    top = top_k_indices(probabilities, k)
+    return np.take_along_axis(targets, top, axis=1).sum(axis=1).astype(np.int64)
+
+
+def summarize_hits(
+    probabilities: np.ndarray,
+    targets: np.ndarray,
+    issues: List[str],
+    top_k: Optional[int] = None
+) -> Optional[Dict]:
+    """
+    统计单个颜色的命中数分布
+
+    Args:
+        top_k: 每期选出的号码数，默认等于每期开奖号码数
+    """
+    targets = np.asarray(targets)
+    if len(targets) == 0:
+        return None
+    draw_size = int(np.median(targets.sum(axis=1)))
+    if draw_size == 0:
+        return None
+    k = top_k or draw_size
+    num_classes = targets.shape[1]
+
+    hits = score_hits(probabilities, targets, k)
+    distribution = np.bincount(hits, minlength=min(k, draw_size) + 1)
+    return {
+        'top_k': k,
+        'draw_size': draw_size,
+        'num_draws': int(len(targets)),
+        'first_issue': issues[0],
+        'last_issue': issues[-1],
+        'mean_hits': float(hits.mean()),
+        # 随机选 k 个号码的期望命中数
+        'random_expected_hits': k * draw_size / num_classes,
+        'distribution': {str(h): int(c) for h, c in enumerate(distribution)}
+    }
+
+
+def backtest_models(
+    history_data,
+    model_files: Dict[str, Path],
+    num_classes: Dict[str, int],
+    start_issue: str,
+    colors: List[str] = COLORS,
+    sequence_length: int = 8,
+    time_order: str = 'newest_first',
+    top_k: Optional[int] = None,
+    last: Optional[int] = None,
+    chunk_size: int = 1024
+) -> Dict[str, Dict]:
+    """
+    对一个彩种的模型执行滚动回测，只评估期号晚于 start_issue 的开奖
+
+    Returns:
+        {颜色: 结果}，没有可回测的数据时为空字典
+    """
+    chronological = sort_chronologically(history_data)
+    keys = list(model_files) if 'multi' in model_files else [color for color in colors if color in model_files]
+    inputs, targets, issues = build_backtest_windows(
+        chronological, num_classes, keys, sequence_length, start_issue, time_order, last
+    )
+    if not issues:
+        return {}
+
+    results = {}
+    for key in keys:
+        runner = ModelRunner(str(model_files[key]), key, chunk_size)
+        start = time.perf_counter()
+        probabilities = runner.predict(inputs[key])
+        inference_seconds = time.perf_counter() - start
+
+        for color, values in probabilities.items():
+            if color not in colors:
+                continue
+            result = summarize_hits(values, targets[color], issues, top_k)
+            if result is None:
+                continue
+            result.update({
+                'model': str(model_files[key]),
+                'field': color,
+                'start_issue': str(start_issue),
+                'sequence_length': sequence_length,
+                'time_order': time_order,
+                # 多头模型一次推理同时输出红球和蓝球
+                'inference_seconds': inference_seconds,
+                'draws_per_sec': len(issues) / max(inference_seconds, 1e-9)
+            })
+            results[color] = result
+    return results
+
+
+def print_distribution(lottery_type: str, result: Dict):
+    print(f"\n📊 {lottery_type} / {result['field']} "
+          f"(期号 {result['first_issue']} ~ {result['last_issue']}, 共 {result['num_draws']} 期, top-{result['top_k']}, "
+          f"训练截止 {result['start_issue']})")
+    print(f"  平均命中: {result['mean_hits']:.3f} (随机期望 {result['random_expected_hits']:.3f})")
+    print(f"  推理耗时: {result['inference_seconds']:.2f}s ({result['draws_per_sec']:.0f} 期/秒)")
+    print(f"  {'命中数':<8}{'期数':>8}{'占比':>10}")
+    total = result['num_draws']
+    for hits, count in result['distribution'].items():
+        print(f"  {hits:<8}{count:>8}{count / total:>10.2%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='LSTM 模型滚动回测（样本外）')
+    parser.add_argument('--lottery_type', type=str, default='ssq',
+                        help='彩票类型，多个用逗号分隔，all 表示全部')
+    parser.add_argument('--history_file', type=str, required=True,
+                        help='历史数据文件（JSON 或 .lhb，支持 {lottery_type} 占位符）')
+    parser.add_argument('--model_dir', type=str, required=True,
+                        help='模型目录（支持 {lottery_type} 占位符）')
+    parser.add_argument('--model_format', type=str, default='keras', choices=['keras', 'tflite'],
+                        help='模型格式')
+    parser.add_argument('--colors', type=str, default='red,blue', help='回测的颜色')
+    parser.add_argument('--start_issue', type=str, default=None,
+                        help='只回测晚于该期号的开奖（默认取 training_meta.json 的 last_issue）')
+    parser.add_argument('--sequence_length', type=int, default=8,
+                        help='序列长度（模型目录没有 training_meta.json 时使用）')
+    parser.add_argument('--top_k', type=int, default=None, help='每期选号数量（默认等于开奖号码数）')
+    parser.add_argument('--last', type=int, default=None, help='只回测最近的若干期')
+    parser.add_argument('--chunk_size', type=int, default=1024, help='每次推理的批次大小')
+    parser.add_argument('--output', type=str, default=None, help='结果 JSON 路径')
+
+    args = parser.parse_args()
+
+    if args.lottery_type == 'all':
+        lottery_types = list(LOTTERY_CONFIG)
+    else:
+        lottery_types = [item.strip() for item in args.lottery_type.split(',') if item.strip()]
+    unknown = [item for item in lottery_types if item not in LOTTERY_CONFIG]
+    if unknown:
+        parser.error(f"未知彩票类型: {', '.join(unknown)}")
+    colors = [item.strip() for item in args.colors.split(',') if item.strip()]
+    if not colors or any(color not in COLORS for color in colors):
+        parser.error("--colors 只支持 red, blue")
+
+    print("="*60)
+    print("📈 LSTM 滚动回测")
+    print("="*60)
+
+    report = {}
+    for lottery_type in lottery_types:
+        history_file = args.history_file.format(lottery_type=lottery_type)
+        model_dir = Path(args.model_dir.format(lottery_type=lottery_type))
+        if not Path(history_file).exists():
+            print(f"\n⚠️  跳过 {lottery_type}: 历史数据文件不存在 {history_file}")
+            continue
+        meta = load_training_meta(str(model_dir)) or {}
+        model_files = find_backtest_models(model_dir, args.model_format, meta.get('time_order', 'newest_first'))
+        if not model_files:
+            print(f"\n⚠️  跳过 {lottery_type}: {model_dir} 中没有模型")
+            continue
+
+        architecture = 'multi_head' if 'multi' in model_files else 'separate'
+        if meta and meta.get('architecture') != architecture:
+            # 目录中的模型文件与元数据不一致（如手动替换过模型），元数据不可信
+            print(f"\n⚠️  {lottery_type}: training_meta.json 的架构为 {meta.get('architecture')}，"
+                  f"与模型文件不一致，忽略元数据")
+            meta = {}
+
+        start_issue = args.start_issue or meta.get('last_issue')
+        if start_issue is None:
+            print(f"\n⚠️  跳过 {lottery_type}: 没有 training_meta.json 的 last_issue，"
+                  f"需要用 --start_issue 指定训练数据的最后一期")
+            continue
+        if meta.get('last_issue') and issue_sort_key(str(start_issue)) < issue_sort_key(str(meta['last_issue'])):
+            print(f"\n⚠️  {lottery_type}: --start_issue {start_issue} 早于训练截止期号 {meta['last_issue']}，"
+                  f"部分回测期在训练样本内")
+
+        config = LOTTERY_CONFIG[lottery_type]
+        try:
+            results = backtest_models(
+                load_history_file(history_file),
+                model_files,
+                {
+                    'red': meta.get('num_red_balls', config['red']),
+                    'blue': meta.get('num_blue_balls', config['blue'])
+                },
+                start_issue,
+                colors=colors,
+                sequence_length=meta.get('sequence_length', args.sequence_length),
+                time_order=meta.get('time_order', 'newest_first'),
+                top_k=args.top_k,
+                last=args.last,
+                chunk_size=args.chunk_size
+            )
+        except ValueError as e:
+            print(f"\n⚠️  跳过 {lottery_type}: {e}")
+            continue
+        if not results:
+            print(f"\n⚠️  跳过 {lottery_type}: 第 {start_issue} 期之后没有可回测的开奖")
+            continue
+
+        report[lottery_type] = results
+        for result in results.values():
+            print_distribution(lottery_type, result)
+
+    if args.output:
+        output_path = Path(args.output)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n✅ 回测结果已保存到: {output_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+"""
+号码评分批量计算
+
+移植 Android 端 PredictionEngine 的逐号码评分算法（频率、遗漏/最大遗漏、趋势、
+马尔可夫、贝叶斯、关联），基于开奖矩阵的累积和一次性计算所有号码、所有截止点的得分。
+PredictionEngine 对每个号码单独扫描历史，复杂度约为 O(号码数 × 历史期数)；
+这里按时间顺序推进一次，可作为离线批量评分工具和 App 结果的数值参考
+
+与 App 的差异:
+    - 号码按整数比较（App 按补零字符串比较，个位数彩种的 "5" 与 "05" 不会匹配）
+    - 马尔可夫得分不使用 App 中跨历史共享的 markovCache
+
+依赖:
+    pip install numpy
+
+使用方法:
+    python batch_scorer.py --lottery_type ssq --history_file history_ssq.json --last 1000 --output scores_ssq.npz
+"""
+
+import argparse
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from history_dataset import load_history_file, sort_chronologically
+
+# 与 PredictionEngine.getLotteryConfig 的号码范围一致
+NUMBER_RANGES = {
+    'ssq': {'red': (1, 33), 'blue': (1, 16)},
+    'dlt': {'red': (1, 35), 'blue': (1, 12)},
+    'qlc': {'red': (1, 30), 'blue': (1, 30)},
+    'fc3d': {'red': (0, 9), 'blue': (0, 9)},
+    'qxc': {'red': (0, 9), 'blue': (0, 14)},
+    'pl3': {'red': (0, 9), 'blue': (0, 9)},
+    'pl5': {'red': (0, 9), 'blue': (0, 9)},
+    'kl8': {'red': (1, 80), 'blue': (1, 1)},
+}
+
+SCORE_NAMES = ('frequency', 'omission', 'trend', 'association', 'markov', 'bayes')
+
+# PredictionEngine.precomputeSharedData 中 recentHistory / olderHistory 的窗口大小
+RECENT_WINDOW = 10
+
+
+def count_matrix(
+    chronological: List[dict],
+    field: str,
+    number_range: Tuple[int, int]
+) -> np.ndarray:
+    """
+    每期各号码出现次数矩阵 (n_draws, num_classes)
+
+    保留重复号码的次数（位置型彩种同一期可能出现相同数字），范围外的号码忽略
+    """
+    low, high = number_range
+    num_classes = high - low + 1
+    counts = np.zeros((len(chronological), num_classes), dtype=np.int32)
+    rows, cols = [], []
+    for i, item in enumerate(chronological):
+        for num in item[field]:
+            col = int(num) - low
+            if 0 <= col < num_classes:
+                rows.append(i)
+                cols.append(col)
+    np.add.at(counts, (np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)), 1)
+    return counts
+
+
+def score_numbers(
+    history_data,
+    field: str,
+    number_range: Tuple[int, int],
+    cut_points: Optional[Sequence[int]] = None
+) -> Dict[str, np.ndarray]:
+    """
+    计算各截止点所有号码的得分
+
+    截止点 t 表示只使用按时间排序后的前 t 期（最后一期为 App 中的 history[0]），
+    即预测第 t 期（从 0 开始计）时 App 能看到的历史
+
+    Args:
+        history_data: 历史数据（任意顺序，按期号排序）
+        field: 'red' 或 'blue'
+        number_range: 号码范围 (最小号码, 最大号码)
+        cut_points: 截止点列表，取值 1..n_draws，默认全部
+
+    Returns:
+        {得分名称: (n_cuts, num_classes) float32}，另含 'cut_points' 和 'numbers'
+    """
+    chronological = sort_chronologically(history_data)
+    counts = count_matrix(chronological, field, number_range)
+    present = counts > 0
+    total_draws, num_classes = counts.shape
+
+    cuts = np.arange(1, total_draws + 1) if cut_points is None else np.asarray(cut_points, dtype=np.int64)
+    if len(cuts) and (cuts.min() < 1 or cuts.max() > total_draws):
+        raise ValueError(f"截止点必须在 1..{total_draws} 之间")
+    n = cuts.astype(np.float64)[:, np.newaxis]
+
+    zero_row = np.zeros((1, num_classes), dtype=np.int64)
+    # 前缀和：cum[t] 为前 t 期的累计值
+    cum_counts = np.vstack([zero_row, np.cumsum(counts, axis=0, dtype=np.int64)])
+    cum_present = np.vstack([zero_row, np.cumsum(present, axis=0, dtype=np.int64)])
+
+    # 频率：出现次数 / 期数，0.2 封顶
+    appearances = cum_counts[cuts]
+    frequency = np.minimum(appearances / n / 0.2, 1.0)
+
+    # 遗漏：当前遗漏 / 最大遗漏，经 sigmoid 映射
+    index = np.arange(total_draws)[:, np.newaxis]
+    last_seen = np.maximum.accumulate(np.where(present, index, -1), axis=0)
+    prev_seen = np.vstack([np.full((1, num_classes), -1), last_seen[:-1]])
+    gaps = np.where(present, index - prev_seen - 1, 0)
+    max_gap = np.maximum.accumulate(gaps, axis=0)
+    current_omission = (cuts - 1)[:, np.newaxis] - last_seen[cuts - 1]
+    max_omission = np.maximum(max_gap[cuts - 1], current_omission)
+    ratio = current_omission / np.where(max_omission == 0, 1, max_omission)
+    omission = np.where(max_omission == 0, 0.5, 1.0 / (1.0 + np.exp(-5.0 * (ratio - 0.5))))
+
+    # 趋势：最近 10 期与之前 10 期出现频率之差
+    recent_start = np.maximum(cuts - RECENT_WINDOW, 0)
+    older_start = np.maximum(cuts - 2 * RECENT_WINDOW, 0)
+    recent_size = (cuts - recent_start)[:, np.newaxis].astype(np.float64)
+    older_size = (recent_start - older_start)[:, np.newaxis].astype(np.float64)
+    recent_hits = cum_present[cuts] - cum_present[recent_start]
+    older_hits = cum_present[recent_start] - cum_present[older_start]
+    trend = np.where(
+        older_size == 0,
+        0.5,
+        np.clip((recent_hits / recent_size - older_hits / np.maximum(older_size, 1) + 0.2) / 0.4, 0.0, 1.0)
+    )
+
+    # 贝叶斯：先验（整体频率） × 似然（最近出现占比） / 证据（最近期数占比）
+    prior = appearances / n
+    likelihood = np.where(appearances > 0, recent_hits / np.maximum(appearances, 1), 0.0)
+    evidence = recent_size / n
+    bayes = np.clip(likelihood * prior / evidence, 0.0, 1.0)
+
+    association, markov = _sequential_scores(chronological, field, counts, present, cuts)
+
+    return {
+        'cut_points': cuts,
+        'numbers': np.arange(number_range[0], number_range[1] + 1),
+        'frequency': frequency.astype(np.float32),
+        'omission': omission.astype(np.float32),
+        'trend': trend.astype(np.float32),
+        'association': association,
+        'markov': markov,
+        'bayes': bayes.astype(np.float32),
+    }
+
+
+def _sequential_scores(
+    chronological: List[dict],
+    field: str,
+    counts: np.ndarray,
+    present: np.ndarray,
+    cuts: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    关联得分和马尔可夫得分：按时间顺序逐期累加，每期只做 O(号码数) 或 O(每期号码数²) 的更新
+    """
+    total_draws, num_classes = counts.shape
+    association = np.zeros((len(cuts), num_classes), dtype=np.float32)
+    markov = np.full((len(cuts), num_classes), 0.5, dtype=np.float32)
+    rows_by_cut: Dict[int, List[int]] = {}
+    for row, cut in enumerate(cuts.tolist()):
+        rows_by_cut.setdefault(cut, []).append(row)
+
+    # 马尔可夫状态：排序后的号码组合（与 App 的 sorted().joinToString 一致）
+    state_ids: Dict[Tuple[str, ...], int] = {}
+    states = np.array([
+        state_ids.setdefault(tuple(sorted(item[field])), len(state_ids))
+        for item in chronological
+    ], dtype=np.int64)
+    transition_sums = np.zeros((len(state_ids), num_classes), dtype=np.int64)
+    state_counts = np.zeros(len(state_ids), dtype=np.int64)
+
+    co_occurrence = np.zeros((num_classes, num_classes), dtype=np.int64)
+
+    for cut in range(1, total_draws + 1):
+        newest = cut - 1
+
+        # 关联：包含号码 i 的期中，其他号码 j 出现的次数
+        hit = np.flatnonzero(present[newest])
+        if len(hit):
+            co_occurrence[hit] += counts[newest]
+
+        # 马尔可夫：App 中 history[i] 的下一项是更早的一期，即 (newest, newest - 1)
+        if newest >= 1:
+            state = states[newest]
+            transition_sums[state] += present[newest - 1]
+            state_counts[state] += 1
+
+        rows = rows_by_cut.get(cut)
+        if not rows:
+            continue
+
+        diagonal = np.diagonal(co_occurrence)
+        totals = co_occurrence.sum(axis=1) - diagonal
+        partners = (co_occurrence > 0).sum(axis=1) - (diagonal > 0)
+        average = np.where(partners > 0, totals / np.maximum(partners, 1), 0.0) / cut
+        association[rows] = np.minimum(average / 0.1, 1.0)
+
+        if cut >= 2:
+            state = states[newest]
+            markov[rows] = np.clip(transition_sums[state] / state_counts[state], 0.0, 1.0)
+
+    return association, markov
+
+
+def select_cut_points(total_draws: int, last: Optional[int], step: int) -> np.ndarray:
+    start = 1 if last is None else max(1, total_draws - last + 1)
+    cuts = np.arange(total_draws, start - 1, -max(step, 1))[::-1]
+    return cuts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='PredictionEngine 号码评分批量计算')
+    parser.add_argument('--lottery_type', type=str, default='ssq', choices=list(NUMBER_RANGES),
+                        help='彩票类型')
+    parser.add_argument('--history_file', type=str, required=True, help='历史数据文件（JSON 或 .lhb）')
+    parser.add_argument('--colors', type=str, default='red,blue', help='计算的颜色')
+    parser.add_argument('--last', type=int, default=None, help='只计算最近的若干个截止点')
+    parser.add_argument('--step', type=int, default=1, help='截止点间隔')
+    parser.add_argument('--output', type=str, default=None, help='结果 .npz 路径')
+
+    args = parser.parse_args()
+
+    history_data = load_history_file(args.history_file)
+    cuts = select_cut_points(len(history_data), args.last, args.step)
+
+    print("="*60)
+    print("🧮 号码评分批量计算")
+    print("="*60)
+    print(f"彩票类型: {args.lottery_type}")
+    print(f"历史期数: {len(history_data)}, 截止点: {len(cuts)}")
+
+    arrays = {}
+    for color in [item.strip() for item in args.colors.split(',') if item.strip()]:
+        number_range = NUMBER_RANGES[args.lottery_type][color]
+        start = time.perf_counter()
+        scores = score_numbers(history_data, color, number_range, cuts)
+        elapsed = time.perf_counter() - start
+        print(f"\n{color}: {len(cuts)} 个截止点 × {len(scores['numbers'])} 个号码, 耗时 {elapsed:.3f}s")
+
+        # 最新截止点的得分，便于与 App 结果对照
+        print(f"  最新截止点得分 (前 10 个号码):")
+        print(f"  {'号码':<6}" + ''.join(f"{name:>13}" for name in SCORE_NAMES))
+        for col, number in enumerate(scores['numbers'][:10]):
+            print(f"  {number:02d}    " + ''.join(f"{scores[name][-1, col]:>13.4f}" for name in SCORE_NAMES))
+
+        for name, values in scores.items():
+            arrays[f"{color}_{name}"] = values
+
+    if args.output:
+        np.savez_compressed(args.output, **arrays)
+        print(f"\n✅ 评分结果已保存到: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,265 @@
+"""
+批量训练脚本
+
+将 (彩票类型, 颜色) 拆分为独立任务，在进程池中并行训练，
+每个进程限制 TensorFlow 的 intra-op / inter-op 线程数，避免多进程争抢 CPU
+
+依赖:
+    pip install tensorflow numpy
+
+使用方法:
+    python batch_train.py --lottery_type all --history_file data/history_{lottery_type}.json --output_dir models/batch
+"""
+
+import argparse
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Dict, List
+
+from tf_threads import configure_tf_threads
+# train_lstm_model 延迟导入 TensorFlow，在 _init_worker 设置线程数之前导入不会初始化 TensorFlow
+from train_lstm_model import LOTTERY_CONFIG
+
+ALL_LOTTERY_TYPES = list(LOTTERY_CONFIG)
+
+
+def _init_worker(intra_threads: int, inter_threads: int):
+    """工作进程初始化：在导入 TensorFlow 之前限制线程数"""
+    configure_tf_threads(intra_threads, inter_threads)
+
+
+def train_job(
+    lottery_type: str,
+    color: str,
+    history_file: str,
+    output_dir: str,
+    epochs: int,
+    batch_size: int,
+    sequence_length: int,
+    validation_split: float,
+    streaming: bool = False,
+    export_tflite: bool = True
+) -> Dict:
+    """
+    训练单个 (彩票类型, 颜色) 任务，在工作进程中执行
+
+    Returns:
+        任务指标和产物路径
+    """
+    result = {
+        'lottery_type': lottery_type,
+        'color': color,
+        'history_file': history_file,
+        'status': 'failed',
+        'pid': os.getpid()
+    }
+    start = time.perf_counter()
+    try:
+        from history_dataset import load_history_file
+        from train_lstm_model import LotteryLSTMModel
+
+        if not Path(history_file).exists():
+            raise FileNotFoundError(f"历史数据文件不存在: {history_file}")
+
+        history_data = load_history_file(history_file)
+        config = LOTTERY_CONFIG[lottery_type]
+        model = LotteryLSTMModel(
+            num_red_balls=config['red'],
+            num_blue_balls=config['blue'],
+            sequence_length=sequence_length,
+            colors=(color,)
+        )
+
+        history = model.train_color(
+            history_data,
+            color,
+            epochs=epochs,
+            batch_size=batch_size,
+            validation_split=validation_split,
+            streaming=streaming
+        )
+
+        job_dir = Path(output_dir) / lottery_type
+        result['keras_model'] = model.save_model(color, str(job_dir))
+        if export_tflite:
+            result['tflite_model'] = model.convert_model_to_tflite(color, str(job_dir))
+
+        metrics = history.history
+        result['epochs_run'] = len(metrics.get('loss', []))
+        result['final_metrics'] = {key: float(values[-1]) for key, values in metrics.items() if values}
+        if metrics.get('val_loss'):
+            result['best_val_loss'] = float(min(metrics['val_loss']))
+        result['num_draws'] = len(history_data)
+        result['status'] = 'ok'
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+        result['traceback'] = traceback.format_exc()
+    finally:
+        result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def run_batch(
+    lottery_types: List[str],
+    colors: List[str],
+    history_file: str,
+    output_dir: str,
+    epochs: int = 80,
+    batch_size: int = 16,
+    sequence_length: int = 8,
+    validation_split: float = 0.15,
+    streaming: bool = False,
+    export_tflite: bool = True,
+    workers: int = 0,
+    intra_threads: int = 1,
+    inter_threads: int = 1
+) -> List[Dict]:
+    """
+    在进程池中并行执行所有训练任务
+
+    Args:
+        history_file: 历史数据文件路径，支持 {lottery_type} 占位符
+        workers: 进程数，0 表示按 CPU 核数 / 每进程线程数自动计算
+        intra_threads: 每个进程的 intra-op 线程数
+        inter_threads: 每个进程的 inter-op 线程数
+    """
+    jobs = [
+        (lottery_type, color)
+        for lottery_type in lottery_types
+        for color in colors
+    ]
+    if workers <= 0:
+        workers = max(1, (os.cpu_count() or 1) // max(intra_threads, 1))
+    workers = min(workers, len(jobs))
+
+    print(f"任务数: {len(jobs)}, 进程数: {workers}, 每进程线程: intra={intra_threads}, inter={inter_threads}")
+
+    results = {}
+    # spawn 避免 fork 已初始化的 TensorFlow 运行时
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=get_context('spawn'),
+        initializer=_init_worker,
+        initargs=(intra_threads, inter_threads)
+    ) as executor:
+        futures = {
+            executor.submit(
+                train_job,
+                lottery_type,
+                color,
+                history_file.format(lottery_type=lottery_type),
+                output_dir,
+                epochs,
+                batch_size,
+                sequence_length,
+                validation_split,
+                streaming,
+                export_tflite
+            ): (lottery_type, color)
+            for lottery_type, color in jobs
+        }
+        for future in as_completed(futures):
+            result = future.result()
+            results[futures[future]] = result
+            status = '✅' if result['status'] == 'ok' else f"❌ {result.get('error', '')}"
+            print(f"  {result['lottery_type']}/{result['color']}: {result['seconds']:.1f}s {status}")
+
+    return [results[job] for job in jobs]
+
+
+def print_summary(results: List[Dict], wall_time: float):
+    """打印批量训练汇总表"""
+    print("\n" + "="*60)
+    print("📊 批量训练汇总")
+    print("="*60)
+    print(f"{'彩种':<8}{'颜色':<8}{'轮数':>6}{'best val_loss':>16}{'耗时(s)':>10}  状态")
+    print("-"*60)
+    for item in results:
+        val_loss = item.get('best_val_loss')
+        val_loss = f"{val_loss:.4f}" if val_loss is not None else '-'
+        status = '✅' if item['status'] == 'ok' else '❌'
+        print(f"{item['lottery_type']:<8}{item['color']:<8}{item.get('epochs_run', 0):>6}"
+              f"{val_loss:>16}{item['seconds']:>10.1f}  {status}")
+    print("-"*60)
+    job_time = sum(item['seconds'] for item in results)
+    print(f"总耗时: {wall_time:.1f}s (任务累计 {job_time:.1f}s, 加速比 {job_time / max(wall_time, 1e-9):.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='并行批量训练 LSTM 彩票预测模型')
+    parser.add_argument('--lottery_type', type=str, default='all',
+                        help='彩票类型，多个用逗号分隔，all 表示全部')
+    parser.add_argument('--colors', type=str, default='red,blue', help='训练的颜色 (red, blue)')
+    parser.add_argument('--history_file', type=str, default='data/history_{lottery_type}.json',
+                        help='历史数据文件路径（支持 {lottery_type} 占位符）')
+    parser.add_argument('--output_dir', type=str, default='models/batch', help='输出目录')
+    parser.add_argument('--epochs', type=int, default=80, help='训练轮数')
+    parser.add_argument('--batch_size', type=int, default=16, help='批次大小')
+    parser.add_argument('--sequence_length', type=int, default=8, help='序列长度')
+    parser.add_argument('--validation_split', type=float, default=0.15, help='验证集比例')
+    parser.add_argument('--streaming', action='store_true', help='使用 tf.data 流式生成训练窗口')
+    parser.add_argument('--skip_tflite', action='store_true', help='不导出 TFLite 模型')
+    parser.add_argument('--workers', type=int, default=0, help='进程数（0 表示自动）')
+    parser.add_argument('--intra_threads', type=int, default=1, help='每进程 intra-op 线程数')
+    parser.add_argument('--inter_threads', type=int, default=1, help='每进程 inter-op 线程数')
+
+    args = parser.parse_args()
+
+    if args.lottery_type == 'all':
+        lottery_types = list(ALL_LOTTERY_TYPES)
+    else:
+        lottery_types = [item.strip() for item in args.lottery_type.split(',') if item.strip()]
+    unknown = [item for item in lottery_types if item not in ALL_LOTTERY_TYPES]
+    if unknown:
+        parser.error(f"未知彩票类型: {', '.join(unknown)}")
+
+    colors = [item.strip() for item in args.colors.split(',') if item.strip()]
+    if not colors or any(color not in ('red', 'blue') for color in colors):
+        parser.error("--colors 只支持 red, blue")
+
+    print("="*60)
+    print("🎲 LSTM 批量并行训练")
+    print("="*60)
+    print(f"彩票类型: {', '.join(lottery_types)}")
+    print(f"颜色: {', '.join(colors)}")
+    print(f"输出目录: {args.output_dir}")
+    print("="*60)
+
+    start = time.perf_counter()
+    results = run_batch(
+        lottery_types,
+        colors,
+        args.history_file,
+        args.output_dir,
+        epochs=args.epochs,
+        batch_size=args.batch_size,
+        sequence_length=args.sequence_length,
+        validation_split=args.validation_split,
+        streaming=args.streaming,
+        export_tflite=not args.skip_tflite,
+        workers=args.workers,
+        intra_threads=args.intra_threads,
+        inter_threads=args.inter_threads
+    )
+    wall_time = time.perf_counter() - start
+
+    print_summary(results, wall_time)
+
+    summary_path = Path(args.output_dir) / 'batch_summary.json'
+    summary_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(summary_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'wall_time': wall_time,
+            'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'jobs': results
+        }, f, ensure_ascii=False, indent=2)
+    print(f"\n✅ 汇总已保存到: {summary_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,350 @@
+"""
+TFLite 推理基准测试
+
+按 Android 端 LSTMPredictor 的方式加载导出的 lottery_lstm_*.tflite 并构造输入
+（最近 SEQUENCE_LENGTH 期，最新一期在前，号码 n 对应下标 n-1，越界号码忽略），
+测量冷启动加载耗时、不同线程数/批次大小下的 p50/p95/p99 延迟和峰值内存，
+结果输出为 JSON，并可与另一模型目录的结果对比、标记性能回退
+
+依赖:
+    pip install tensorflow numpy
+
+使用方法:
+    python benchmark_tflite.py --model_dir models/v1 --history_file history_ssq.json --output bench.json
+    python benchmark_tflite.py --model_dir models/v2 --baseline_dir models/v1 --history_file history_ssq.json
+    python benchmark_tflite.py --model_dir ../app/src/main/assets --lottery_type ssq --history_file history_ssq.json
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from history_dataset import load_history_file
+from profiling import current_rss_mb, peak_rss_mb
+from tflite_utils import invoke, load_interpreter, measure_latency
+from train_lstm_model import LOTTERY_CONFIG, load_training_meta
+
+# 与 LSTMPredictor 中的常量保持一致
+SEQUENCE_LENGTH = 8
+NUM_THREADS = 4
+
+
+def prepare_input(
+    history: List[dict],
+    field: str,
+    num_classes: int,
+    sequence_length: int = SEQUENCE_LENGTH
+) -> np.ndarray:
+    """
+    与 LSTMPredictor.prepareRedInput / prepareBlueInput 相同的输入构造
+
+    Args:
+        history: 最新一期在前的历史数据
+        field: 'red' 或 'blue'
+
+    Returns:
+        (1, sequence_length, num_classes) float32
+    """
+    x = np.zeros((1, sequence_length, num_classes), dtype=np.float32)
+    for i, draw in enumerate(history[:sequence_length]):
+        for num in draw[field]:
+            index = int(num) - 1
+            if 0 <= index < num_classes:
+                x[0, i, index] = 1.0
+    return x
+
+
+def prepare_combined_input(
+    history: List[dict],
+    num_red_balls: int,
+    num_blue_balls: int,
+    sequence_length: int = SEQUENCE_LENGTH
+) -> np.ndarray:
+    """
+    与 LSTMPredictor.prepareCombinedInput 相同的多头模型输入：每期红球在前，蓝球在后
+
+    Returns:
+        (1, sequence_length, num_red_balls + num_blue_balls) float32
+    """
+    return np.concatenate([
+        prepare_input(history, 'red', num_red_balls, sequence_length),
+        prepare_input(history, 'blue', num_blue_balls, sequence_length)
+    ], axis=2)
+
+
+def random_input(sequence_length: int, num_classes: int, per_draw: int = 6) -> np.ndarray:
+    """没有历史数据（或多头模型无法确定红球数）时使用的随机 one-hot 输入"""
+    rng = np.random.default_rng(0)
+    x = np.zeros((1, sequence_length, num_classes), dtype=np.float32)
+    for i in range(sequence_length):
+        x[0, i, rng.choice(num_classes, size=min(per_draw, num_classes), replace=False)] = 1.0
+    return x
+
+
+def find_models(model_dir: str) -> List[Path]:
+    """窗口模型文件；单步模型（*_step.tflite）的输入为单期号码和 LSTM 状态，不在此测试"""
+    return sorted(p for p in Path(model_dir).glob('lottery_lstm_*.tflite') if not p.stem.endswith('_step'))
+
+
+def model_field(model_path: Path) -> Optional[str]:
+    """根据文件名判断红球/蓝球模型，多头模型返回 None"""
+    if '_multi' in model_path.stem:
+        return None
+    return 'blue' if '_blue' in model_path.stem else 'red'
+
+
+def benchmark_model(
+    model_path: Path,
+    history: Optional[List[dict]],
+    thread_counts: List[int],
+    batch_sizes: List[int],
+    runs: int,
+    warmup: int,
+    num_red_balls: Optional[int] = None,
+    time_order: str = 'newest_first'
+) -> Dict:
+    """
+    对单个模型执行冷启动和热推理测试
+
+    多头模型的输入按 num_red_balls 拆分红球/蓝球列，为 None 时使用随机输入；
+    time_order 为 oldest_first 时窗口按最早一期在前输入。
+    内存按测试前后的当前常驻内存计（进程峰值包含之前测试过的模型，不能区分单个模型），
+    Linux 以外的平台为 None
+    """
+    rss_before = current_rss_mb()
+
+    # 冷启动：加载 + 分配张量 + 首次推理
+    start = time.perf_counter()
+    interpreter = load_interpreter(model_path=str(model_path), num_threads=NUM_THREADS)
+    load_ms = (time.perf_counter() - start) * 1000
+
+    input_detail = interpreter.get_input_details()[0]
+    _, sequence_length, num_classes = input_detail['shape']
+    field = model_field(model_path)
+    if history is None or (field is None and not num_red_balls):
+        x = random_input(int(sequence_length), int(num_classes))
+    elif field is None:
+        x = prepare_combined_input(history, num_red_balls, int(num_classes) - num_red_balls, int(sequence_length))
+    else:
+        x = prepare_input(history, field, int(num_classes), int(sequence_length))
+    if time_order == 'oldest_first':
+        x = np.ascontiguousarray(x[:, ::-1])
+
+    start = time.perf_counter()
+    invoke(interpreter, x)
+    first_invoke_ms = (time.perf_counter() - start) * 1000
+
+    result = {
+        'model': model_path.name,
+        'size_kb': model_path.stat().st_size / 1024,
+        'input_shape': [int(v) for v in input_detail['shape']],
+        'input': 'random' if history is None or (field is None and not num_red_balls) else 'history',
+        'cold_load_ms': load_ms,
+        'first_invoke_ms': first_invoke_ms,
+        'configs': []
+    }
+
+    for threads in thread_counts:
+        interpreter = load_interpreter(model_path=str(model_path), num_threads=threads)
+        for batch_size in batch_sizes:
+            batch = np.repeat(x, batch_size, axis=0)
+            try:
+                timings = measure_latency(interpreter, batch, runs=runs, warmup=warmup)
+            except (ValueError, RuntimeError) as e:
+                # 固定批次的模型（如 builtin 导出）不支持调整批次
+                result['configs'].append({
+                    'threads': threads,
+                    'batch_size': batch_size,
+                    'error': str(e)
+                })
+                continue
+            result['configs'].append({
+                'threads': threads,
+                'batch_size': batch_size,
+                'p50_ms': float(np.percentile(timings, 50)),
+                'p95_ms': float(np.percentile(timings, 95)),
+                'p99_ms': float(np.percentile(timings, 99)),
+                'mean_ms': float(timings.mean()),
+                'windows_per_sec': batch_size * 1000 / float(timings.mean())
+            })
+
+    # 最后一个解释器仍然存活，计入该模型的常驻内存
+    result['rss_mb'] = current_rss_mb()
+    result['rss_delta_mb'] = (
+        result['rss_mb'] - rss_before if rss_before is not None and result['rss_mb'] is not None else None
+    )
+    return result
+
+
+def run_benchmark(
+    model_dir: str,
+    history: Optional[List[dict]],
+    thread_counts: List[int],
+    batch_sizes: List[int],
+    runs: int = 200,
+    warmup: int = 20,
+    lottery_type: Optional[str] = None
+) -> Dict:
+    """
+    测试目录中的所有窗口模型
+
+    多头模型的红球数和窗口顺序取目录中的 training_meta.json，
+    没有元数据时红球数取 lottery_type 的 LOTTERY_CONFIG
+    """
+    models = find_models(model_dir)
+    if not models:
+        raise FileNotFoundError(f"目录中没有 lottery_lstm_*.tflite: {model_dir}")
+
+    meta = load_training_meta(model_dir) or {}
+    num_red_balls = meta.get('num_red_balls')
+    if num_red_balls is None and lottery_type:
+        num_red_balls = LOTTERY_CONFIG[lottery_type]['red']
+    time_order = meta.get('time_order', 'newest_first')
+
+    results = []
+    for model_path in models:
+        print(f"\n⏱  测试 {model_path.name} ...")
+        result = benchmark_model(model_path, history, thread_counts, batch_sizes, runs, warmup,
+                                 num_red_balls, time_order)
+        if history is not None and result['input'] == 'random':
+            print("  ⚠️  没有 training_meta.json 且未指定 --lottery_type，多头模型使用随机输入")
+        results.append(result)
+        print(f"  冷启动: 加载 {result['cold_load_ms']:.2f} ms, 首次推理 {result['first_invoke_ms']:.2f} ms"
+              + (f", 常驻内存增加 {result['rss_delta_mb']:.1f} MB" if result['rss_delta_mb'] is not None else ''))
+        for config in result['configs']:
+            if 'error' in config:
+                print(f"  threads={config['threads']:<2} batch={config['batch_size']:<4} ❌ 不支持")
+                continue
+            print(f"  threads={config['threads']:<2} batch={config['batch_size']:<4} "
+                  f"p50={config['p50_ms']:.3f} p95={config['p95_ms']:.3f} p99={config['p99_ms']:.3f} ms")
+
+    return {
+        'model_dir': str(model_dir),
+        'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'runs': runs,
+        'models': results,
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+
+def compare_results(baseline: Dict, candidate: Dict, threshold: float) -> List[Dict]:
+    """
+    对比两次测试结果，延迟/加载耗时增加超过 threshold（比例）视为回退
+
+    Returns:
+        回退项列表
+    """
+    regressions = []
+    baseline_models = {item['model']: item for item in baseline['models']}
+
+    def check(model: str, metric: str, old: float, new: float):
+        if old > 0 and (new - old) / old > threshold:
+            regressions.append({
+                'model': model,
+                'metric': metric,
+                'baseline': old,
+                'candidate': new,
+                'change': (new - old) / old
+            })
+
+    for item in candidate['models']:
+        old_item = baseline_models.get(item['model'])
+        if old_item is None:
+            continue
+        check(item['model'], 'cold_load_ms', old_item['cold_load_ms'], item['cold_load_ms'])
+        check(item['model'], 'size_kb', old_item['size_kb'], item['size_kb'])
+
+        old_configs = {(c['threads'], c['batch_size']): c for c in old_item['configs'] if 'error' not in c}
+        for config in item['configs']:
+            old_config = old_configs.get((config['threads'], config['batch_size']))
+            if old_config is None or 'error' in config:
+                continue
+            key = f"threads={config['threads']},batch={config['batch_size']}"
+            for metric in ('p50_ms', 'p95_ms', 'p99_ms'):
+                check(item['model'], f"{key}:{metric}", old_config[metric], config[metric])
+
+    return regressions
+
+
+def load_benchmark_history(history_file: Optional[str]) -> Optional[List[dict]]:
+    if history_file and Path(history_file).exists():
+        return list(load_history_file(history_file)[:SEQUENCE_LENGTH])
+    print("⚠️  未指定历史数据文件，使用随机输入")
+    return None
+
+
+def parse_int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(',') if item.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='TFLite 模型推理基准测试')
+    parser.add_argument('--model_dir', type=str, required=True, help='待测模型目录')
+    parser.add_argument('--baseline_dir', type=str, default=None, help='对比基准模型目录')
+    parser.add_argument('--baseline_json', type=str, default=None, help='对比基准测试结果 JSON')
+    parser.add_argument('--history_file', type=str, default=None, help='历史数据文件（最新一期在前）')
+    parser.add_argument('--lottery_type', type=str, default=None, choices=list(LOTTERY_CONFIG),
+                        help='彩票类型，模型目录没有 training_meta.json 时用于拆分多头模型的红球/蓝球输入')
+    parser.add_argument('--threads', type=str, default='1,2,4', help='线程数列表')
+    parser.add_argument('--batch_sizes', type=str, default='1,8,32', help='批次大小列表')
+    parser.add_argument('--runs', type=int, default=200, help='每个配置的测量次数')
+    parser.add_argument('--warmup', type=int, default=20, help='预热次数')
+    parser.add_argument('--threshold', type=float, default=0.10, help='回退判定阈值（比例）')
+    parser.add_argument('--output', type=str, default='benchmark.json', help='结果 JSON 路径')
+
+    args = parser.parse_args()
+
+    thread_counts = parse_int_list(args.threads)
+    batch_sizes = parse_int_list(args.batch_sizes)
+    history = load_benchmark_history(args.history_file)
+
+    print("="*60)
+    print("⏱  TFLite 推理基准测试")
+    print("="*60)
+
+    result = run_benchmark(args.model_dir, history, thread_counts, batch_sizes, args.runs, args.warmup,
+                           args.lottery_type)
+
+    baseline = None
+    if args.baseline_json:
+        with open(args.baseline_json, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    elif args.baseline_dir:
+        print(f"\n📏 测试基准目录: {args.baseline_dir}")
+        baseline = run_benchmark(args.baseline_dir, history, thread_counts, batch_sizes, args.runs, args.warmup,
+                                 args.lottery_type)
+
+    if baseline is not None:
+        regressions = compare_results(baseline, result, args.threshold)
+        result['baseline'] = baseline['model_dir']
+        result['regressions'] = regressions
+
+        print("\n" + "="*60)
+        if regressions:
+            print(f"❌ 发现 {len(regressions)} 项性能回退 (阈值 {args.threshold:.0%}):")
+            for item in regressions:
+                print(f"  {item['model']} {item['metric']}: "
+                      f"{item['baseline']:.3f} -> {item['candidate']:.3f} ({item['change']:+.1%})")
+        else:
+            print("✅ 未发现性能回退")
+
+    output_path = Path(args.output)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"\n✅ 结果已保存到: {output_path}")
+
+    if baseline is not None and result['regressions']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,374 @@
+"""
+组合特征表
+
+枚举彩种号码池的全部组合（如双色球红球 C(33,6) = 1,107,568 注），向量化计算
+PredictionEngine.applyCombinatorialOptimization 各优化步骤使用的特征:
+    sum     和值（optimizeSumValue）
+    span    跨度（optimizeSpan）
+    ac      AC 值，不同差值个数 - (k - 1)（calculateAcValue）
+    odd     奇数个数，偶数个数为 k - odd（optimizeOddEven）
+    prime   质数个数（optimizePrimeComposite，1 不是质数）
+    zone1/zone2/zone3  三区号码数，区间大小为 号码数 / 3，余数并入第三区（optimizeZoneDistribution）
+    big     大号个数，大于 (最小号 + 最大号) / 2（optimizeBalance）
+
+按列保存为 .npy（按字典序排列的组合，行号即组合的字典序排名），查询时内存映射加载，
+对全部组合的区间筛选和按号码概率排序在毫秒级完成
+
+目录结构:
+    <table_dir>/<lottery_type>_<field>/numbers.npy, sum.npy, ..., meta.json
+
+快乐8 C(80,20) 约 3.5e18 注，超出 --max_combinations 时拒绝构建
+
+依赖:
+    pip install numpy
+
+使用方法:
+    python combination_table.py build --lottery_type ssq --table_dir tables
+    python combination_table.py query --lottery_type ssq --table_dir tables \\
+        --filter sum=90:130,ac=6:8,odd=2:4,span=15:25 --top 10
+    python combination_table.py query --lottery_type ssq --table_dir tables \\
+        --filter ac=6:8 --probabilities prediction_ssq.json --top 10
+"""
+
+import argparse
+import json
+import math
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from batch_scorer import NUMBER_RANGES
+
+TABLE_VERSION = 1
+
+# 从号码池中选出的号码数（只收录无序、不重复选号的号码池，数字型彩票按位开奖不适用）
+PICK_COUNTS = {
+    'ssq': {'red': 6},
+    'dlt': {'red': 5, 'blue': 2},
+    'qlc': {'red': 7},
+    'kl8': {'red': 20},
+}
+
+FEATURES = ('sum', 'span', 'ac', 'odd', 'prime', 'zone1', 'zone2', 'zone3', 'big')
+
+DEFAULT_MAX_COMBINATIONS = 50_000_000
+
+# 每次计算特征的行数，限制 AC 值差值矩阵的内存
+CHUNK_ROWS = 1 << 18
+
+
+def prime_mask(high: int) -> np.ndarray:
+    """下标 n 处为 n 是否为质数（0..high）"""
+    mask = np.ones(high + 1, dtype=bool)
+    mask[:2] = False
+    for i in range(2, int(high ** 0.5) + 1):
+        if mask[i]:
+            mask[i * i::i] = False
+    return mask
+
+
+def _extend(prefix: np.ndarray, high: int, remaining: int) -> np.ndarray:
+    """
+    为每行追加一个大于末位的号码，保持字典序
+
+    remaining 为追加后还需选的号码数，末位不超过 high - remaining
+    """
+    last = prefix[:, -1].astype(np.int64)
+    counts = np.maximum(high - remaining - last, 0)
+    total = int(counts.sum())
+    rows = np.repeat(np.arange(len(prefix)), counts)
+    # 每组内的偏移 0, 1, ..., counts - 1
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    return np.concatenate([prefix[rows], (last[rows] + 1 + offsets)[:, np.newaxis].astype(prefix.dtype)], axis=1)
+
+
+def enumerate_combinations(low: int, high: int, k: int, first: Optional[int] = None) -> np.ndarray:
+    """
+    按字典序枚举 low..high 中选 k 个的组合
+
+    first 不为 None 时只枚举首个号码为 first 的组合（分块构建用）
+    """
+    firsts = np.arange(low, high - k + 2) if first is None else np.array([first])
+    combos = firsts[:, np.newaxis].astype(np.uint8)
+    for j in range(1, k):
+        combos = _extend(combos, high, k - j - 1)
+    return combos
+
+
+def combination_features(combos: np.ndarray, low: int, high: int) -> Dict[str, np.ndarray]:
+    """向量化计算每个组合的特征（combos 每行升序）"""
+    values = combos.astype(np.int16)
+    k = values.shape[1]
+
+    # 全部两两差值（升序，均为正），统计不同差值的个数
+    i, j = np.triu_indices(k, 1)
+    diffs = values[:, j] - values[:, i]
+    seen = np.zeros((len(values), high - low + 1), dtype=bool)
+    seen[np.arange(len(values))[:, np.newaxis], diffs] = True
+
+    zone_size = (high - low + 1) // 3
+    zone = np.minimum((values - low) // zone_size, 2)
+    mid = (low + high) // 2
+    primes = prime_mask(high)
+
+    return {
+        'sum': values.sum(axis=1).astype(np.uint16),
+        'span': (values[:, -1] - values[:, 0]).astype(np.uint8),
+        'ac': (seen.sum(axis=1) - (k - 1)).astype(np.uint8),
+        'odd': (values % 2 == 1).sum(axis=1).astype(np.uint8),
+        'prime': primes[values].sum(axis=1).astype(np.uint8),
+        'zone1': (zone == 0).sum(axis=1).astype(np.uint8),
+        'zone2': (zone == 1).sum(axis=1).astype(np.uint8),
+        'zone3': (zone == 2).sum(axis=1).astype(np.uint8),
+        'big': (values > mid).sum(axis=1).astype(np.uint8),
+    }
+
+
+def combination_rank(numbers: List[int], low: int, high: int) -> int:
+    """升序组合在字典序枚举中的行号"""
+    n = high - low + 1
+    k = len(numbers)
+    rank = 0
+    previous = -1
+    for i, number in enumerate(sorted(numbers)):
+        position = number - low
+        # 第 i 位取 previous+1 .. position-1 时排在前面的组合数
+        for skipped in range(previous + 1, position):
+            rank += math.comb(n - skipped - 1, k - i - 1)
+        previous = position
+    return rank
+
+
+def table_path(table_dir: str, lottery_type: str, field: str) -> Path:
+    return Path(table_dir) / f"{lottery_type}_{field}"
+
+
+def _table_spec(lottery_type: str, field: str) -> Tuple[int, int, int]:
+    if lottery_type not in PICK_COUNTS or field not in PICK_COUNTS[lottery_type]:
+        raise ValueError(f"{lottery_type}/{field} 不是无序选号的号码池，无法构建组合表")
+    low, high = NUMBER_RANGES[lottery_type][field]
+    return low, high, PICK_COUNTS[lottery_type][field]
+
+
+def build_table(
+    table_dir: str,
+    lottery_type: str,
+    field: str = 'red',
+    max_combinations: int = DEFAULT_MAX_COMBINATIONS
+) -> Path:
+    """
+    枚举全部组合并按列写入 table_dir
+
+    按首个号码分块枚举和计算，直接写入内存映射的 .npy，内存占用与单个分块成正比
+    """
+    low, high, k = _table_spec(lottery_type, field)
+    total = math.comb(high - low + 1, k)
+    if total > max_combinations:
+        raise ValueError(f"{lottery_type}/{field} 共 {total:,} 注组合，超过上限 {max_combinations:,}")
+
+    start = time.perf_counter()
+    output = table_path(table_dir, lottery_type, field)
+    tmp_dir = output.with_name(f".{output.name}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    open_memmap = np.lib.format.open_memmap
+    # 列优先存储，每个位置的号码连续，排序时按列查概率
+    numbers = open_memmap(tmp_dir / 'numbers.npy', mode='w+', dtype=np.uint8, shape=(total, k), fortran_order=True)
+    columns = {}
+
+    row = 0
+    for first in range(low, high - k + 2):
+        combos = enumerate_combinations(low, high, k, first)
+        numbers[row:row + len(combos)] = combos
+        for chunk_start in range(0, len(combos), CHUNK_ROWS):
+            chunk = combos[chunk_start:chunk_start + CHUNK_ROWS]
+            for name, values in combination_features(chunk, low, high).items():
+                if name not in columns:
+                    columns[name] = open_memmap(tmp_dir / f"{name}.npy", mode='w+', dtype=values.dtype, shape=(total,))
+                columns[name][row + chunk_start:row + chunk_start + len(chunk)] = values
+        row += len(combos)
+
+    numbers.flush()
+    for column in columns.values():
+        column.flush()
+    meta = {
+        'version': TABLE_VERSION,
+        'lottery_type': lottery_type,
+        'field': field,
+        'low': low,
+        'high': high,
+        'k': k,
+        'count': total,
+        'columns': {name: str(column.dtype) for name, column in columns.items()},
+        'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+    with open(tmp_dir / 'meta.json', 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    del numbers, columns
+
+    shutil.rmtree(output, ignore_errors=True)
+    tmp_dir.rename(output)
+    print(f"✅ {lottery_type}/{field}: {total:,} 注组合, "
+          f"{sum(p.stat().st_size for p in output.iterdir()) / 1024 / 1024:.1f} MB, "
+          f"{time.perf_counter() - start:.2f}s -> {output}")
+    return output
+
+
+class CombinationTable:
+    """内存映射加载的组合特征表"""
+
+    def __init__(self, table_dir: str, lottery_type: str, field: str = 'red'):
+        path = table_path(table_dir, lottery_type, field)
+        with open(path / 'meta.json', 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        if self.meta.get('version') != TABLE_VERSION:
+            raise ValueError(f"组合表版本 {self.meta.get('version')} 不受支持，请重新构建: {path}")
+        self.low = self.meta['low']
+        self.high = self.meta['high']
+        self.k = self.meta['k']
+        self.numbers = np.load(path / 'numbers.npy', mmap_mode='r')
+        self.columns = {name: np.load(path / f"{name}.npy", mmap_mode='r') for name in self.meta['columns']}
+
+    def __len__(self) -> int:
+        return int(self.meta['count'])
+
+    def mask(self, filters: Dict[str, Tuple[int, int]]) -> np.ndarray:
+        """满足全部区间条件（闭区间）的行"""
+        result = np.ones(len(self), dtype=bool)
+        for name, (low, high) in filters.items():
+            if name not in self.columns:
+                raise KeyError(f"未知特征: {name}（可用: {', '.join(self.columns)}）")
+            column = self.columns[name]
+            result &= (column >= low) & (column <= high)
+        return result
+
+    def filter(self, filters: Dict[str, Tuple[int, int]]) -> np.ndarray:
+        """满足条件的行号（字典序）"""
+        return np.flatnonzero(self.mask(filters))
+
+    def rank(
+        self,
+        rows: np.ndarray,
+        probabilities: np.ndarray,
+        top: int = 10
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        按组合内号码概率之和排序
+
+        Args:
+            rows: 候选行号
+            probabilities: 号码 low..high 的概率，形状 (high - low + 1,)
+
+        Returns:
+            (行号, 得分)，得分降序
+        """
+        if len(rows) == 0:
+            return rows, np.zeros(0, dtype=np.float32)
+        # 按号码直接索引，无需把 uint8 号码转为下标
+        weights = np.zeros(self.high + 1, dtype=np.float32)
+        weights[self.low:] = probabilities
+        if len(rows) > len(self) // 4:
+            # 候选较多时按整列查表比按行收集更快
+            scores = sum(weights[self.numbers[:, j]] for j in range(self.k))[rows]
+        else:
+            scores = sum(weights[self.numbers[rows, j]] for j in range(self.k))
+        top = min(top, len(rows))
+        best = np.argpartition(-scores, top - 1)[:top]
+        best = best[np.argsort(-scores[best], kind='stable')]
+        return rows[best], scores[best]
+
+    def row_of(self, numbers: List[int]) -> int:
+        return combination_rank(numbers, self.low, self.high)
+
+    def features(self, row: int) -> Dict[str, int]:
+        return {name: int(column[row]) for name, column in self.columns.items()}
+
+
+def parse_filters(spec: str) -> Dict[str, Tuple[int, int]]:
+    """解析 "sum=90:130,ac=6:8,odd=3" 形式的条件（闭区间）"""
+    filters = {}
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, bounds = item.partition('=')
+        low, _, high = bounds.partition(':')
+        filters[name.strip()] = (int(low), int(high or low))
+    return filters
+
+
+def load_probabilities(file_path: str, field: str, low: int, high: int) -> np.ndarray:
+    """
+    读取号码概率，格式与 LSTMPredictor / prediction_server 的输出一致:
+        {"red": {"01": 0.12, ...}, "blue": {...}}，或直接为 {"01": 0.12, ...}
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    values = data.get(field, data)
+    probabilities = np.zeros(high - low + 1, dtype=np.float32)
+    for number, probability in values.items():
+        index = int(number) - low
+        if 0 <= index < len(probabilities):
+            probabilities[index] = float(probability)
+    return probabilities
+
+
+def main():
+    parser = argparse.ArgumentParser(description='组合特征表：构建与筛选查询')
+    parser.add_argument('command', choices=['build', 'query'], help='build 构建；query 筛选排序')
+    parser.add_argument('--lottery_type', type=str, default='ssq', choices=list(PICK_COUNTS), help='彩票类型')
+    parser.add_argument('--field', type=str, default='red', help='号码池 (red / blue)')
+    parser.add_argument('--table_dir', type=str, default='tables', help='组合表目录')
+    parser.add_argument('--max_combinations', type=int, default=DEFAULT_MAX_COMBINATIONS,
+                        help='组合数上限，超出时拒绝构建（快乐8 无法完整枚举）')
+    parser.add_argument('--filter', type=str, default='',
+                        help=f"筛选条件，如 sum=90:130,ac=6:8,odd=3 (特征: {', '.join(FEATURES)})")
+    parser.add_argument('--probabilities', type=str, default=None,
+                        help='号码概率 JSON，按组合内概率之和排序（默认按字典序取前 top 注）')
+    parser.add_argument('--top', type=int, default=10, help='输出的组合数')
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        try:
+            build_table(args.table_dir, args.lottery_type, args.field, args.max_combinations)
+        except ValueError as e:
+            parser.error(str(e))
+        return
+
+    try:
+        table = CombinationTable(args.table_dir, args.lottery_type, args.field)
+    except FileNotFoundError:
+        parser.error(f"组合表不存在，请先运行 build: {table_path(args.table_dir, args.lottery_type, args.field)}")
+    filters = parse_filters(args.filter)
+
+    start = time.perf_counter()
+    try:
+        rows = table.filter(filters)
+    except KeyError as e:
+        parser.error(e.args[0])
+    filter_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    if args.probabilities:
+        probabilities = load_probabilities(args.probabilities, args.field, table.low, table.high)
+        best, scores = table.rank(rows, probabilities, args.top)
+    else:
+        best, scores = rows[:args.top], None
+    rank_ms = (time.perf_counter() - start) * 1000
+
+    print(f"🔎 {args.lottery_type}/{args.field}: {len(rows):,} / {len(table):,} 注满足条件 "
+          f"({len(rows) / len(table):.2%}), 筛选 {filter_ms:.2f} ms, 排序 {rank_ms:.2f} ms")
+    for i, row in enumerate(best):
+        numbers = ' '.join(f"{n:02d}" for n in table.numbers[row])
+        features = ' '.join(f"{name}={value}" for name, value in table.features(row).items())
+        score = f"  score={scores[i]:.4f}" if scores is not None else ''
+        print(f"  {numbers}  {features}{score}")
+
+
+if __name__ == '__main__':
+    main()
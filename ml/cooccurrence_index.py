@@ -0,0 +1,310 @@
+"""
+号码共现索引
+
+维护号码两两共现（稠密矩阵）、三元组共现（按组合数编号压缩存储）以及
+相邻两期的转移计数（上一期出现号码 i、下一期出现号码 j 的次数），
+新开奖数据逐期增量更新，支持"与号码 N 最常同时出现的号码"等查询，并可保存为 .npz。
+PredictionEngine.calculateAssociationScore 对每个号码扫描一遍历史，
+快乐8 每期 20 个号码时两两/三元组统计尤其昂贵，这里每期只处理该期号码的组合
+
+依赖:
+    pip install numpy
+
+使用方法:
+    python cooccurrence_index.py --lottery_type kl8 --history_file history_kl8.json --output cooc_kl8.npz
+    python cooccurrence_index.py --lottery_type kl8 --index cooc_kl8.npz --query 08 --top 10
+"""
+
+import argparse
+import json
+from itertools import combinations
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from batch_scorer import NUMBER_RANGES
+from history_dataset import draws_after, load_history_file, sort_chronologically
+
+INDEX_FORMAT = 'lottery-cooccurrence'
+INDEX_VERSION = 2
+
+
+def _binomial_table(size: int, k: int) -> np.ndarray:
+    """table[x] = C(x, k)，x = 0..size"""
+    x = np.arange(size + 1, dtype=np.int64)
+    result = np.ones(size + 1, dtype=np.int64)
+    for i in range(k):
+        result *= x - i
+    for i in range(2, k + 1):
+        result //= i
+    return np.maximum(result, 0)
+
+
+class CooccurrenceIndex:
+    """
+    单个颜色的共现索引
+
+    pairs[i, j]: 号码 i、j 同时出现的期数，对角线为号码 i 出现的期数
+    triples[rank(i, j, k)]: i < j < k 同时出现的期数，rank 为组合数系统编号
+        C(i, 1) + C(j, 2) + C(k, 3)，数组长度为 C(号码数, 3)（快乐8 为 82160）
+    transitions[i, j]: 某期出现 i 且下一期出现 j 的次数（按时间顺序）
+    weighted_pairs[i, j]: 出现号码 i 的各期中号码 j 的出现次数之和，
+        与 PredictionEngine.calculateAssociationScore 的计数方式相同
+
+    pairs / triples / transitions 中同一期内的重复号码（位置型彩种）只计一次，
+    weighted_pairs 按重复次数计
+    """
+
+    def __init__(self, lottery_type: str, field: str = 'red'):
+        self.lottery_type = lottery_type
+        self.field = field
+        self.low, high = NUMBER_RANGES[lottery_type][field]
+        self.size = high - self.low + 1
+        self.history_size = 0
+        self.last_issue: Optional[str] = None
+        self.previous = np.zeros(0, dtype=np.int64)
+
+        self.pairs = np.zeros((self.size, self.size), dtype=np.int32)
+        self.transitions = np.zeros((self.size, self.size), dtype=np.int32)
+        self.weighted_pairs = np.zeros((self.size, self.size), dtype=np.int32)
+        self._c1 = _binomial_table(self.size, 1)
+        self._c2 = _binomial_table(self.size, 2)
+        self._c3 = _binomial_table(self.size, 3)
+        self.triples = np.zeros(int(self._c3[self.size]), dtype=np.int32)
+        # 每期号码数 -> 三元组在该期号码中的位置，按期大小缓存
+        self._combination_cache: Dict[int, np.ndarray] = {}
+
+    def _counts(self, draw: dict) -> np.ndarray:
+        """该期各号码的出现次数（位置型彩种同一号码可出现多次），越界号码忽略"""
+        cols = [int(num) - self.low for num in draw.get(self.field, [])]
+        cols = np.array([col for col in cols if 0 <= col < self.size], dtype=np.int64)
+        return np.bincount(cols, minlength=self.size)
+
+    def _column(self, number) -> int:
+        col = int(number) - self.low
+        if not 0 <= col < self.size:
+            raise ValueError(f"号码超出范围: {number}")
+        return col
+
+    def triple_rank(self, a: np.ndarray, b: np.ndarray, c: np.ndarray) -> np.ndarray:
+        """升序三元组 (a < b < c) 的压缩编号"""
+        return self._c1[a] + self._c2[b] + self._c3[c]
+
+    def _triple_positions(self, count: int) -> np.ndarray:
+        positions = self._combination_cache.get(count)
+        if positions is None:
+            positions = np.array(list(combinations(range(count), 3)), dtype=np.int64).reshape(-1, 3)
+            self._combination_cache[count] = positions
+        return positions
+
+    def update(self, draw: dict):
+        """追加一期开奖数据（必须按时间顺序）"""
+        counts = self._counts(draw)
+        cols = np.flatnonzero(counts)
+        if len(cols):
+            self.pairs[np.ix_(cols, cols)] += 1
+            # 每行（出现的号码 i）加上该期各号码 j 的出现次数
+            self.weighted_pairs[np.ix_(cols, cols)] += counts[cols].astype(np.int32)
+            if len(cols) >= 3:
+                positions = self._triple_positions(len(cols))
+                ranks = self.triple_rank(cols[positions[:, 0]], cols[positions[:, 1]], cols[positions[:, 2]])
+                # 同一期内的编号互不相同，可以直接累加
+                self.triples[ranks] += 1
+        if len(self.previous) and len(cols):
+            self.transitions[np.ix_(self.previous, cols)] += 1
+
+        self.previous = cols
+        self.history_size += 1
+        if draw.get('issue'):
+            self.last_issue = str(draw['issue'])
+
+    def number(self, col: int) -> str:
+        return f"{col + self.low:02d}"
+
+    def _top(self, counts: np.ndarray, exclude: List[int], k: int) -> List[Tuple[str, int]]:
+        counts = counts.astype(np.int64)
+        counts[exclude] = -1
+        k = min(k, self.size - len(exclude))
+        if k <= 0:
+            return []
+        top = np.argpartition(-counts, k - 1)[:k]
+        top = top[np.argsort(-counts[top], kind='stable')]
+        return [(self.number(col), int(counts[col])) for col in top if counts[col] > 0]
+
+    def pair_count(self, a, b) -> int:
+        return int(self.pairs[self._column(a), self._column(b)])
+
+    def triple_count(self, a, b, c) -> int:
+        cols = sorted({self._column(a), self._column(b), self._column(c)})
+        if len(cols) < 3:
+            raise ValueError("三元组需要三个不同的号码")
+        return int(self.triples[self.triple_rank(*(np.int64(col) for col in cols))])
+
+    def top_partners(self, number, k: int = 10) -> List[Tuple[str, int]]:
+        """与 number 同时出现次数最多的 k 个号码"""
+        col = self._column(number)
+        return self._top(self.pairs[col], [col], k)
+
+    def top_third_partners(self, a, b, k: int = 10) -> List[Tuple[str, int]]:
+        """与号码对 (a, b) 同时出现次数最多的 k 个号码"""
+        col_a, col_b = sorted((self._column(a), self._column(b)))
+        if col_a == col_b:
+            raise ValueError("号码对需要两个不同的号码")
+        others = np.arange(self.size, dtype=np.int64)
+        # 三个下标排序后再编号，被排除的位置随后置为 -1
+        ordered = np.sort(np.stack([np.full(self.size, col_a), np.full(self.size, col_b), others]), axis=0)
+        valid = (ordered[0] < ordered[1]) & (ordered[1] < ordered[2])
+        ranks = self.triple_rank(ordered[0], ordered[1], ordered[2])
+        counts = np.where(valid, self.triples[np.where(valid, ranks, 0)], 0)
+        return self._top(counts, [col_a, col_b], k)
+
+    def top_successors(self, number, k: int = 10) -> List[Tuple[str, int]]:
+        """number 出现后，下一期出现次数最多的 k 个号码"""
+        return self._top(self.transitions[self._column(number)], [], k)
+
+    def association_scores(self) -> np.ndarray:
+        """
+        与 PredictionEngine.calculateAssociationScore 相同的关联得分（所有号码）
+
+        平均共现次数 = 与该号码共现过的号码的共现次数之和 / 这些号码的个数，
+        再除以期数，按 0.1 封顶归一化。共现次数与 App 一样按同期其他号码的出现次数累计
+        （位置型彩种的重复号码计多次）
+        """
+        if self.history_size == 0:
+            return np.zeros(self.size, dtype=np.float32)
+        off_diagonal = self.weighted_pairs.astype(np.int64)
+        np.fill_diagonal(off_diagonal, 0)
+        partners = (off_diagonal > 0).sum(axis=1)
+        average = np.where(partners > 0, off_diagonal.sum(axis=1) / np.maximum(partners, 1), 0.0)
+        return np.minimum(average / self.history_size / 0.1, 1.0).astype(np.float32)
+
+    def save(self, path: str):
+        meta = {
+            'format': INDEX_FORMAT,
+            'version': INDEX_VERSION,
+            'lottery_type': self.lottery_type,
+            'field': self.field,
+            'history_size': self.history_size,
+            'last_issue': self.last_issue,
+        }
+        output = Path(path)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        with open(output, 'wb') as f:
+            np.savez_compressed(
+                f,
+                meta=np.frombuffer(json.dumps(meta).encode('utf-8'), dtype=np.uint8),
+                pairs=self.pairs,
+                triples=self.triples,
+                transitions=self.transitions,
+                weighted_pairs=self.weighted_pairs,
+                previous=self.previous
+            )
+
+    @classmethod
+    def load(cls, path: str) -> 'CooccurrenceIndex':
+        with np.load(path) as data:
+            meta = json.loads(data['meta'].tobytes().decode('utf-8'))
+            if meta.get('format') != INDEX_FORMAT or meta.get('version') != INDEX_VERSION:
+                raise ValueError(f"不支持的共现索引版本: {meta.get('format')} v{meta.get('version')}")
+            index = cls(meta['lottery_type'], meta['field'])
+            if data['pairs'].shape != index.pairs.shape or data['triples'].shape != index.triples.shape:
+                raise ValueError("共现索引的号码范围与当前配置不一致")
+            index.pairs = data['pairs']
+            index.triples = data['triples']
+            index.transitions = data['transitions']
+            index.weighted_pairs = data['weighted_pairs']
+            index.previous = data['previous'].astype(np.int64)
+        index.history_size = meta['history_size']
+        index.last_issue = meta['last_issue']
+        return index
+
+    @classmethod
+    def build(cls, lottery_type: str, field: str, history_data) -> 'CooccurrenceIndex':
+        """从完整历史重建"""
+        index = cls(lottery_type, field)
+        for draw in sort_chronologically(history_data):
+            index.update(draw)
+        return index
+
+
+def update_index_file(path: str, lottery_type: str, field: str, history_data) -> CooccurrenceIndex:
+    """
+    更新共现索引文件
+
+    已有索引且与新数据衔接时只追加新的期次，否则从完整历史重建
+    """
+    chronological = sort_chronologically(history_data)
+
+    index = None
+    if Path(path).exists():
+        try:
+            index = CooccurrenceIndex.load(path)
+        except (ValueError, KeyError) as e:
+            print(f"  ⚠️  共现索引无法增量更新 ({e})，重新构建")
+
+    if index is not None and index.lottery_type == lottery_type and index.field == field and index.last_issue:
+        new_draws = draws_after(chronological, index.last_issue)
+        if new_draws is not None:
+            for draw in new_draws:
+                index.update(draw)
+            index.save(path)
+            print(f"  ✅ 共现索引增量更新 {len(new_draws)} 期: {path}")
+            return index
+        print("  ⚠️  共现索引与历史数据不衔接，重新构建")
+
+    index = CooccurrenceIndex.build(lottery_type, field, chronological)
+    index.save(path)
+    print(f"  ✅ 共现索引已重建 ({index.history_size} 期): {path}")
+    return index
+
+
+def print_ranking(title: str, ranking: List[Tuple[str, int]]):
+    print(f"\n{title}")
+    for number, count in ranking:
+        print(f"  {number}: {count}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='号码共现索引')
+    parser.add_argument('--lottery_type', type=str, default='ssq', choices=list(NUMBER_RANGES),
+                        help='彩票类型')
+    parser.add_argument('--field', type=str, default='red', choices=['red', 'blue'], help='号码颜色')
+    parser.add_argument('--history_file', type=str, default=None,
+                        help='历史数据文件（JSON 或 .lhb），指定时更新索引')
+    parser.add_argument('--output', type=str, default=None, help='索引文件路径（.npz）')
+    parser.add_argument('--index', type=str, default=None, help='只读查询的索引文件路径')
+    parser.add_argument('--query', type=str, default=None,
+                        help='查询号码，一个号码查共现和转移，"a,b" 查第三个号码')
+    parser.add_argument('--top', type=int, default=10, help='查询返回的号码数')
+
+    args = parser.parse_args()
+
+    if args.history_file:
+        if not args.output:
+            parser.error("更新索引需要 --output")
+        history_data = load_history_file(args.history_file)
+        index = update_index_file(args.output, args.lottery_type, args.field, history_data)
+    elif args.index or args.output:
+        index = CooccurrenceIndex.load(args.index or args.output)
+    else:
+        parser.error("需要 --history_file 或 --index")
+
+    print(f"\n📇 {index.lottery_type}/{index.field}: {index.history_size} 期, 最新期号 {index.last_issue}")
+    print(f"  三元组存储: {len(index.triples)} 项 ({index.triples.nbytes / 1024:.1f} KB)")
+
+    if args.query:
+        numbers = [item.strip() for item in args.query.split(',') if item.strip()]
+        if len(numbers) == 1:
+            print_ranking(f"🔗 与 {numbers[0]} 共现最多的号码:", index.top_partners(numbers[0], args.top))
+            print_ranking(f"➡️  {numbers[0]} 出现后下一期最常出现的号码:",
+                          index.top_successors(numbers[0], args.top))
+        elif len(numbers) == 2:
+            print_ranking(f"🔗 与 {numbers[0]}、{numbers[1]} 共现最多的号码:",
+                          index.top_third_partners(numbers[0], numbers[1], args.top))
+        else:
+            parser.error("--query 只支持一个或两个号码")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""
+本地开奖数据仓库
+
+使用 SQLite 持久化历史开奖数据，以 (彩票类型, 期号) 为主键，只追加不覆盖。
+配合 fetch_history_data.py 的增量同步，每次只需获取比本地最新期号更新的数据，
+并可随时导出为训练使用的 JSON 格式
+
+使用方法:
+    python fetch_history_data.py --lottery_type ssq --store data/draws.db --output history_ssq.json
+"""
+
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+def issue_sort_key(issue: str) -> Tuple[int, str]:
+    """期号排序键：先比长度再比字典序，等价于纯数字期号的数值比较"""
+    issue = str(issue)
+    return len(issue), issue
+
+
+class DrawStore:
+    """基于 SQLite 的开奖数据仓库"""
+
+    def __init__(self, db_path: str):
+        path = Path(db_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = str(path)
+        # 并发同步多个彩种时各线程独立连接，写锁等待时间放宽
+        self.conn = sqlite3.connect(self.db_path, timeout=30)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS draws (
+                lottery_type TEXT NOT NULL,
+                issue TEXT NOT NULL,
+                red TEXT NOT NULL,
+                blue TEXT NOT NULL,
+                date TEXT NOT NULL DEFAULT '',
+                fetched_at TEXT NOT NULL,
+                PRIMARY KEY (lottery_type, issue)
+            ) WITHOUT ROWID
+        """)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def latest_issue(self, lottery_type: str) -> Optional[str]:
+        """本地最新期号，没有数据时返回 None"""
+        row = self.conn.execute(
+            """
+            SELECT issue FROM draws WHERE lottery_type = ?
+            ORDER BY length(issue) DESC, issue DESC LIMIT 1
+            """,
+            (lottery_type,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def count(self, lottery_type: str) -> int:
+        """本地已存储期数"""
+        row = self.conn.execute(
+            "SELECT COUNT(*) FROM draws WHERE lottery_type = ?",
+            (lottery_type,)
+        ).fetchone()
+        return row[0]
+
+    def add_draws(self, lottery_type: str, draws: List[Dict]) -> int:
+        """
+        追加开奖数据（训练格式），已存在的期号会被忽略
+
+        Returns:
+            实际新增的期数
+        """
+        fetched_at = time.strftime('%Y-%m-%d %H:%M:%S')
+        rows = [
+            (
+                lottery_type,
+                str(item['issue']),
+                ' '.join(item['red']),
+                ' '.join(item['blue']),
+                item.get('date', ''),
+                fetched_at
+            )
+            for item in draws
+            if item.get('issue')
+        ]
+        before = self.conn.total_changes
+        self.conn.executemany(
+            """
+            INSERT OR IGNORE INTO draws (lottery_type, issue, red, blue, date, fetched_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            rows
+        )
+        self.conn.commit()
+        return self.conn.total_changes - before
+
+    def export_training_data(
+        self,
+        lottery_type: str,
+        limit: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        导出为训练格式（与 convert_to_training_format 相同，最新一期在前）
+
+        Args:
+            lottery_type: 彩票类型
+            limit: 只导出最新的若干期，None 表示全部
+        """
+        sql = """
+            SELECT issue, red, blue, date FROM draws WHERE lottery_type = ?
+            ORDER BY length(issue) DESC, issue DESC
+        """
+        params = [lottery_type]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        return [
+            {
+                'red': red.split(),
+                'blue': blue.split(),
+                'issue': issue,
+                'date': date
+            }
+            for issue, red, blue, date in self.conn.execute(sql, params)
+        ]
@@ -8,6 +8,9 @@
 
 使用方法:
     python fetch_history_data.py --lottery_type ssq --count 100 --output history_ssq.json
+    python fetch_history_data.py --lottery_type all --output data/history_{lottery_type}.json
+    python fetch_history_data.py --lottery_type ssq --store draws.db --output history_ssq.json --stats stats_ssq.json
+    python fetch_history_data.py --lottery_type ssq --output history_ssq.json --profile profile_fetch.json
 """
 
 import requests
@@ -15,11 +18,18 @@ import json
 import time
 import argparse
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import List, Dict, Optional
 
+from draw_store import DrawStore, issue_sort_key
+from history_binary import load_history_binary, save_history_binary
+from history_stats import update_stats_bundle
+from profiling import StageProfiler
+
 # API配置（使用项目的API）
-API_BASE_URL = "https://www.szxk365.com/api/openapi.lottery/"
+API_BASE_URL = os.getenv("LOTTERY_API_BASE_URL", "https://www.szxk365.com/api/openapi.lottery/")
 API_KEY = os.getenv("LOTTERY_API_KEY", "YOUR_API_KEY_HERE")  # 从环境变量读取API密钥
 
 # 彩票类型映射
@@ -75,15 +85,60 @@ LOTTERY_TYPES = {
 }
 
 
+class RateLimiter:
+    """线程安全的请求限速器（两次请求之间的最小间隔）"""
+    
+    def __init__(self, rate: float):
+        """
+        Args:
+            rate: 每秒最多请求数，<= 0 表示不限速
+        """
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_time = 0.0
+    
+    def acquire(self):
+        """阻塞直到允许发起下一次请求"""
+        if self.interval <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait_time = self._next_time - now
+            self._next_time = max(now, self._next_time) + self.interval
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+
 class LotteryDataFetcher:
-    """彩票数据获取器"""
+    """
+    彩票数据获取器
     
-    def __init__(self, api_key: str = API_KEY):
+    requests.Session 不保证线程安全，多彩种并发获取时每个线程使用自己的 Session
+    （各自复用 keep-alive 连接），限速器在线程间共享
+    """
+    
+    def __init__(
+        self,
+        api_key: str = API_KEY,
+        base_url: str = API_BASE_URL,
+        rate_limiter: Optional[RateLimiter] = None
+    ):
         self.api_key = api_key
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+        self.base_url = base_url if base_url.endswith('/') else base_url + '/'
+        self.rate_limiter = rate_limiter
+        self._local = threading.local()
+    
+    @property
+    def session(self) -> requests.Session:
+        """当前线程的 Session，首次使用时创建"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update({
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+            })
+            self._local.session = session
+        return session
     
     def fetch_history(
         self,
@@ -102,7 +157,7 @@ class LotteryDataFetcher:
         Returns:
             历史数据列表或None
         """
-        url = f"{API_BASE_URL}history"
+        url = f"{self.base_url}history"
         params = {
             'apikey': self.api_key,
             'code': lottery_code,
@@ -112,6 +167,8 @@ class LotteryDataFetcher:
         for attempt in range(retry):
             try:
                 print(f"  尝试 {attempt + 1}/{retry}: 请求 {count} 期数据...")
+                if self.rate_limiter:
+                    self.rate_limiter.acquire()
                 response = self.session.get(url, params=params, timeout=30)
                 response.raise_for_status()
                 
@@ -179,6 +236,249 @@ class LotteryDataFetcher:
         return training_data
 
 
+def sync_history(
+    fetcher: LotteryDataFetcher,
+    store: DrawStore,
+    lottery_type: str,
+    max_count: int = 100,
+    initial_size: int = 10,
+    retry: int = 3
+) -> Optional[Dict]:
+    """
+    增量同步历史数据到本地仓库
+    
+    本地已有数据时，从 initial_size 期开始请求，直到返回结果覆盖本地最新期号
+    （每次翻倍，最多 max_count 期），只写入比本地最新期号更新的数据。
+    请求到 max_count 期（或接口已无更多数据）仍未覆盖本地最新期号时，
+    本地最新期号与返回的最早期号之间的开奖缺失，仍写入新数据并打印警告
+    
+    Args:
+        fetcher: 数据获取器
+        store: 本地数据仓库
+        lottery_type: 彩票类型
+        max_count: 单次同步最多请求的期数
+        initial_size: 增量同步首次请求的期数
+        retry: 每次请求的重试次数
+    
+    Returns:
+        {'added': 新增期数, 'gap': None 或 {'after': 本地最新期号, 'before': 返回的最早期号}}，
+        获取失败时返回 None
+    """
+    config = LOTTERY_TYPES[lottery_type]
+    latest = store.latest_issue(lottery_type)
+    
+    if latest is None:
+        print(f"  本地无数据，首次同步 {max_count} 期")
+        size = max_count
+    else:
+        print(f"  本地最新期号: {latest} (共 {store.count(lottery_type)} 期)")
+        size = min(initial_size, max_count)
+    
+    while True:
+        raw_data = fetcher.fetch_history(config['code'], size, retry)
+        if not raw_data:
+            return None
+        
+        draws = fetcher.convert_to_training_format(raw_data, lottery_type)
+        if latest is None or size >= max_count or len(raw_data) < size:
+            break
+        # 返回结果已覆盖本地最新期号，说明没有遗漏
+        if any(issue_sort_key(item['issue']) <= issue_sort_key(latest) for item in draws):
+            break
+        size = min(size * 2, max_count)
+        print(f"  未覆盖本地最新期号，扩大请求到 {size} 期")
+    
+    new_draws = [
+        item for item in draws
+        if latest is None or issue_sort_key(item['issue']) > issue_sort_key(latest)
+    ]
+    gap = None
+    latest_key = None if latest is None else issue_sort_key(latest)
+    if draws and latest is not None and all(issue_sort_key(item['issue']) > latest_key for item in draws):
+        oldest = min((item['issue'] for item in draws), key=issue_sort_key)
+        gap = {'after': latest, 'before': oldest}
+        print(f"  ⚠️  请求 {len(raw_data)} 期仍未覆盖本地最新期号，第 {latest} 期与第 {oldest} 期之间的开奖缺失，"
+              f"可增大 --count 后重新同步")
+    
+    added = store.add_draws(lottery_type, new_draws)
+    print(f"  ✅ 新增 {added} 期，本地共 {store.count(lottery_type)} 期")
+    return {'added': added, 'gap': gap}
+
+
+def parse_lottery_types(value: str) -> List[str]:
+    """解析彩票类型参数：单个类型、逗号分隔的列表或 all"""
+    if value == 'all':
+        return list(LOTTERY_TYPES)
+    types = [item.strip() for item in value.split(',') if item.strip()]
+    unknown = [item for item in types if item not in LOTTERY_TYPES]
+    if not types or unknown:
+        raise ValueError(f"未知彩票类型: {', '.join(unknown) or value}")
+    return types
+
+
+def resolve_output(output: str, lottery_type: str, multiple: bool) -> str:
+    """
+    解析输出路径
+    
+    支持 {lottery_type} 占位符；多彩种且未使用占位符时，在文件名后追加彩票类型
+    """
+    if '{lottery_type}' in output:
+        return output.format(lottery_type=lottery_type)
+    if not multiple:
+        return output
+    path = Path(output)
+    return str(path.with_name(f"{path.stem}_{lottery_type}{path.suffix}"))
+
+
+def fetch_one(
+    fetcher: LotteryDataFetcher,
+    lottery_type: str,
+    count: int,
+    output_file: str,
+    store_path: Optional[str] = None,
+    retry: int = 3,
+    stats_file: Optional[str] = None,
+    profiler: Optional[StageProfiler] = None
+) -> Dict:
+    """
+    获取单个彩种并保存，供并发模式使用
+    
+    各阶段记录为 "<彩种>:<阶段>"，profiler 为 None 时不记录
+    
+    Returns:
+        汇总信息: 彩种、期数、新增期数、耗时、状态
+    """
+    config = LOTTERY_TYPES[lottery_type]
+    result = {
+        'lottery_type': lottery_type,
+        'name': config['name'],
+        'draws': 0,
+        'added': None,
+        'gap': None,
+        'seconds': 0.0,
+        'status': 'failed'
+    }
+    profiler = profiler or StageProfiler(enabled=False)
+    start = time.perf_counter()
+    try:
+        if store_path:
+            with DrawStore(store_path) as store:
+                with profiler.stage(f"{lottery_type}:sync_history"):
+                    synced = sync_history(fetcher, store, lottery_type, count, retry=retry)
+                if synced is None:
+                    return result
+                result['added'] = synced['added']
+                result['gap'] = synced['gap']
+                with profiler.stage(f"{lottery_type}:export_training_data"):
+                    training_data = store.export_training_data(lottery_type)
+        else:
+            with profiler.stage(f"{lottery_type}:fetch"):
+                raw_data = fetcher.fetch_history(config['code'], count, retry)
+            if not raw_data:
+                return result
+            with profiler.stage(f"{lottery_type}:convert_to_training_format"):
+                training_data = fetcher.convert_to_training_format(raw_data, lottery_type)
+        
+        with profiler.stage(f"{lottery_type}:validate_data"):
+            valid = validate_data(training_data, lottery_type)
+        if not valid:
+            result['status'] = 'invalid'
+            return result
+        
+        with profiler.stage(f"{lottery_type}:save_history"):
+            save_history(training_data, output_file)
+        if stats_file:
+            with profiler.stage(f"{lottery_type}:stats"):
+                update_stats_bundle(stats_file, lottery_type, training_data)
+        result['draws'] = len(training_data)
+        result['status'] = 'ok'
+    except Exception as e:
+        print(f"  ❌ {config['name']} 获取失败: {e}")
+    finally:
+        result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def fetch_many(
+    lottery_types: List[str],
+    count: int,
+    output: str,
+    api_key: str = API_KEY,
+    base_url: str = API_BASE_URL,
+    store_path: Optional[str] = None,
+    concurrency: int = 4,
+    rate_limit: float = 0.0,
+    retry: int = 3,
+    stats: Optional[str] = None,
+    profiler: Optional[StageProfiler] = None
+) -> List[Dict]:
+    """
+    并发获取多个彩种
+    
+    每个线程使用自己的 Session，所有线程共享限速器，每个彩种独立重试
+    
+    Args:
+        lottery_types: 彩票类型列表
+        count: 每个彩种获取期数
+        output: 输出路径（支持 {lottery_type} 占位符）
+        api_key: API Key
+        base_url: API 地址
+        store_path: 本地数据仓库路径，None 表示不使用增量同步
+        concurrency: 最大并发数
+        rate_limit: 每秒最多请求数，0 表示不限速
+        retry: 每个彩种的重试次数
+        stats: 统计数据包路径（支持 {lottery_type} 占位符），None 表示不生成
+        profiler: 阶段剖析器（各线程共用）
+    
+    Returns:
+        按输入顺序排列的汇总信息列表
+    """
+    concurrency = max(1, min(concurrency, len(lottery_types)))
+    fetcher = LotteryDataFetcher(api_key, base_url, rate_limiter=RateLimiter(rate_limit))
+    multiple = len(lottery_types) > 1
+    
+    results = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {
+            executor.submit(
+                fetch_one,
+                fetcher,
+                lottery_type,
+                count,
+                resolve_output(output, lottery_type, multiple),
+                store_path,
+                retry,
+                resolve_output(stats, lottery_type, multiple) if stats else None,
+                profiler
+            ): lottery_type
+            for lottery_type in lottery_types
+        }
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+    
+    return [results[lottery_type] for lottery_type in lottery_types]
+
+
+def print_summary(results: List[Dict]):
+    """打印多彩种获取汇总表"""
+    print("\n" + "="*60)
+    print("📊 获取汇总")
+    print("="*60)
+    print(f"{'彩种':<8}{'名称':<8}{'期数':>8}{'新增':>8}{'耗时(s)':>10}  状态")
+    print("-"*60)
+    for item in results:
+        added = '-' if item['added'] is None else str(item['added'])
+        status = '✅' if item['status'] == 'ok' else f"❌ {item['status']}"
+        if item.get('gap'):
+            status += f" ⚠️ {item['gap']['after']} 与 {item['gap']['before']} 之间缺失"
+        print(f"{item['lottery_type']:<8}{item['name']:<8}{item['draws']:>8}{added:>8}"
+              f"{item['seconds']:>10.2f}  {status}")
+    print("-"*60)
+    total = sum(item['draws'] for item in results)
+    ok = sum(1 for item in results if item['status'] == 'ok')
+    print(f"成功 {ok}/{len(results)} 个彩种，共 {total} 期")
+
+
 def save_to_json(data: List[Dict], output_file: str):
     """保存为JSON文件"""
     output_path = Path(output_file)
@@ -196,6 +496,19 @@ def save_to_json(data: List[Dict], output_file: str):
     print(f"   文件大小: {output_path.stat().st_size / 1024:.2f} KB")
 
 
+def save_history(data: List[Dict], output_file: str):
+    """根据扩展名保存历史数据：.lhb 为二进制格式，其他为 JSON"""
+    if Path(output_file).suffix != '.lhb':
+        save_to_json(data, output_file)
+        return
+    
+    save_history_binary(data, output_file)
+    output_path = Path(output_file)
+    print(f"\n✅ 数据已保存到: {output_path}")
+    print(f"   总期数: {len(data)}")
+    print(f"   文件大小: {output_path.stat().st_size / 1024:.2f} KB")
+
+
 def load_from_json(input_file: str) -> Optional[List[Dict]]:
     """从JSON文件加载数据"""
     try:
@@ -237,47 +550,99 @@ def validate_data(data: List[Dict], lottery_type: str) -> bool:
     return True
 
 
-def main():
-    parser = argparse.ArgumentParser(description='获取彩票历史数据')
-    parser.add_argument('--lottery_type', type=str, default='ssq', 
-                       choices=['ssq', 'dlt', 'qlc', 'fc3d', 'qxc', 'pl3', 'pl5', 'kl8'],
-                       help='彩票类型')
-    parser.add_argument('--count', type=int, default=100, 
-                       help='获取期数（推荐100-200期）')
-    parser.add_argument('--output', type=str, default='history.json',
-                       help='输出文件路径')
-    parser.add_argument('--api_key', type=str, default=API_KEY,
-                       help='API Key')
-    parser.add_argument('--validate_only', action='store_true',
-                       help='仅验证现有文件，不获取新数据')
-    
-    args = parser.parse_args()
-    
-    print("="*60)
-    print("📥 彩票历史数据获取")
-    print("="*60)
-    
+def run(args, lottery_types: List[str], profiler: StageProfiler):
+    """执行验证 / 多彩种并发获取 / 单彩种获取"""
     if args.validate_only:
         # 验证模式
-        print(f"验证文件: {args.output}")
-        data = load_from_json(args.output)
-        if data:
-            validate_data(data, args.lottery_type)
+        for lottery_type in lottery_types:
+            output_file = resolve_output(args.output, lottery_type, len(lottery_types) > 1)
+            print(f"验证文件: {output_file}")
+            if Path(output_file).suffix == '.lhb':
+                data = load_history_binary(output_file)
+            else:
+                data = load_from_json(output_file)
+            if data:
+                validate_data(data, lottery_type)
         return
     
+    if len(lottery_types) > 1:
+        # 多彩种并发模式
+        print(f"彩票类型: {', '.join(lottery_types)}")
+        print(f"获取期数: {args.count}")
+        print(f"并发数: {args.concurrency}, 限速: {args.rate_limit} 次/秒")
+        print("="*60)
+        
+        if args.export_only and args.store:
+            with DrawStore(args.store) as store:
+                for lottery_type in lottery_types:
+                    training_data = store.export_training_data(lottery_type)
+                    save_history(training_data, resolve_output(args.output, lottery_type, True))
+                    if args.stats:
+                        update_stats_bundle(resolve_output(args.stats, lottery_type, True),
+                                            lottery_type, training_data)
+            return
+        
+        results = fetch_many(
+            lottery_types,
+            args.count,
+            args.output,
+            api_key=args.api_key,
+            base_url=args.base_url,
+            store_path=args.store,
+            concurrency=args.concurrency,
+            rate_limit=args.rate_limit,
+            retry=args.retry,
+            stats=args.stats,
+            profiler=profiler
+        )
+        print_summary(results)
+        return
+    
+    args.lottery_type = lottery_types[0]
+    
     # 获取模式
     config = LOTTERY_TYPES[args.lottery_type]
     print(f"彩票类型: {config['name']} ({config['code']})")
     print(f"获取期数: {args.count}")
     print(f"输出文件: {args.output}")
+    print(f"限速: {args.rate_limit} 次/秒")
     print("="*60)
     
-    # 创建获取器
-    fetcher = LotteryDataFetcher(args.api_key)
+    # 创建获取器（增量同步可能多次请求，同样限速）
+    fetcher = LotteryDataFetcher(args.api_key, args.base_url, rate_limiter=RateLimiter(args.rate_limit))
+    
+    if args.store:
+        # 增量同步模式
+        with DrawStore(args.store) as store:
+            if not args.export_only:
+                print(f"\n📡 增量同步到本地仓库: {args.store}")
+                with profiler.stage('sync_history'):
+                    synced = sync_history(fetcher, store, args.lottery_type, args.count,
+                                          retry=args.retry)
+                if synced is None:
+                    print("\n❌ 同步数据失败")
+                    return
+            with profiler.stage('export_training_data'):
+                training_data = store.export_training_data(args.lottery_type)
+        
+        print("\n🔍 验证数据格式...")
+        with profiler.stage('validate_data'):
+            valid = validate_data(training_data, args.lottery_type)
+        if not valid:
+            return
+        
+        print("\n💾 导出数据...")
+        with profiler.stage('save_history'):
+            save_history(training_data, args.output)
+        if args.stats:
+            with profiler.stage('stats'):
+                update_stats_bundle(args.stats, args.lottery_type, training_data)
+        return
     
     # 获取数据
     print("\n📡 开始获取数据...")
-    raw_data = fetcher.fetch_history(config['code'], args.count)
+    with profiler.stage('fetch'):
+        raw_data = fetcher.fetch_history(config['code'], args.count, args.retry)
     
     if not raw_data:
         print("\n❌ 获取数据失败")
@@ -290,7 +655,8 @@ def main():
     # 转换格式
     print("\n🔄 转换数据格式...")
     try:
-        training_data = fetcher.convert_to_training_format(raw_data, args.lottery_type)
+        with profiler.stage('convert_to_training_format'):
+            training_data = fetcher.convert_to_training_format(raw_data, args.lottery_type)
         
         if not training_data:
             print("❌ 数据转换失败：没有有效数据")
@@ -304,12 +670,19 @@ def main():
     
     # 验证数据
     print("\n🔍 验证数据格式...")
-    if not validate_data(training_data, args.lottery_type):
+    with profiler.stage('validate_data'):
+        valid = validate_data(training_data, args.lottery_type)
+    if not valid:
         return
     
     # 保存数据
     print("\n💾 保存数据...")
-    save_to_json(training_data, args.output)
+    with profiler.stage('save_history'):
+        save_history(training_data, args.output)
+    if args.stats:
+        print("\n📊 更新统计数据包...")
+        with profiler.stage('stats'):
+            update_stats_bundle(args.stats, args.lottery_type, training_data)
     
     # 显示示例
     print("\n📋 数据示例 (最近3期):")
@@ -324,6 +697,59 @@ def main():
     print(f"  python train_lstm_model.py --history_file {args.output} --lottery_type {args.lottery_type}")
 
 
+def main():
+    parser = argparse.ArgumentParser(description='获取彩票历史数据')
+    parser.add_argument('--lottery_type', type=str, default='ssq', 
+                       help='彩票类型 (ssq, dlt, qlc, fc3d, qxc, pl3, pl5, kl8)，'
+                            '多个用逗号分隔，all 表示全部')
+    parser.add_argument('--count', type=int, default=100, 
+                       help='获取期数（推荐100-200期）')
+    parser.add_argument('--output', type=str, default='history.json',
+                       help='输出文件路径（.lhb 为二进制格式；多彩种时支持 {lottery_type} 占位符）')
+    parser.add_argument('--api_key', type=str, default=API_KEY,
+                       help='API Key')
+    parser.add_argument('--validate_only', action='store_true',
+                       help='仅验证现有文件，不获取新数据')
+    parser.add_argument('--base_url', type=str, default=API_BASE_URL,
+                       help='API 地址（可指向本地测试服务）')
+    parser.add_argument('--store', type=str, default=None,
+                       help='本地 SQLite 数据仓库路径，启用增量同步')
+    parser.add_argument('--export_only', action='store_true',
+                       help='仅从本地仓库导出 JSON，不请求 API（需配合 --store）')
+    parser.add_argument('--concurrency', type=int, default=4,
+                       help='多彩种并发数')
+    parser.add_argument('--rate_limit', type=float, default=2.0,
+                       help='每秒最多请求数，多彩种并发时所有线程共用（0 表示不限速）')
+    parser.add_argument('--retry', type=int, default=3,
+                       help='每个彩种的重试次数')
+    parser.add_argument('--stats', type=str, default=None,
+                       help='统计数据包路径，保存数据后增量更新（多彩种时支持 {lottery_type} 占位符）')
+    parser.add_argument('--profile', type=str, default=None,
+                       help='记录各阶段耗时/内存并保存为 JSON（如 profile_fetch.json）')
+    parser.add_argument('--chrome_trace', type=str, default=None,
+                       help='同时导出 Chrome Trace 文件（chrome://tracing 打开）')
+    
+    args = parser.parse_args()
+    
+    try:
+        lottery_types = parse_lottery_types(args.lottery_type)
+    except ValueError as e:
+        parser.error(str(e))
+    
+    print("="*60)
+    print("📥 彩票历史数据获取")
+    print("="*60)
+    
+    profiler = StageProfiler(
+        enabled=bool(args.profile or args.chrome_trace),
+        name=f"fetch_history_data {args.lottery_type}"
+    )
+    try:
+        run(args, lottery_types, profiler)
+    finally:
+        profiler.save(args.profile, args.chrome_trace)
+
+
 if __name__ == '__main__':
     main()
 
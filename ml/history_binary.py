@@ -0,0 +1,301 @@
+"""
+历史数据二进制格式 (.lhb)
+
+将开奖号码保存为 uint8 矩阵，期号和日期保存为定长字节列，
+文件可直接内存映射打开，无需 JSON 解析和字符串转整数。
+与 fetch_history_data.py 输出的 JSON 格式可以无损互相转换
+
+文件布局:
+    magic (4 字节 b'LHB1') | 头部长度 (uint32, 小端) | JSON 头部 | 64 字节对齐的列数据
+
+只有部分记录有期号/日期时，另存 issue_present / date_present 列记录每条是否有该字段
+
+依赖:
+    pip install numpy
+
+使用方法:
+    python history_binary.py --input history_ssq.json --output history_ssq.lhb
+    python history_binary.py --input history_ssq.lhb --output history_ssq.json
+"""
+
+import argparse
+import json
+import struct
+import time
+from pathlib import Path
+from typing import List, Optional, Union
+
+import numpy as np
+
+MAGIC = b'LHB1'
+FORMAT_VERSION = 2
+# 版本 1 没有 *_present 列，期号/日期要么全有要么全无
+SUPPORTED_VERSIONS = (1, 2)
+ALIGNMENT = 64
+# 可无损保存的字段
+FIELDS = ('red', 'blue', 'issue', 'date')
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _number_width(history_data: List[dict], field: str) -> int:
+    """号码字符串的补零宽度，要求同一字段宽度一致以保证无损转换"""
+    widths = {len(num) for item in history_data for num in item[field]}
+    if len(widths) > 1:
+        raise ValueError(f"{field} 号码宽度不一致: {sorted(widths)}，无法无损转换")
+    return widths.pop() if widths else 2
+
+
+def _number_matrix(history_data: List[dict], field: str, width: int) -> np.ndarray:
+    """将号码字符串转换为 uint8 矩阵 (n_draws, numbers_per_draw)"""
+    counts = {len(item[field]) for item in history_data}
+    if len(counts) > 1:
+        raise ValueError(f"{field} 每期号码数量不一致: {sorted(counts)}")
+    per_draw = counts.pop() if counts else 0
+
+    matrix = np.zeros((len(history_data), per_draw), dtype=np.uint8)
+    for i, item in enumerate(history_data):
+        for j, num in enumerate(item[field]):
+            value = int(num)
+            if not 0 <= value <= 255 or f"{value:0{width}d}" != num:
+                raise ValueError(f"第 {i + 1} 条数据号码 {num!r} 无法无损转换")
+            matrix[i, j] = value
+    return matrix
+
+
+def _string_column(history_data: List[dict], key: str) -> np.ndarray:
+    values = []
+    for i, item in enumerate(history_data):
+        value = item.get(key, '')
+        if not isinstance(value, str):
+            raise ValueError(f"第 {i + 1} 条数据 {key} 不是字符串: {value!r}，无法无损转换")
+        values.append(value.encode('utf-8'))
+    width = max((len(value) for value in values), default=0)
+    return np.array(values, dtype=f'S{max(width, 1)}')
+
+
+def _presence(history_data: List[dict], key: str) -> Optional[np.ndarray]:
+    """只有部分记录有 key 字段时返回每条记录是否有该字段 (uint8)，全有或全无时返回 None"""
+    present = np.array([key in item for item in history_data], dtype=np.uint8)
+    if present.all() or not present.any():
+        return None
+    return present
+
+
+def save_history_binary(
+    history_data: List[dict],
+    output_file: str,
+    created_at: Optional[str] = None
+):
+    """
+    保存为二进制格式
+
+    Args:
+        history_data: 训练格式的历史数据列表
+        output_file: 输出文件路径
+        created_at: 创建时间，默认当前时间
+    """
+    for i, item in enumerate(history_data):
+        unknown = set(item) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"第 {i + 1} 条数据包含无法保存的字段: {sorted(unknown)}")
+
+    red_width = _number_width(history_data, 'red')
+    blue_width = _number_width(history_data, 'blue')
+    columns = {
+        'red': _number_matrix(history_data, 'red', red_width),
+        'blue': _number_matrix(history_data, 'blue', blue_width),
+        'issue': _string_column(history_data, 'issue'),
+        'date': _string_column(history_data, 'date'),
+    }
+    for key in ('issue', 'date'):
+        present = _presence(history_data, key)
+        if present is not None:
+            columns[f"{key}_present"] = present
+
+    header = {
+        'version': FORMAT_VERSION,
+        'count': len(history_data),
+        'created_at': created_at or time.strftime('%Y-%m-%d %H:%M:%S'),
+        'red_width': red_width,
+        'blue_width': blue_width,
+        # 原始数据没有期号/日期字段时，转换回 JSON 时也不输出（部分记录有时见 *_present 列）
+        'has_issue': any('issue' in item for item in history_data),
+        'has_date': any('date' in item for item in history_data),
+        'columns': {}
+    }
+
+    # 先计算头部长度再确定列偏移，偏移量位数变化时重新计算
+    header_size = 0
+    while True:
+        offset = _align(len(MAGIC) + 4 + header_size)
+        for name, array in columns.items():
+            header['columns'][name] = {
+                'dtype': array.dtype.str,
+                'shape': list(array.shape),
+                'offset': offset
+            }
+            offset = _align(offset + array.nbytes)
+        header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+        if len(header_bytes) == header_size:
+            break
+        header_size = len(header_bytes)
+
+    output_path = Path(output_file)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<I', len(header_bytes)))
+        f.write(header_bytes)
+        for name, array in columns.items():
+            f.seek(header['columns'][name]['offset'])
+            f.write(np.ascontiguousarray(array).tobytes())
+        f.truncate(offset)
+
+
+class HistoryArchive:
+    """
+    内存映射的二进制历史数据
+
+    red/blue 为 uint8 号码矩阵，issues/dates 为定长字节列，均按需从文件映射
+    """
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        with open(self.path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"不是有效的历史数据二进制文件: {path}")
+            (header_size,) = struct.unpack('<I', f.read(4))
+            self.header = json.loads(f.read(header_size).decode('utf-8'))
+
+        if self.header['version'] not in SUPPORTED_VERSIONS:
+            raise ValueError(f"不支持的格式版本: {self.header['version']}")
+
+        self.red = self._column('red')
+        self.blue = self._column('blue')
+        self.issues = self._column('issue')
+        self.dates = self._column('date')
+        columns = self.header['columns']
+        self.issue_present = self._column('issue_present') if 'issue_present' in columns else None
+        self.date_present = self._column('date_present') if 'date_present' in columns else None
+
+    def _column(self, name: str) -> np.ndarray:
+        spec = self.header['columns'][name]
+        shape = tuple(spec['shape'])
+        dtype = np.dtype(spec['dtype'])
+        if int(np.prod(shape)) == 0:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(self.path, dtype=dtype, mode='r', offset=spec['offset'], shape=shape)
+
+    @property
+    def created_at(self) -> str:
+        return self.header['created_at']
+
+    def __len__(self) -> int:
+        return self.header['count']
+
+    def _item(self, index: int) -> dict:
+        red_width = self.header['red_width']
+        blue_width = self.header['blue_width']
+        item = {
+            'red': [f"{num:0{red_width}d}" for num in self.red[index].tolist()],
+            'blue': [f"{num:0{blue_width}d}" for num in self.blue[index].tolist()],
+        }
+        if self.header['has_issue'] and (self.issue_present is None or self.issue_present[index]):
+            item['issue'] = self.issues[index].decode('utf-8')
+        if self.header['has_date'] and (self.date_present is None or self.date_present[index]):
+            item['date'] = self.dates[index].decode('utf-8')
+        return item
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[dict, List[dict]]:
+        if isinstance(index, slice):
+            return [self._item(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self._item(index)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._item(i)
+
+    def one_hot(self, field: str, num_classes: int, dtype=np.float32) -> np.ndarray:
+        """
+        直接从号码矩阵生成 one-hot 矩阵 (n_draws, num_classes)
+
+        号码 n 对应第 n-1 列，与 history_dataset.encode_draws 一致
+        """
+        numbers = self.red if field == 'red' else self.blue
+        matrix = np.zeros((len(self), num_classes), dtype=dtype)
+        if numbers.size:
+            rows = np.repeat(np.arange(len(self)), numbers.shape[1])
+            matrix[rows, numbers.reshape(-1).astype(np.int64) - 1] = 1
+        return matrix
+
+    def to_training_data(self) -> List[dict]:
+        """转换为训练格式的数据列表"""
+        return list(self)
+
+
+def load_history_binary(input_file: str) -> HistoryArchive:
+    """内存映射打开二进制历史数据"""
+    return HistoryArchive(input_file)
+
+
+def json_to_binary(input_file: str, output_file: str) -> int:
+    """JSON 转二进制，返回期数"""
+    with open(input_file, 'r', encoding='utf-8') as f:
+        raw = json.load(f)
+    if isinstance(raw, dict) and 'data' in raw:
+        history_data, created_at = raw['data'], raw.get('created_at')
+    elif isinstance(raw, list):
+        history_data, created_at = raw, None
+    else:
+        raise ValueError("不支持的 JSON 格式")
+
+    save_history_binary(history_data, output_file, created_at)
+    return len(history_data)
+
+
+def binary_to_json(input_file: str, output_file: str) -> int:
+    """二进制转 JSON（与 save_to_json 输出格式一致），返回期数"""
+    archive = load_history_binary(input_file)
+    data = archive.to_training_data()
+
+    output_path = Path(output_file)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'data': data,
+            'count': len(data),
+            'created_at': archive.created_at
+        }, f, ensure_ascii=False, indent=2)
+    return len(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='历史数据 JSON 与二进制格式互相转换')
+    parser.add_argument('--input', type=str, required=True, help='输入文件（.json 或 .lhb）')
+    parser.add_argument('--output', type=str, required=True, help='输出文件（.json 或 .lhb）')
+
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if Path(args.output).suffix == '.json':
+        count = binary_to_json(args.input, args.output)
+    else:
+        count = json_to_binary(args.input, args.output)
+    elapsed = time.perf_counter() - start
+
+    input_size = Path(args.input).stat().st_size
+    output_size = Path(args.output).stat().st_size
+    print(f"✅ 已转换 {count} 期: {args.input} -> {args.output}")
+    print(f"   文件大小: {input_size / 1024:.2f} KB -> {output_size / 1024:.2f} KB")
+    print(f"   耗时: {elapsed * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
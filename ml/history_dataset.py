@@ -0,0 +1,135 @@
+"""
+历史数据集构建工具
+
+将开奖历史一次性编码为紧凑的 one-hot 矩阵 (n_draws, num_classes)，
+再用滑动窗口视图生成训练序列，避免逐窗口重复编码和复制
+
+依赖:
+    pip install numpy
+"""
+
+import json
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from draw_store import issue_sort_key
+from history_binary import load_history_binary
+
+
+def load_history_file(file_path: str):
+    """
+    加载历史数据（不依赖 TensorFlow）
+
+    .lhb 返回内存映射的 HistoryArchive，其他按 JSON 处理并返回数据列表
+    """
+    if Path(file_path).suffix == '.lhb':
+        return load_history_binary(file_path)
+
+    with open(file_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    if isinstance(data, dict) and 'data' in data:
+        return data['data']
+    elif isinstance(data, list):
+        return data
+    else:
+        raise ValueError("不支持的 JSON 格式")
+
+
+def encode_draws(
+    history_data: List[dict],
+    field: str,
+    num_classes: int,
+    dtype=np.float32
+) -> np.ndarray:
+    """
+    将开奖号码编码为 one-hot 矩阵
+
+    每期只编码一次，号码 n 对应第 n-1 列（与 prepare_data 原有规则一致，
+    重复号码只置 1 一次，大于 num_classes 的号码抛出 IndexError）
+
+    Args:
+        history_data: 历史开奖数据列表，或 history_binary.HistoryArchive
+        field: 号码字段 ('red' 或 'blue')
+        num_classes: 号码总数
+        dtype: 矩阵元素类型（float32 或 uint8）；原 prepare_data 为 float64，
+            取值相同，默认 float32 与 Keras 训练使用的类型一致
+
+    Returns:
+        形状为 (n_draws, num_classes) 的矩阵
+    """
+    # 二进制格式直接使用 uint8 号码矩阵，跳过字符串解析
+    if hasattr(history_data, 'one_hot'):
+        return history_data.one_hot(field, num_classes, dtype)
+
+    matrix = np.zeros((len(history_data), num_classes), dtype=dtype)
+    counts = [len(item[field]) for item in history_data]
+    if sum(counts) == 0:
+        return matrix
+
+    rows = np.repeat(np.arange(len(history_data)), counts)
+    cols = np.fromiter(
+        (int(num) - 1 for item in history_data for num in item[field]),
+        dtype=np.int64,
+        count=len(rows)
+    )
+    matrix[rows, cols] = 1
+    return matrix
+
+
+def sliding_windows(
+    matrix: np.ndarray,
+    sequence_length: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    基于 one-hot 矩阵生成滑动窗口序列和目标
+
+    返回的均为原矩阵的视图，不复制数据
+
+    Args:
+        matrix: 形状为 (n_draws, num_classes) 的 one-hot 矩阵
+        sequence_length: 序列长度
+
+    Returns:
+        X: (n_windows, sequence_length, num_classes)
+        y: (n_windows, num_classes)
+    """
+    num_windows = matrix.shape[0] - sequence_length
+    if num_windows <= 0:
+        empty = matrix[:0]
+        return (
+            np.empty((0, sequence_length, matrix.shape[1]), dtype=matrix.dtype),
+            empty
+        )
+
+    # sliding_window_view 的窗口维在最后，转置为 (n, seq, classes)
+    windows = np.lib.stride_tricks.sliding_window_view(
+        matrix[:-1], sequence_length, axis=0
+    ).transpose(0, 2, 1)
+    return windows, matrix[sequence_length:]
+
+
+def sort_chronologically(history_data) -> List[dict]:
+    """
+    按期号升序排列（最早一期在前）
+
+    没有期号时假定数据与 API 返回一致为最新一期在前，直接反转
+    """
+    history = list(history_data)
+    if history and all(item.get('issue') for item in history):
+        return sorted(history, key=lambda item: issue_sort_key(item['issue']))
+    return history[::-1]
+
+
+def draws_after(chronological: List[dict], last_issue: str) -> Optional[List[dict]]:
+    """
+    返回期号晚于 last_issue 的开奖数据，用于增量更新
+
+    chronological 中不包含 last_issue（与已处理的数据之间可能有缺口）时返回 None
+    """
+    if not any(str(item.get('issue', '')) == last_issue for item in chronological):
+        return None
+    last_key = issue_sort_key(last_issue)
+    return [item for item in chronological if issue_sort_key(item.get('issue', '')) > last_key]
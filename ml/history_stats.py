@@ -0,0 +1,229 @@
+"""
+历史统计数据包
+
+在获取历史数据时同步维护一份带版本号的统计数据包（JSON），包含各号码的出现次数、
+当前遗漏、最大遗漏，以及最近 10 期 / 之前 10 期的出现次数
+（与 AnalysisEngine / PredictionEngine.precomputeSharedData 使用的聚合一致）。
+新开奖数据到达时按期增量更新，每期只处理该期的号码，无需重新扫描历史
+
+依赖:
+    pip install numpy
+
+使用方法:
+    python fetch_history_data.py --lottery_type ssq --output history_ssq.json --stats stats_ssq.json
+    python history_stats.py --lottery_type ssq --history_file history_ssq.json --output stats_ssq.json
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from batch_scorer import NUMBER_RANGES
+from history_dataset import draws_after, load_history_file, sort_chronologically
+
+STATS_FORMAT = 'lottery-stats'
+STATS_VERSION = 1
+
+# 与 PredictionEngine.precomputeSharedData 的 recentHistory / olderHistory 一致
+RECENT_WINDOW = 10
+
+
+class HistoryStats:
+    """
+    可增量更新的历史统计
+
+    出现次数按号码计数（含同一期的重复号码），遗漏按"是否出现"计算。
+    last_seen 记录每个号码最后出现的期序号，max_gap 记录已结束的最长遗漏，
+    当前遗漏和最大遗漏在导出时由这两者得出
+    """
+
+    def __init__(self, lottery_type: str):
+        self.lottery_type = lottery_type
+        self.ranges = NUMBER_RANGES[lottery_type]
+        self.history_size = 0
+        self.last_issue: Optional[str] = None
+        self.frequency = {color: [0] * self._size(color) for color in self.ranges}
+        self.last_seen = {color: [-1] * self._size(color) for color in self.ranges}
+        self.max_gap = {color: [0] * self._size(color) for color in self.ranges}
+        # 最近 2 * RECENT_WINDOW 期（最新一期在前），用于维护最近/之前窗口
+        self.window: List[dict] = []
+        self.recent_frequency = {color: [0] * self._size(color) for color in self.ranges}
+        self.older_frequency = {color: [0] * self._size(color) for color in self.ranges}
+
+    def _size(self, color: str) -> int:
+        low, high = self.ranges[color]
+        return high - low + 1
+
+    def _columns(self, draw: dict, color: str) -> List[int]:
+        """一期中该颜色号码对应的下标（去重），范围外的号码忽略"""
+        low, _ = self.ranges[color]
+        size = self._size(color)
+        return sorted({int(num) - low for num in draw.get(color, []) if 0 <= int(num) - low < size})
+
+    def _shift_window(self, draw: dict, sign: int, target: Dict[str, List[int]]):
+        for color in self.ranges:
+            for col in self._columns(draw, color):
+                target[color][col] += sign
+
+    def update(self, draw: dict):
+        """追加一期开奖数据（必须按时间顺序），复杂度 O(该期号码数)"""
+        index = self.history_size
+        for color in self.ranges:
+            low, _ = self.ranges[color]
+            size = self._size(color)
+            for num in draw.get(color, []):
+                col = int(num) - low
+                if 0 <= col < size:
+                    self.frequency[color][col] += 1
+            for col in self._columns(draw, color):
+                gap = index - self.last_seen[color][col] - 1
+                if gap > self.max_gap[color][col]:
+                    self.max_gap[color][col] = gap
+                self.last_seen[color][col] = index
+
+        # 新一期进入最近窗口，最近窗口末尾一期移入之前窗口，之前窗口末尾一期移出
+        self._shift_window(draw, 1, self.recent_frequency)
+        self.window.insert(0, {color: list(draw.get(color, [])) for color in self.ranges})
+        if len(self.window) > RECENT_WINDOW:
+            moved = self.window[RECENT_WINDOW]
+            self._shift_window(moved, -1, self.recent_frequency)
+            self._shift_window(moved, 1, self.older_frequency)
+        if len(self.window) > 2 * RECENT_WINDOW:
+            dropped = self.window.pop()
+            self._shift_window(dropped, -1, self.older_frequency)
+
+        self.history_size += 1
+        if draw.get('issue'):
+            self.last_issue = str(draw['issue'])
+
+    def current_omission(self, color: str) -> List[int]:
+        return [self.history_size - 1 - seen for seen in self.last_seen[color]]
+
+    def max_omission(self, color: str) -> List[int]:
+        return [max(gap, current) for gap, current in zip(self.max_gap[color], self.current_omission(color))]
+
+    def to_dict(self) -> dict:
+        colors = {}
+        for color, (low, high) in self.ranges.items():
+            colors[color] = {
+                'range': [low, high],
+                'frequency': self.frequency[color],
+                'current_omission': self.current_omission(color),
+                'max_omission': self.max_omission(color),
+                'recent_frequency': self.recent_frequency[color],
+                'older_frequency': self.older_frequency[color],
+                # 增量更新所需的内部状态
+                'last_seen': self.last_seen[color],
+                'max_gap': self.max_gap[color],
+            }
+        return {
+            'format': STATS_FORMAT,
+            'version': STATS_VERSION,
+            'lottery_type': self.lottery_type,
+            'history_size': self.history_size,
+            'last_issue': self.last_issue,
+            'updated_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'recent_window': RECENT_WINDOW,
+            'recent_size': min(len(self.window), RECENT_WINDOW),
+            'older_size': max(len(self.window) - RECENT_WINDOW, 0),
+            'window': self.window,
+            'colors': colors,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'HistoryStats':
+        if data.get('format') != STATS_FORMAT or data.get('version') != STATS_VERSION:
+            raise ValueError(f"不支持的统计数据包版本: {data.get('format')} v{data.get('version')}")
+        if data.get('recent_window') != RECENT_WINDOW:
+            raise ValueError(f"统计窗口大小不一致: {data.get('recent_window')}")
+
+        stats = cls(data['lottery_type'])
+        stats.history_size = data['history_size']
+        stats.last_issue = data['last_issue']
+        stats.window = data['window']
+        for color, entry in data['colors'].items():
+            stats.frequency[color] = entry['frequency']
+            stats.last_seen[color] = entry['last_seen']
+            stats.max_gap[color] = entry['max_gap']
+            stats.recent_frequency[color] = entry['recent_frequency']
+            stats.older_frequency[color] = entry['older_frequency']
+        return stats
+
+    @classmethod
+    def build(cls, lottery_type: str, history_data) -> 'HistoryStats':
+        """从完整历史重建"""
+        stats = cls(lottery_type)
+        for draw in sort_chronologically(history_data):
+            stats.update(draw)
+        return stats
+
+
+def load_stats(stats_file: str) -> Optional[HistoryStats]:
+    try:
+        with open(stats_file, 'r', encoding='utf-8') as f:
+            return HistoryStats.from_dict(json.load(f))
+    except FileNotFoundError:
+        return None
+
+
+def save_stats(stats: HistoryStats, stats_file: str):
+    path = Path(stats_file)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(stats.to_dict(), f, ensure_ascii=False)
+
+
+def update_stats_bundle(stats_file: str, lottery_type: str, history_data) -> HistoryStats:
+    """
+    更新统计数据包
+
+    已有数据包且与新数据衔接时，只追加比 last_issue 更新的期次；
+    数据包不存在、版本不符、彩种不同或与新数据之间有缺口时从完整历史重建
+    """
+    chronological = sort_chronologically(history_data)
+
+    try:
+        stats = load_stats(stats_file)
+    except (ValueError, KeyError) as e:
+        print(f"  ⚠️  统计数据包无法增量更新 ({e})，重新构建")
+        stats = None
+
+    if stats is not None and stats.lottery_type == lottery_type and stats.last_issue:
+        new_draws = draws_after(chronological, stats.last_issue)
+        if new_draws is not None:
+            for draw in new_draws:
+                stats.update(draw)
+            save_stats(stats, stats_file)
+            print(f"  ✅ 统计数据包增量更新 {len(new_draws)} 期: {stats_file}")
+            return stats
+        print("  ⚠️  统计数据包与历史数据不衔接，重新构建")
+
+    stats = HistoryStats.build(lottery_type, chronological)
+    save_stats(stats, stats_file)
+    print(f"  ✅ 统计数据包已重建 ({stats.history_size} 期): {stats_file}")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成或更新历史统计数据包')
+    parser.add_argument('--lottery_type', type=str, default='ssq', choices=list(NUMBER_RANGES),
+                        help='彩票类型')
+    parser.add_argument('--history_file', type=str, required=True, help='历史数据文件（JSON 或 .lhb）')
+    parser.add_argument('--output', type=str, required=True, help='统计数据包路径')
+    parser.add_argument('--rebuild', action='store_true', help='忽略已有数据包，完整重建')
+
+    args = parser.parse_args()
+
+    history_data = load_history_file(args.history_file)
+    if args.rebuild:
+        stats = HistoryStats.build(args.lottery_type, history_data)
+        save_stats(stats, args.output)
+        print(f"✅ 统计数据包已重建 ({stats.history_size} 期): {args.output}")
+    else:
+        update_stats_bundle(args.output, args.lottery_type, history_data)
+
+
+if __name__ == '__main__':
+    main()
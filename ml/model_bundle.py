@@ -0,0 +1,417 @@
+"""
+模型打包 (.lmb)
+
+把各彩种导出的 TFLite 模型写入同一个文件，每个模型按页对齐存放，
+文件头部的 JSON 清单记录每个模型的偏移、大小、输入/输出形状、序列长度、号码数和 SHA-256。
+使用方只需内存映射一次，按清单中的偏移切片即可得到模型，不复制数据:
+    Python: ModelBundle(path).model_view('ssq', 'red') 返回 mmap 上的 memoryview
+    Android: 文件以不压缩方式放入 assets（aaptOptions noCompress "lmb"），
+             openFd 得到 startOffset 后 FileChannel.map(READ_ONLY, startOffset + offset, size)
+
+同时替代手动重命名：extract 按 LSTMPredictor 的资源名（lottery_lstm_red_ssq.tflite 等）
+把模型写入 assets 目录。LSTMPredictor 按最新一期在前输入窗口，
+time_order 不是 newest_first 的模型不打包，也不解包为 App 资源名
+
+文件布局:
+    magic (4 字节 b'LMB1') | 清单长度 (uint32, 小端) | JSON 清单 | 按 ALIGNMENT 对齐的模型数据
+
+依赖:
+    pip install numpy
+    pip install tensorflow  # 仅 verify --load 需要
+
+使用方法:
+    python model_bundle.py build --model_dir models/batch/{lottery_type} --output models/lottery_models.lmb
+    python model_bundle.py verify --bundle models/lottery_models.lmb --load
+    python model_bundle.py extract --bundle models/lottery_models.lmb --output_dir ../app/src/main/assets
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import struct
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from prediction_server import find_model_files
+from train_lstm_model import LOTTERY_CONFIG, MULTI_HEAD_INPUT, MULTI_HEAD_OUTPUTS, load_training_meta
+
+MAGIC = b'LMB1'
+FORMAT_VERSION = 1
+# 16 KB 同时满足 4 KB 和 16 KB 页大小的设备，mmap 的偏移必须按页对齐
+ALIGNMENT = 16384
+# TFLite flatbuffer 的文件标识（第 4~8 字节）
+TFLITE_IDENTIFIER = b'TFL3'
+DEFAULT_SEQUENCE_LENGTH = 8
+# LSTMPredictor 构造输入窗口的时间顺序（最新一期在前）
+APP_TIME_ORDER = 'newest_first'
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def asset_name(lottery_type: str, key: str) -> str:
+    """LSTMPredictor 中的资源文件名，key 为 red / blue / multi"""
+    return f"lottery_lstm_{key}_{lottery_type}.tflite"
+
+
+def _signature(key: str, sequence_length: int, num_classes: Dict[str, int]) -> Dict:
+    """
+    与 train_lstm_model 导出一致的输入/输出名称和形状（批次维为 1，与 LSTMPredictor 一致）
+    """
+    if key == 'multi':
+        return {
+            'inputs': {MULTI_HEAD_INPUT: [1, sequence_length, num_classes['red'] + num_classes['blue']]},
+            'outputs': {MULTI_HEAD_OUTPUTS[color]: [1, num_classes[color]] for color in ('red', 'blue')}
+        }
+    return {
+        'inputs': {f"{key}_lstm_input": [1, sequence_length, num_classes[key]]},
+        'outputs': {f"{key}_lstm_output": [1, num_classes[key]]}
+    }
+
+
+def collect_models(model_dir: str, lottery_types: List[str], sequence_length: int = DEFAULT_SEQUENCE_LENGTH) -> Dict:
+    """
+    查找各彩种的模型文件并生成清单条目（不含偏移）
+
+    序列长度、号码数优先取模型目录中的 training_meta.json，没有时使用 LOTTERY_CONFIG 和 sequence_length。
+    time_order 与 App 不一致的彩种跳过（App 会按错误的顺序输入窗口）
+
+    Returns:
+        {lottery_type: {'architecture', 'sequence_length', 'num_classes', 'time_order', 'models': {key: {..., 'source'}}}}
+    """
+    entries = {}
+    for lottery_type in lottery_types:
+        files = find_model_files(model_dir, lottery_type)
+        if not files:
+            print(f"⚠️  {lottery_type}: 未找到模型，跳过")
+            continue
+
+        architecture = 'multi_head' if 'multi' in files else 'separate'
+        meta = load_training_meta(str(next(iter(files.values())).parent)) or {}
+        if meta and meta.get('architecture') != architecture:
+            # 目录中的模型文件与元数据不一致（如手动替换过模型），元数据不可信
+            print(f"⚠️  {lottery_type}: training_meta.json 的架构为 {meta.get('architecture')}，"
+                  f"与模型文件不一致，忽略元数据")
+            meta = {}
+        num_classes = {
+            'red': meta.get('num_red_balls', LOTTERY_CONFIG[lottery_type]['red']),
+            'blue': meta.get('num_blue_balls', LOTTERY_CONFIG[lottery_type]['blue'])
+        }
+        seq_len = meta.get('sequence_length', sequence_length)
+        time_order = meta.get('time_order', APP_TIME_ORDER)
+        if time_order != APP_TIME_ORDER:
+            print(f"❌ {lottery_type}: 模型按 {time_order} 训练，LSTMPredictor 按 {APP_TIME_ORDER} 输入，跳过")
+            continue
+
+        entries[lottery_type] = {
+            'architecture': architecture,
+            'sequence_length': seq_len,
+            'num_classes': num_classes,
+            'time_order': time_order,
+            'last_issue': meta.get('last_issue'),
+            'trained_at': meta.get('trained_at'),
+            'models': {
+                key: {
+                    'asset': asset_name(lottery_type, key),
+                    'source': str(path),
+                    **_signature(key, seq_len, num_classes)
+                }
+                for key, path in files.items()
+            }
+        }
+    return entries
+
+
+def build_bundle(entries: Dict, output_file: str, created_at: Optional[str] = None) -> Dict:
+    """
+    写入模型包（先写临时文件再替换，读取方不会看到写了一半的文件）
+
+    Args:
+        entries: collect_models 的返回值
+        output_file: 输出文件路径
+
+    Returns:
+        写入的清单
+    """
+    blobs = {}
+    for lottery_type, entry in entries.items():
+        for key, model in entry['models'].items():
+            data = Path(model.pop('source')).read_bytes()
+            if data[4:8] != TFLITE_IDENTIFIER:
+                raise ValueError(f"{lottery_type}/{key} 不是 TFLite 模型")
+            model['size'] = len(data)
+            model['sha256'] = hashlib.sha256(data).hexdigest()
+            blobs[(lottery_type, key)] = data
+
+    manifest = {
+        'version': FORMAT_VERSION,
+        'created_at': created_at or time.strftime('%Y-%m-%d %H:%M:%S'),
+        'alignment': ALIGNMENT,
+        'lottery_types': entries
+    }
+
+    # 先计算清单长度再确定模型偏移，偏移量位数变化时重新计算
+    header_size = 0
+    while True:
+        offset = _align(len(MAGIC) + 4 + header_size)
+        for (lottery_type, key), data in blobs.items():
+            entries[lottery_type]['models'][key]['offset'] = offset
+            offset = _align(offset + len(data))
+        manifest['file_size'] = offset
+        header_bytes = json.dumps(manifest, ensure_ascii=False).encode('utf-8')
+        if len(header_bytes) == header_size:
+            break
+        header_size = len(header_bytes)
+
+    output_path = Path(output_file)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_name(output_path.name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<I', len(header_bytes)))
+        f.write(header_bytes)
+        for (lottery_type, key), data in blobs.items():
+            f.seek(entries[lottery_type]['models'][key]['offset'])
+            f.write(data)
+        f.truncate(offset)
+    tmp_path.replace(output_path)
+    return manifest
+
+
+class ModelBundle:
+    """
+    内存映射的模型包
+
+    打开时只读取清单，模型数据在 model_view 时按偏移从同一个映射上切片，不复制
+    """
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        self._file = open(self.path, 'rb')
+        try:
+            if self._file.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"不是有效的模型包: {path}")
+            (header_size,) = struct.unpack('<I', self._file.read(4))
+            self.manifest = json.loads(self._file.read(header_size).decode('utf-8'))
+            if self.manifest['version'] != FORMAT_VERSION:
+                raise ValueError(f"不支持的格式版本: {self.manifest['version']}")
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+        self._view = memoryview(self._mmap)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._view.release()
+        self._mmap.close()
+        self._file.close()
+
+    @property
+    def lottery_types(self) -> List[str]:
+        return list(self.manifest['lottery_types'])
+
+    def entry(self, lottery_type: str) -> Dict:
+        """彩种的清单条目（架构、序列长度、号码数、各模型的偏移和签名）"""
+        try:
+            return self.manifest['lottery_types'][lottery_type]
+        except KeyError:
+            raise KeyError(f"模型包中没有彩种 {lottery_type}") from None
+
+    def model_keys(self, lottery_type: str) -> List[str]:
+        """red / blue 或 multi"""
+        return list(self.entry(lottery_type)['models'])
+
+    def model_view(self, lottery_type: str, key: str) -> memoryview:
+        """模型数据的零拷贝切片，使用期间不要关闭模型包"""
+        models = self.entry(lottery_type)['models']
+        if key not in models:
+            raise KeyError(f"{lottery_type} 没有 {key} 模型（可用: {', '.join(models)}）")
+        spec = models[key]
+        return self._view[spec['offset']:spec['offset'] + spec['size']]
+
+    def load_interpreter(self, lottery_type: str, key: str, num_threads: Optional[int] = None):
+        """
+        创建 TFLite 解释器
+
+        Python 版 Interpreter 的 model_content 只接受 bytes，这里会复制一次模型数据；
+        Android 端 Interpreter(MappedByteBuffer) 可直接使用映射
+        """
+        from tflite_utils import load_interpreter
+
+        return load_interpreter(model_content=bytes(self.model_view(lottery_type, key)), num_threads=num_threads)
+
+    def verify(self, load: bool = False) -> List[str]:
+        """
+        校验模型包，返回问题列表（为空表示通过）
+
+        检查文件大小、偏移对齐、越界和重叠、TFLite 文件标识、SHA-256；
+        load 为 True 时再用 TFLite 解释器加载，对比输入/输出形状与清单是否一致
+        """
+        problems = []
+        alignment = self.manifest.get('alignment', ALIGNMENT)
+        if len(self._mmap) != self.manifest.get('file_size'):
+            problems.append(f"文件大小 {len(self._mmap)} 与清单 {self.manifest.get('file_size')} 不一致")
+
+        spans = []
+        for lottery_type in self.lottery_types:
+            for key, spec in self.entry(lottery_type)['models'].items():
+                name = f"{lottery_type}/{key}"
+                start, end = spec['offset'], spec['offset'] + spec['size']
+                if start % alignment:
+                    problems.append(f"{name}: 偏移 {start} 未按 {alignment} 对齐")
+                if end > len(self._mmap):
+                    problems.append(f"{name}: 数据越界 ({end} > {len(self._mmap)})")
+                    continue
+                spans.append((start, end, name))
+
+                view = self.model_view(lottery_type, key)
+                if view[4:8] != TFLITE_IDENTIFIER:
+                    problems.append(f"{name}: 不是 TFLite 模型")
+                    continue
+                if hashlib.sha256(view).hexdigest() != spec['sha256']:
+                    problems.append(f"{name}: SHA-256 不一致")
+                    continue
+                if load:
+                    problems.extend(f"{name}: {problem}" for problem in self._check_signature(lottery_type, key))
+
+        spans.sort()
+        for (_, end, name), (start, _, other) in zip(spans, spans[1:]):
+            if start < end:
+                problems.append(f"{name} 与 {other} 数据重叠")
+        return problems
+
+    def _check_signature(self, lottery_type: str, key: str) -> List[str]:
+        spec = self.entry(lottery_type)['models'][key]
+        try:
+            interpreter = self.load_interpreter(lottery_type, key)
+        except Exception as e:
+            return [f"无法加载: {type(e).__name__}: {e}"]
+
+        problems = []
+        inputs = [detail['shape'].tolist() for detail in interpreter.get_input_details()]
+        if inputs != list(spec['inputs'].values()):
+            problems.append(f"输入形状 {inputs} 与清单 {list(spec['inputs'].values())} 不一致")
+        # 输出张量顺序不一定与清单一致，只比较形状集合
+        outputs = sorted(detail['shape'].tolist() for detail in interpreter.get_output_details())
+        if outputs != sorted(spec['outputs'].values()):
+            problems.append(f"输出形状 {outputs} 与清单 {sorted(spec['outputs'].values())} 不一致")
+        return problems
+
+    def extract(self, output_dir: str) -> List[Path]:
+        """
+        按 LSTMPredictor 的资源名写出各模型（如 lottery_lstm_red_ssq.tflite）
+
+        任一彩种的 time_order 不是 newest_first 时抛出 ValueError，不写出任何文件
+        """
+        mismatched = [
+            f"{lottery_type} ({self.entry(lottery_type).get('time_order')})"
+            for lottery_type in self.lottery_types
+            if self.entry(lottery_type).get('time_order', APP_TIME_ORDER) != APP_TIME_ORDER
+        ]
+        if mismatched:
+            raise ValueError(f"模型的时间顺序与 LSTMPredictor ({APP_TIME_ORDER}) 不一致，"
+                             f"不能解包为 App 资源: {', '.join(mismatched)}")
+
+        output_path = Path(output_dir)
+        output_path.mkdir(parents=True, exist_ok=True)
+        paths = []
+        for lottery_type in self.lottery_types:
+            for key, spec in self.entry(lottery_type)['models'].items():
+                path = output_path / spec['asset']
+                with open(path, 'wb') as f:
+                    f.write(self.model_view(lottery_type, key))
+                paths.append(path)
+        return paths
+
+
+def print_manifest(bundle: ModelBundle):
+    print(f"📦 {bundle.path}: {len(bundle.lottery_types)} 个彩种, "
+          f"{bundle.manifest['file_size'] / 1024:.1f} KB (创建于 {bundle.manifest['created_at']})")
+    print(f"{'彩种':<7}{'模型':<7}{'偏移':>10}{'大小KB':>10}{'序列':>6}{'号码数':>10}  最新期号")
+    for lottery_type in bundle.lottery_types:
+        entry = bundle.entry(lottery_type)
+        classes = f"{entry['num_classes']['red']}+{entry['num_classes']['blue']}"
+        for key, spec in entry['models'].items():
+            print(f"{lottery_type:<7}{key:<7}{spec['offset']:>10}{spec['size'] / 1024:>10.1f}"
+                  f"{entry['sequence_length']:>6}{classes:>10}  {entry.get('last_issue') or '-'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='把各彩种的 TFLite 模型打包为单个页对齐文件')
+    parser.add_argument('command', choices=['build', 'verify', 'extract'],
+                        help='build 打包；verify 校验并打印清单；extract 按 Android 资源名解包')
+    parser.add_argument('--model_dir', type=str, default='models/batch/{lottery_type}',
+                        help='模型目录（支持 {lottery_type} 占位符，或 Android assets 目录）')
+    parser.add_argument('--lottery_type', type=str, default='all',
+                        help='打包的彩票类型，多个用逗号分隔，all 表示全部（找不到模型的彩种跳过）')
+    parser.add_argument('--sequence_length', type=int, default=DEFAULT_SEQUENCE_LENGTH,
+                        help='模型目录没有 training_meta.json 时使用的序列长度')
+    parser.add_argument('--output', type=str, default='models/lottery_models.lmb', help='build 输出文件')
+    parser.add_argument('--bundle', type=str, default='models/lottery_models.lmb', help='verify / extract 的模型包')
+    parser.add_argument('--load', action='store_true', help='verify 时用 TFLite 解释器加载并检查输入/输出形状')
+    parser.add_argument('--output_dir', type=str, default='../app/src/main/assets', help='extract 输出目录')
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        if args.lottery_type == 'all':
+            lottery_types = list(LOTTERY_CONFIG)
+        else:
+            lottery_types = [item.strip() for item in args.lottery_type.split(',') if item.strip()]
+        unknown = [item for item in lottery_types if item not in LOTTERY_CONFIG]
+        if unknown:
+            parser.error(f"未知彩票类型: {', '.join(unknown)}")
+
+        entries = collect_models(args.model_dir, lottery_types, args.sequence_length)
+        if not entries:
+            parser.error(f"{args.model_dir} 中没有找到任何模型")
+        start = time.perf_counter()
+        try:
+            build_bundle(entries, args.output)
+        except ValueError as e:
+            parser.error(str(e))
+        print(f"✅ 已打包 {len(entries)} 个彩种 ({(time.perf_counter() - start) * 1000:.1f} ms)")
+        with ModelBundle(args.output) as bundle:
+            print_manifest(bundle)
+        return
+
+    try:
+        bundle = ModelBundle(args.bundle)
+    except FileNotFoundError:
+        parser.error(f"模型包不存在: {args.bundle}")
+    except ValueError as e:
+        parser.error(str(e))
+
+    with bundle:
+        if args.command == 'extract':
+            try:
+                paths = bundle.extract(args.output_dir)
+            except ValueError as e:
+                parser.error(str(e))
+            print(f"✅ 已解包 {len(paths)} 个模型到 {args.output_dir}")
+            for path in paths:
+                print(f"   {path.name}")
+            return
+
+        print_manifest(bundle)
+        start = time.perf_counter()
+        problems = bundle.verify(load=args.load)
+        elapsed = (time.perf_counter() - start) * 1000
+    for problem in problems:
+        print(f"❌ {problem}")
+    if problems:
+        raise SystemExit(1)
+    print(f"✅ 校验通过 ({elapsed:.1f} ms)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,431 @@
+"""
+本地预测服务
+
+启动时为每个彩种加载一次导出的 TFLite 模型并预热（Interpreter 以 model_path 加载时
+模型文件为内存映射），每个彩种由一个工作线程独占解释器，把并发到达的请求合并为
+一次批量推理（微批处理），返回与 LSTMPredictor.predict 相同结构的号码概率:
+    {"red": {"01": 0.12, ...}, "blue": {"01": 0.05, ...}}
+
+输入构造与 LSTMPredictor 一致：最近 sequence_length 期，最新一期在前，号码 n 对应下标 n-1，
+越界号码忽略。与 LSTMPredictor 相同，存在多头模型时优先使用多头模型。
+模型目录的 training_meta.json 中 time_order 为 oldest_first 时，窗口按最早一期在前输入
+
+接口:
+    POST /predict   {"lottery_type": "ssq", "history": [{"red": [...], "blue": [...]}, ...]}
+                    或 {"requests": [{...}, {...}]} 一次提交多条
+    GET  /metrics   各彩种的请求数、批次大小、队列深度、排队/推理/总延迟分位数
+    GET  /health    已加载的模型
+
+依赖:
+    pip install tensorflow numpy
+
+使用方法:
+    python prediction_server.py --model_dir models/batch/{lottery_type} --lottery_type all --port 8500
+    python prediction_server.py --model_dir ../app/src/main/assets --lottery_type ssq,dlt
+    curl -s localhost:8500/predict -d '{"lottery_type": "ssq", "history": [...]}'
+    curl -s localhost:8500/metrics
+"""
+
+import argparse
+import json
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from benchmark_tflite import NUM_THREADS, prepare_input
+from tflite_utils import load_interpreter, run_batch
+from train_lstm_model import LOTTERY_CONFIG, MULTI_HEAD_INPUT, MULTI_HEAD_OUTPUTS, load_training_meta, tflite_file_name
+
+COLORS = ('red', 'blue')
+
+# 延迟统计保留最近的样本数
+LATENCY_WINDOW = 4096
+
+
+def find_model_files(model_dir: str, lottery_type: str) -> Dict[str, Path]:
+    """
+    查找彩种的模型文件，优先多头模型
+
+    支持两种布局：
+        训练输出目录（model_dir 可含 {lottery_type} 占位符）: lottery_lstm_red.tflite，
+            training_meta.json 的 time_order 为 oldest_first 时为 lottery_lstm_red_oldest_first.tflite
+        Android assets 目录: lottery_lstm_red_ssq.tflite
+
+    Returns:
+        {'multi': path} 或 {'red': path, 'blue': path}，找不到时为空字典
+    """
+    directory = Path(model_dir.format(lottery_type=lottery_type))
+    time_order = (load_training_meta(str(directory)) or {}).get('time_order', 'newest_first')
+    layouts = (
+        lambda key: f"lottery_lstm_{key}_{lottery_type}.tflite",
+        lambda key: tflite_file_name(key, time_order),
+    )
+    for name in layouts:
+        multi = directory / name('multi')
+        if multi.exists():
+            return {'multi': multi}
+        paths = {color: directory / name(color) for color in COLORS}
+        if all(path.exists() for path in paths.values()):
+            return paths
+    return {}
+
+
+def format_probabilities(probabilities: np.ndarray) -> Dict[str, float]:
+    """与 LSTMPredictor 相同的键格式：号码 n 对应 "%02d" % n"""
+    return {f"{i + 1:02d}": float(p) for i, p in enumerate(probabilities)}
+
+
+class _Pending:
+    """排队中的单条请求"""
+
+    __slots__ = ('inputs', 'future', 'enqueued_at')
+
+    def __init__(self, inputs: Dict[str, np.ndarray]):
+        self.inputs = inputs
+        self.future: Future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class ModelWorker:
+    """
+    单个彩种的模型和工作线程
+
+    TFLite 解释器不是线程安全的，只在工作线程中调用。工作线程取到第一条请求后，
+    最多再等待 max_wait_ms 收集后续请求，凑满 max_batch 条或超时即执行一次批量推理
+    """
+
+    def __init__(
+        self,
+        lottery_type: str,
+        model_files: Dict[str, Path],
+        max_batch: int = 64,
+        max_wait_ms: float = 2.0,
+        num_threads: int = NUM_THREADS
+    ):
+        self.lottery_type = lottery_type
+        self.model_files = model_files
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.num_classes = LOTTERY_CONFIG[lottery_type]
+        self.queue: queue.Queue = queue.Queue()
+
+        start = time.perf_counter()
+        self.interpreters = {
+            key: load_interpreter(model_path=str(path), num_threads=num_threads)
+            for key, path in model_files.items()
+        }
+        self.multi_head = 'multi' in self.interpreters
+        if self.multi_head:
+            self.signature = self.interpreters['multi'].get_signature_runner()
+        any_interpreter = next(iter(self.interpreters.values()))
+        self.sequence_length = int(any_interpreter.get_input_details()[0]['shape'][1])
+        # assets 目录等没有训练元数据时按 LSTMPredictor 的顺序（最新一期在前）
+        meta = load_training_meta(str(next(iter(model_files.values())).parent)) or {}
+        self.time_order = meta.get('time_order', 'newest_first')
+
+        # 预热：首次推理包含算子初始化，不计入请求延迟
+        self._run({color: np.zeros((1, self.sequence_length, n), dtype=np.float32)
+                   for color, n in self.num_classes.items()})
+        self.load_ms = (time.perf_counter() - start) * 1000
+
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.batches = 0
+        self.errors = 0
+        self.max_queue_depth = 0
+        self.batch_sizes: deque = deque(maxlen=LATENCY_WINDOW)
+        self.queue_ms: deque = deque(maxlen=LATENCY_WINDOW)
+        self.inference_ms: deque = deque(maxlen=LATENCY_WINDOW)
+        self.total_ms: deque = deque(maxlen=LATENCY_WINDOW)
+
+        self.thread = threading.Thread(target=self._loop, name=f"predict-{lottery_type}", daemon=True)
+        self.thread.start()
+
+    def _run_multi_head(self, X: np.ndarray) -> Dict[str, np.ndarray]:
+        try:
+            outputs = self.signature(**{MULTI_HEAD_INPUT: X})
+        except (ValueError, RuntimeError):
+            # 批次维固定的模型逐条推理
+            rows = [self.signature(**{MULTI_HEAD_INPUT: row[np.newaxis]}) for row in X]
+            outputs = {name: np.concatenate([row[name] for row in rows]) for name in MULTI_HEAD_OUTPUTS.values()}
+        return {color: np.asarray(outputs[name], dtype=np.float32) for color, name in MULTI_HEAD_OUTPUTS.items()}
+
+    def _run(self, inputs: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """inputs 为各颜色的 (n, sequence_length, num_classes) 窗口"""
+        if self.multi_head:
+            # 与 LSTMPredictor.prepareCombinedInput 一致：红球在前，蓝球在后
+            return self._run_multi_head(np.concatenate([inputs['red'], inputs['blue']], axis=2))
+        return {
+            color: run_batch(self.interpreters[color], inputs[color], chunk_size=self.max_batch)
+            for color in COLORS
+        }
+
+    def prepare(self, history: List[dict]) -> Dict[str, np.ndarray]:
+        """按 LSTMPredictor 的规则构造单条请求的输入"""
+        if len(history) < self.sequence_length:
+            raise ValueError(f"历史数据不足 (需要至少 {self.sequence_length} 期，当前 {len(history)} 期)")
+        inputs = {
+            color: prepare_input(history, color, n, self.sequence_length)
+            for color, n in self.num_classes.items()
+        }
+        if self.time_order == 'oldest_first':
+            inputs = {color: np.ascontiguousarray(x[:, ::-1]) for color, x in inputs.items()}
+        return inputs
+
+    def submit(self, history: List[dict]) -> Future:
+        """提交一条请求，返回的 Future 结果为 {'red': {...}, 'blue': {...}}"""
+        pending = _Pending(self.prepare(history))
+        self.queue.put(pending)
+        depth = self.queue.qsize()
+        with self._lock:
+            self.requests += 1
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+        return pending.future
+
+    def _collect(self, first: _Pending) -> List[_Pending]:
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # 关闭信号放回队列，处理完当前批次后退出
+                self.queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _loop(self):
+        while True:
+            first = self.queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            started = time.perf_counter()
+            try:
+                outputs = self._run({
+                    color: np.concatenate([item.inputs[color] for item in batch], axis=0)
+                    for color in COLORS
+                })
+            except Exception as e:
+                with self._lock:
+                    self.errors += len(batch)
+                for item in batch:
+                    item.future.set_exception(e)
+                continue
+            finished = time.perf_counter()
+
+            for i, item in enumerate(batch):
+                item.future.set_result({color: format_probabilities(outputs[color][i]) for color in COLORS})
+            with self._lock:
+                self.batches += 1
+                self.batch_sizes.append(len(batch))
+                self.inference_ms.append((finished - started) * 1000)
+                for item in batch:
+                    self.queue_ms.append((started - item.enqueued_at) * 1000)
+                    self.total_ms.append((finished - item.enqueued_at) * 1000)
+
+    def metrics(self) -> Dict:
+        def percentiles(values) -> Dict[str, float]:
+            if not values:
+                return {}
+            array = np.asarray(values)
+            return {
+                'p50': float(np.percentile(array, 50)),
+                'p95': float(np.percentile(array, 95)),
+                'p99': float(np.percentile(array, 99)),
+                'max': float(array.max())
+            }
+
+        with self._lock:
+            return {
+                'models': {key: path.name for key, path in self.model_files.items()},
+                'load_ms': self.load_ms,
+                'requests': self.requests,
+                'batches': self.batches,
+                'errors': self.errors,
+                'mean_batch_size': float(np.mean(self.batch_sizes)) if self.batch_sizes else 0.0,
+                'queue_depth': self.queue.qsize(),
+                'max_queue_depth': self.max_queue_depth,
+                'queue_ms': percentiles(self.queue_ms),
+                'inference_ms': percentiles(self.inference_ms),
+                'total_ms': percentiles(self.total_ms)
+            }
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+
+
+class PredictionService:
+    """多个彩种的 ModelWorker，也可以不经 HTTP 在进程内直接使用"""
+
+    def __init__(
+        self,
+        model_dir: str,
+        lottery_types: List[str],
+        max_batch: int = 64,
+        max_wait_ms: float = 2.0,
+        num_threads: int = NUM_THREADS
+    ):
+        self.started_at = time.time()
+        self.workers: Dict[str, ModelWorker] = {}
+        for lottery_type in lottery_types:
+            model_files = find_model_files(model_dir, lottery_type)
+            if not model_files:
+                print(f"⚠️  跳过 {lottery_type}: 找不到模型文件")
+                continue
+            worker = ModelWorker(lottery_type, model_files, max_batch, max_wait_ms, num_threads)
+            self.workers[lottery_type] = worker
+            print(f"✅ {lottery_type}: {', '.join(path.name for path in model_files.values())} "
+                  f"(sequence_length={worker.sequence_length}, 加载+预热 {worker.load_ms:.1f} ms)")
+
+    def submit(self, lottery_type: str, history: List[dict]) -> Future:
+        worker = self.workers.get(lottery_type)
+        if worker is None:
+            raise KeyError(f"没有加载彩种 {lottery_type} 的模型")
+        return worker.submit(history)
+
+    def predict(self, lottery_type: str, history: List[dict], timeout: Optional[float] = None) -> Dict:
+        return self.submit(lottery_type, history).result(timeout)
+
+    def metrics(self) -> Dict:
+        return {
+            'uptime_s': time.time() - self.started_at,
+            'lottery_types': {name: worker.metrics() for name, worker in self.workers.items()}
+        }
+
+    def close(self):
+        for worker in self.workers.values():
+            worker.close()
+
+
+class PredictionHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # 默认监听队列只有 5，并发请求较多时会被重置连接
+    request_queue_size = 128
+
+
+def make_handler(service: PredictionService, timeout: float):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _send_json(self, status: int, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/metrics':
+                self._send_json(200, service.metrics())
+            elif self.path == '/health':
+                self._send_json(200, {
+                    name: {key: path.name for key, path in worker.model_files.items()}
+                    for name, worker in service.workers.items()
+                })
+            else:
+                self._send_json(404, {'error': f"未知路径: {self.path}"})
+
+        def do_POST(self):
+            if self.path != '/predict':
+                self._send_json(404, {'error': f"未知路径: {self.path}"})
+                return
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                body = json.loads(self.rfile.read(length) or b'{}')
+            except ValueError as e:
+                self._send_json(400, {'error': f"无效的 JSON: {e}"})
+                return
+
+            batched = isinstance(body, dict) and 'requests' in body
+            items = body['requests'] if batched else [body]
+            # 先全部提交再等待，同一 HTTP 请求中的多条可以合并到同一批次
+            futures = []
+            for item in items:
+                if not isinstance(item, dict) or 'lottery_type' not in item or 'history' not in item:
+                    self._send_json(400, {'error': "请求需要 lottery_type 和 history"})
+                    return
+                try:
+                    futures.append(service.submit(item['lottery_type'], item['history']))
+                except KeyError as e:
+                    self._send_json(404, {'error': e.args[0]})
+                    return
+                except (TypeError, ValueError) as e:
+                    self._send_json(400, {'error': str(e)})
+                    return
+
+            try:
+                results = [
+                    {'lottery_type': item['lottery_type'], **future.result(timeout)}
+                    for item, future in zip(items, futures)
+                ]
+            except Exception as e:
+                self._send_json(500, {'error': f"{type(e).__name__}: {e}"})
+                return
+            self._send_json(200, {'results': results} if batched else results[0])
+
+        def log_message(self, format, *args):
+            # 请求量大时不逐条打印访问日志，延迟见 /metrics
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地 TFLite 预测服务（常驻解释器 + 微批处理）')
+    parser.add_argument('--model_dir', type=str, required=True,
+                        help='模型目录（支持 {lottery_type} 占位符，或 Android assets 目录）')
+    parser.add_argument('--lottery_type', type=str, default='all',
+                        help='加载的彩票类型，多个用逗号分隔，all 表示全部')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='监听地址')
+    parser.add_argument('--port', type=int, default=8500, help='监听端口')
+    parser.add_argument('--max_batch', type=int, default=64, help='单次推理合并的最大请求数')
+    parser.add_argument('--max_wait_ms', type=float, default=2.0, help='收集一个批次的最长等待时间 (ms)')
+    parser.add_argument('--num_threads', type=int, default=NUM_THREADS, help='每个解释器的线程数')
+    parser.add_argument('--timeout', type=float, default=30.0, help='单个请求的超时时间 (秒)')
+
+    args = parser.parse_args()
+
+    if args.lottery_type == 'all':
+        lottery_types = list(LOTTERY_CONFIG)
+    else:
+        lottery_types = [item.strip() for item in args.lottery_type.split(',') if item.strip()]
+    unknown = [item for item in lottery_types if item not in LOTTERY_CONFIG]
+    if unknown:
+        parser.error(f"未知彩票类型: {', '.join(unknown)}")
+
+    print("="*60)
+    print("🚀 LSTM 预测服务")
+    print("="*60)
+    service = PredictionService(
+        args.model_dir, lottery_types, args.max_batch, args.max_wait_ms, args.num_threads
+    )
+    if not service.workers:
+        parser.error(f"没有找到任何模型: {args.model_dir}")
+
+    server = PredictionHTTPServer((args.host, args.port), make_handler(service, args.timeout))
+    print(f"\n监听 http://{args.host}:{args.port} (POST /predict, GET /metrics, GET /health)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n正在关闭...")
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,261 @@
+"""
+分阶段性能剖析
+
+记录各阶段（获取、转换、校验、准备数据、训练、保存、转换 TFLite 等）的墙钟时间、
+CPU 时间、峰值常驻内存和数组占用，训练时通过 Keras 回调记录每轮耗时，
+结果保存为 JSON，可选导出 Chrome Trace（chrome://tracing 或 Perfetto 打开）
+
+依赖:
+    pip install numpy
+
+使用方法:
+    python fetch_history_data.py --lottery_type ssq --output history_ssq.json --profile profile_fetch.json
+    python train_lstm_model.py --history_file history_ssq.json --profile profile_train.json \\
+        --chrome_trace trace_train.json
+"""
+
+import json
+import os
+import platform
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+try:
+    from numpy.lib.array_utils import byte_bounds
+except ImportError:
+    # NumPy < 2.0
+    byte_bounds = np.byte_bounds
+
+
+def peak_rss_mb() -> float:
+    """当前进程的峰值常驻内存 (MB)"""
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return usage / 1024 / 1024 if sys.platform == 'darwin' else usage / 1024
+
+
+def current_rss_mb() -> Optional[float]:
+    """当前常驻内存 (MB)，仅 Linux 可用"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _collect_arrays(value, found: List[np.ndarray]):
+    if isinstance(value, np.ndarray):
+        found.append(value)
+    elif isinstance(value, dict):
+        for item in value.values():
+            _collect_arrays(item, found)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _collect_arrays(item, found)
+
+
+def array_bytes(*values) -> Dict[str, int]:
+    """
+    统计数组占用
+
+    Returns:
+        logical: 各数组 nbytes 之和（滑动窗口视图按展开后的大小计）
+        backing: 去重后的底层缓冲区大小（视图共享同一块内存时只计一次）
+    """
+    arrays: List[np.ndarray] = []
+    for value in values:
+        _collect_arrays(value, arrays)
+
+    # 合并各数组覆盖的内存区间，视图与其底层数组重叠的部分只计一次
+    spans = sorted(byte_bounds(array) for array in arrays if array.size)
+    backing = 0
+    current_low, current_high = None, None
+    for low, high in spans:
+        if current_high is None or low > current_high:
+            if current_high is not None:
+                backing += current_high - current_low
+            current_low, current_high = low, high
+        else:
+            current_high = max(current_high, high)
+    if current_high is not None:
+        backing += current_high - current_low
+
+    return {
+        'logical': int(sum(array.nbytes for array in arrays)),
+        'backing': int(backing)
+    }
+
+
+class StageProfiler:
+    """
+    分阶段剖析器
+
+    enabled 为 False 时 stage() 只返回一个空记录，几乎没有开销，
+    调用方无需区分是否开启剖析
+    """
+
+    def __init__(self, enabled: bool = True, name: str = ''):
+        self.enabled = enabled
+        self.name = name
+        self.events: List[Dict] = []
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def _timestamp_us(self) -> float:
+        return (time.perf_counter() - self._origin) * 1e6
+
+    def _append(self, event: Dict):
+        with self._lock:
+            self.events.append(event)
+
+    @contextmanager
+    def stage(self, name: str, **attrs):
+        """
+        记录一个阶段，with 块内可向返回的字典写入附加信息，
+        或调用 record_arrays() 记录数组占用
+        """
+        record: Dict = {'name': name, **attrs}
+        if not self.enabled:
+            yield record
+            return
+
+        start_us = self._timestamp_us()
+        start_wall = time.perf_counter()
+        # process_time 统计整个进程的 CPU 时间，多线程阶段会包含其他线程
+        start_cpu = time.process_time()
+        rss_before = peak_rss_mb()
+        record['thread'] = threading.get_ident()
+        try:
+            yield record
+        except BaseException as e:
+            record['error'] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            record['start_us'] = start_us
+            record['wall_s'] = time.perf_counter() - start_wall
+            record['cpu_s'] = time.process_time() - start_cpu
+            record['peak_rss_mb'] = peak_rss_mb()
+            record['peak_rss_delta_mb'] = record['peak_rss_mb'] - rss_before
+            record['rss_mb'] = current_rss_mb()
+            self._append(record)
+
+    def record_arrays(self, record: Dict, *values):
+        """在阶段记录中写入数组占用"""
+        if self.enabled:
+            record['array_bytes'] = array_bytes(*values)
+
+    def epoch_callbacks(self, stage: str) -> List:
+        """
+        记录每轮训练耗时的 Keras 回调列表（未开启剖析时为空列表）
+
+        每轮作为 stage 的子事件，记录墙钟时间、CPU 时间和该轮的 loss / val_loss 等指标
+        """
+        if not self.enabled:
+            return []
+
+        import tensorflow as tf
+
+        profiler = self
+
+        class EpochTimer(tf.keras.callbacks.Callback):
+            def on_epoch_begin(self, epoch, logs=None):
+                self.start_us = profiler._timestamp_us()
+                self.start_wall = time.perf_counter()
+                self.start_cpu = time.process_time()
+
+            def on_epoch_end(self, epoch, logs=None):
+                profiler._append({
+                    'name': f"{stage}/epoch_{epoch + 1}",
+                    'parent': stage,
+                    'epoch': epoch + 1,
+                    'thread': threading.get_ident(),
+                    'start_us': self.start_us,
+                    'wall_s': time.perf_counter() - self.start_wall,
+                    'cpu_s': time.process_time() - self.start_cpu,
+                    'peak_rss_mb': peak_rss_mb(),
+                    'metrics': {key: float(value) for key, value in (logs or {}).items()}
+                })
+
+        return [EpochTimer()]
+
+    def to_dict(self) -> Dict:
+        return {
+            'name': self.name,
+            'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'platform': platform.platform(),
+            'python': platform.python_version(),
+            'argv': sys.argv,
+            'peak_rss_mb': peak_rss_mb(),
+            'stages': sorted(self.events, key=lambda event: event['start_us'])
+        }
+
+    def save_json(self, output_file: str):
+        path = Path(output_file)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        print(f"✅ 剖析结果已保存到: {path}")
+
+    def save_chrome_trace(self, output_file: str):
+        """导出 Chrome Trace Event 格式（完整事件 ph='X'，时间单位微秒）"""
+        pid = os.getpid()
+        trace_events = []
+        for event in sorted(self.events, key=lambda item: item['start_us']):
+            args = {
+                key: value for key, value in event.items()
+                if key not in ('name', 'start_us', 'wall_s', 'thread')
+            }
+            trace_events.append({
+                'name': event['name'],
+                'cat': 'epoch' if 'parent' in event else 'stage',
+                'ph': 'X',
+                'ts': event['start_us'],
+                'dur': event['wall_s'] * 1e6,
+                'pid': pid,
+                'tid': event.get('thread', 0),
+                'args': args
+            })
+        path = Path(output_file)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': trace_events, 'displayTimeUnit': 'ms'}, f, ensure_ascii=False)
+        print(f"✅ Chrome Trace 已保存到: {path}")
+
+    def print_summary(self):
+        if not self.enabled or not self.events:
+            return
+        stages = [event for event in self.events if 'parent' not in event]
+        print("\n" + "="*78)
+        print(f"⏱  阶段剖析{f' ({self.name})' if self.name else ''}")
+        print("="*78)
+        print(f"{'阶段':<32}{'墙钟(s)':>10}{'CPU(s)':>10}{'峰值RSS(MB)':>14}{'数组(MB)':>12}")
+        print("-"*78)
+        for event in sorted(stages, key=lambda item: item['start_us']):
+            arrays = event.get('array_bytes')
+            arrays = f"{arrays['backing'] / 1024 / 1024:.2f}" if arrays else '-'
+            print(f"{event['name']:<32}{event['wall_s']:>10.3f}{event['cpu_s']:>10.3f}"
+                  f"{event['peak_rss_mb']:>14.1f}{arrays:>12}")
+            epochs = [item for item in self.events if item.get('parent') == event['name']]
+            if epochs:
+                times = np.array([item['wall_s'] for item in epochs])
+                print(f"  └ {len(epochs)} 轮, 每轮 平均 {times.mean():.3f}s / "
+                      f"最快 {times.min():.3f}s / 最慢 {times.max():.3f}s")
+        print("-"*78)
+
+    def save(self, output_file: Optional[str], chrome_trace: Optional[str] = None):
+        """打印汇总并按需保存 JSON / Chrome Trace"""
+        if not self.enabled:
+            return
+        self.print_summary()
+        if output_file:
+            self.save_json(output_file)
+        if chrome_trace:
+            self.save_chrome_trace(chrome_trace)
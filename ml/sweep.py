@@ -0,0 +1,391 @@
+"""
+超参数搜索脚本
+
+对 sequence_length、batch_size 以及 LotteryLSTMModel 的 lstm_units_1 / lstm_units_2 / dense_units
+做网格或随机搜索。各组参数（trial）在进程池中并行训练，每个进程限制 TensorFlow 线程数；
+历史数据只在主进程编码一次并写入张量缓存（tensor_cache.py），各进程以内存映射方式共享。
+训练中按中位数规则提前终止：某个 trial 到第 N 轮的最佳 val_loss 比已完成同轮次的其他
+trial 的中位数差时停止训练。结果按最佳 val_loss 排序写入排行榜
+
+依赖:
+    pip install tensorflow numpy
+
+使用方法:
+    python sweep.py --lottery_type ssq --history_file history_ssq.json --output_dir sweeps/ssq
+    python sweep.py --lottery_type ssq --history_file history_ssq.json --search random --trials 20 \\
+        --space '{"sequence_length": [5, 8, 12], "lstm_units_1": [64, 128, 256]}'
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import statistics
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import Manager, get_context
+from pathlib import Path
+from typing import Dict, List
+
+from history_dataset import load_history_file
+from tensor_cache import TensorCache, cache_key, file_digest
+from tf_threads import configure_tf_threads
+from train_lstm_model import LOTTERY_CONFIG
+
+# 可搜索的参数及默认取值
+DEFAULT_SPACE = {
+    'sequence_length': [5, 8, 10],
+    'batch_size': [16, 32],
+    'lstm_units_1': [64, 128],
+    'lstm_units_2': [32, 64],
+    'dense_units': [16, 32],
+}
+
+# 未出现在搜索空间中的参数使用 LotteryLSTMModel / train_lstm_model.py 的默认值
+DEFAULT_PARAMS = {
+    'sequence_length': 8,
+    'batch_size': 16,
+    'lstm_units_1': 128,
+    'lstm_units_2': 64,
+    'dense_units': 32,
+}
+
+
+def parse_space(value: str) -> Dict[str, List]:
+    """解析搜索空间：JSON 文件路径或 JSON 字符串，值为候选列表"""
+    if not value:
+        return dict(DEFAULT_SPACE)
+    if Path(value).exists():
+        with open(value, 'r', encoding='utf-8') as f:
+            space = json.load(f)
+    else:
+        space = json.loads(value)
+
+    unknown = [key for key in space if key not in DEFAULT_PARAMS]
+    if unknown:
+        raise ValueError(f"不支持的搜索参数: {', '.join(unknown)}")
+    for key, values in space.items():
+        if not isinstance(values, list) or not values:
+            raise ValueError(f"参数 {key} 的取值必须是非空列表")
+    return space
+
+
+def build_trials(space: Dict[str, List], search: str, num_trials: int, seed: int) -> List[Dict]:
+    """
+    生成各 trial 的完整参数
+
+    grid 为全部组合；random 从全部组合中不重复抽取 num_trials 组
+    """
+    keys = list(space)
+    combos = [dict(zip(keys, values)) for values in itertools.product(*(space[key] for key in keys))]
+    if search == 'random' and num_trials < len(combos):
+        combos = random.Random(seed).sample(combos, num_trials)
+    return [{**DEFAULT_PARAMS, **combo} for combo in combos]
+
+
+def _median_stopping_callback(trial_id: int, reports, grace_epochs: int, min_trials: int):
+    """
+    中位数提前终止回调
+
+    reports 为进程间共享的字典：trial_id -> 每轮结束时的最佳 val_loss 列表
+    """
+    import tensorflow as tf
+
+    class MedianStopping(tf.keras.callbacks.Callback):
+        def __init__(self):
+            super().__init__()
+            self.best = float('inf')
+            self.curve: List[float] = []
+            self.pruned_at = None
+
+        def on_epoch_end(self, epoch, logs=None):
+            val_loss = (logs or {}).get('val_loss')
+            if val_loss is None:
+                return
+            self.best = min(self.best, float(val_loss))
+            self.curve.append(self.best)
+            # Manager 字典中的列表需要整体赋值才会同步
+            reports[trial_id] = list(self.curve)
+
+            if epoch + 1 < grace_epochs:
+                return
+            others = [
+                curve[epoch] for key, curve in reports.items()
+                if key != trial_id and len(curve) > epoch
+            ]
+            if len(others) >= min_trials and self.best > statistics.median(others):
+                self.pruned_at = epoch + 1
+                self.model.stop_training = True
+
+    return MedianStopping()
+
+
+def run_trial(
+    trial_id: int,
+    params: Dict,
+    lottery_type: str,
+    color: str,
+    history_file: str,
+    cache_dir: str,
+    key: str,
+    epochs: int,
+    validation_split: float,
+    streaming: bool,
+    reports,
+    grace_epochs: int,
+    min_trials: int
+) -> Dict:
+    """在工作进程中训练一个 trial"""
+    result = {
+        'trial': trial_id,
+        'params': params,
+        'status': 'failed',
+        'pid': os.getpid()
+    }
+    start = time.perf_counter()
+    try:
+        from train_lstm_model import LotteryLSTMModel
+
+        config = LOTTERY_CONFIG[lottery_type]
+        cache = TensorCache(cache_dir)
+        history_data = cache.get(key)
+        if history_data is None:
+            # 缓存条目已被淘汰，重新编码
+            history_data = cache.load_or_prepare(history_file, config['red'], config['blue'], load_history_file)
+
+        model = LotteryLSTMModel(
+            num_red_balls=config['red'],
+            num_blue_balls=config['blue'],
+            sequence_length=params['sequence_length'],
+            lstm_units_1=params['lstm_units_1'],
+            lstm_units_2=params['lstm_units_2'],
+            dense_units=params['dense_units'],
+            colors=(color,)
+        )
+        stopper = _median_stopping_callback(trial_id, reports, grace_epochs, min_trials)
+        history = model.train_color(
+            history_data,
+            color,
+            epochs=epochs,
+            batch_size=params['batch_size'],
+            validation_split=validation_split,
+            streaming=streaming,
+            extra_callbacks=[stopper]
+        )
+
+        metrics = history.history
+        result['epochs_run'] = len(metrics.get('loss', []))
+        result['final_metrics'] = {name: float(values[-1]) for name, values in metrics.items() if values}
+        if metrics.get('val_loss'):
+            best_epoch = min(range(len(metrics['val_loss'])), key=metrics['val_loss'].__getitem__)
+            result['best_val_loss'] = float(metrics['val_loss'][best_epoch])
+            result['best_epoch'] = best_epoch + 1
+            result['best_metrics'] = {
+                name: float(values[best_epoch])
+                for name, values in metrics.items()
+                if name.startswith('val_') and len(values) > best_epoch
+            }
+        result['num_params'] = int(model.get_model(color).count_params())
+        result['status'] = 'pruned' if stopper.pruned_at else 'ok'
+        if stopper.pruned_at:
+            result['pruned_at'] = stopper.pruned_at
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+        result['traceback'] = traceback.format_exc()
+    finally:
+        result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def run_sweep(
+    trials: List[Dict],
+    lottery_type: str,
+    color: str,
+    history_file: str,
+    cache_dir: str,
+    epochs: int = 80,
+    validation_split: float = 0.15,
+    streaming: bool = False,
+    workers: int = 0,
+    intra_threads: int = 1,
+    inter_threads: int = 1,
+    grace_epochs: int = 10,
+    min_trials: int = 3
+) -> List[Dict]:
+    """
+    并行执行所有 trial
+
+    Args:
+        cache_dir: 张量缓存目录，主进程先写入，工作进程只读
+        grace_epochs: 前若干轮不做提前终止
+        min_trials: 同轮次至少有若干个其他 trial 的结果才做比较
+    """
+    config = LOTTERY_CONFIG[lottery_type]
+
+    # 主进程解析并编码一次，工作进程命中缓存
+    cache = TensorCache(cache_dir)
+    cache.load_or_prepare(history_file, config['red'], config['blue'], load_history_file)
+    key = cache_key(file_digest(history_file), config['red'], config['blue'])
+
+    if workers <= 0:
+        workers = max(1, (os.cpu_count() or 1) // max(intra_threads, 1))
+    workers = min(workers, len(trials))
+    print(f"Trial 数: {len(trials)}, 进程数: {workers}, 每进程线程: intra={intra_threads}, inter={inter_threads}")
+
+    results = {}
+    with Manager() as manager:
+        reports = manager.dict()
+        # spawn 避免 fork 已初始化的 TensorFlow 运行时
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=get_context('spawn'),
+            initializer=configure_tf_threads,
+            initargs=(intra_threads, inter_threads)
+        ) as executor:
+            futures = {
+                executor.submit(
+                    run_trial,
+                    trial_id,
+                    params,
+                    lottery_type,
+                    color,
+                    history_file,
+                    cache_dir,
+                    key,
+                    epochs,
+                    validation_split,
+                    streaming,
+                    reports,
+                    grace_epochs,
+                    min_trials
+                ): trial_id
+                for trial_id, params in enumerate(trials)
+            }
+            for future in as_completed(futures):
+                result = future.result()
+                results[futures[future]] = result
+                if result['status'] == 'failed':
+                    status = f"❌ {result.get('error', '')}"
+                elif result['status'] == 'pruned':
+                    status = f"✂️  第 {result['pruned_at']} 轮提前终止"
+                else:
+                    status = '✅'
+                val_loss = result.get('best_val_loss')
+                val_loss = f"{val_loss:.4f}" if val_loss is not None else '-'
+                print(f"  trial {result['trial']:>3}: val_loss={val_loss} {result['seconds']:.1f}s {status}")
+
+    return [results[trial_id] for trial_id in range(len(trials))]
+
+
+def leaderboard(results: List[Dict]) -> List[Dict]:
+    """按最佳 val_loss 升序排列，失败的 trial 排在最后"""
+    return sorted(results, key=lambda item: item.get('best_val_loss', float('inf')))
+
+
+def print_leaderboard(ranked: List[Dict], wall_time: float, top: int = 20):
+    print("\n" + "="*90)
+    print("🏆 超参数搜索排行榜")
+    print("="*90)
+    print(f"{'排名':<6}{'trial':>6}{'seq':>6}{'batch':>7}{'lstm1':>7}{'lstm2':>7}{'dense':>7}"
+          f"{'轮数':>6}{'best val_loss':>15}{'耗时(s)':>10}  状态")
+    print("-"*90)
+    for rank, item in enumerate(ranked[:top], start=1):
+        params = item['params']
+        val_loss = item.get('best_val_loss')
+        val_loss = f"{val_loss:.4f}" if val_loss is not None else '-'
+        status = {'ok': '✅', 'pruned': '✂️'}.get(item['status'], '❌')
+        print(f"{rank:<6}{item['trial']:>6}{params['sequence_length']:>6}{params['batch_size']:>7}"
+              f"{params['lstm_units_1']:>7}{params['lstm_units_2']:>7}{params['dense_units']:>7}"
+              f"{item.get('epochs_run', 0):>6}{val_loss:>15}{item['seconds']:>10.1f}  {status}")
+    print("-"*90)
+    trial_time = sum(item['seconds'] for item in ranked)
+    pruned = sum(1 for item in ranked if item['status'] == 'pruned')
+    print(f"总耗时: {wall_time:.1f}s (trial 累计 {trial_time:.1f}s), 提前终止 {pruned}/{len(ranked)} 个")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='LSTM 超参数并行搜索')
+    parser.add_argument('--lottery_type', type=str, default='ssq', choices=list(LOTTERY_CONFIG),
+                        help='彩票类型')
+    parser.add_argument('--color', type=str, default='red', choices=['red', 'blue'], help='搜索的颜色')
+    parser.add_argument('--history_file', type=str, required=True, help='历史数据文件（JSON 或 .lhb）')
+    parser.add_argument('--output_dir', type=str, default='sweeps', help='输出目录')
+    parser.add_argument('--space', type=str, default='',
+                        help='搜索空间（JSON 字符串或文件路径），默认使用 DEFAULT_SPACE')
+    parser.add_argument('--search', type=str, default='grid', choices=['grid', 'random'], help='搜索方式')
+    parser.add_argument('--trials', type=int, default=16, help='随机搜索的 trial 数')
+    parser.add_argument('--seed', type=int, default=42, help='随机搜索种子')
+    parser.add_argument('--epochs', type=int, default=80, help='每个 trial 的最大训练轮数')
+    parser.add_argument('--validation_split', type=float, default=0.15, help='验证集比例')
+    parser.add_argument('--streaming', action='store_true', help='使用 tf.data 流式生成训练窗口')
+    parser.add_argument('--workers', type=int, default=0, help='进程数（0 表示自动）')
+    parser.add_argument('--intra_threads', type=int, default=1, help='每进程 intra-op 线程数')
+    parser.add_argument('--inter_threads', type=int, default=1, help='每进程 inter-op 线程数')
+    parser.add_argument('--grace_epochs', type=int, default=10, help='前若干轮不做提前终止')
+    parser.add_argument('--min_trials', type=int, default=3, help='提前终止比较所需的最少 trial 数')
+    parser.add_argument('--cache_dir', type=str, default=None,
+                        help='张量缓存目录（默认 <output_dir>/tensor_cache）')
+
+    args = parser.parse_args()
+
+    if not Path(args.history_file).exists():
+        parser.error(f"历史数据文件不存在: {args.history_file}")
+    try:
+        space = parse_space(args.space)
+    except (ValueError, json.JSONDecodeError) as e:
+        parser.error(str(e))
+
+    trials = build_trials(space, args.search, args.trials, args.seed)
+    output_dir = Path(args.output_dir)
+    cache_dir = args.cache_dir or str(output_dir / 'tensor_cache')
+
+    print("="*60)
+    print("🔍 LSTM 超参数搜索")
+    print("="*60)
+    print(f"彩票类型: {args.lottery_type}, 颜色: {args.color}")
+    print(f"搜索方式: {args.search}, 搜索空间: {json.dumps(space, ensure_ascii=False)}")
+    print(f"提前终止: 第 {args.grace_epochs} 轮后，至少 {args.min_trials} 个 trial 参与比较")
+    print("="*60)
+
+    start = time.perf_counter()
+    results = run_sweep(
+        trials,
+        args.lottery_type,
+        args.color,
+        args.history_file,
+        cache_dir,
+        epochs=args.epochs,
+        validation_split=args.validation_split,
+        streaming=args.streaming,
+        workers=args.workers,
+        intra_threads=args.intra_threads,
+        inter_threads=args.inter_threads,
+        grace_epochs=args.grace_epochs,
+        min_trials=args.min_trials
+    )
+    wall_time = time.perf_counter() - start
+
+    ranked = leaderboard(results)
+    print_leaderboard(ranked, wall_time)
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    leaderboard_path = output_dir / 'leaderboard.json'
+    with open(leaderboard_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'lottery_type': args.lottery_type,
+            'color': args.color,
+            'history_file': args.history_file,
+            'search': args.search,
+            'space': space,
+            'epochs': args.epochs,
+            'wall_time': wall_time,
+            'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'trials': ranked
+        }, f, ensure_ascii=False, indent=2)
+    print(f"\n✅ 排行榜已保存到: {leaderboard_path}")
+
+
+if __name__ == '__main__':
+    main()
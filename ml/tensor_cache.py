@@ -0,0 +1,232 @@
+"""
+训练张量缓存
+
+按历史数据文件内容的哈希和彩种配置（红球/蓝球号码数）缓存编码后的 one-hot 矩阵，
+命中时以内存映射方式加载，跳过 JSON 解析和编码。训练窗口 X/y 由
+history_dataset.sliding_windows 在矩阵上生成视图，同一份缓存可用于任意 sequence_length
+
+缓存目录结构:
+    <cache_dir>/<key>/red.npy, blue.npy, meta.json
+
+超出容量上限或条目数上限时按最近使用时间淘汰
+
+依赖:
+    pip install numpy
+
+使用方法:
+    python train_lstm_model.py --lottery_type ssq --history_file history_ssq.json --cache_dir .cache/tensors
+    python tensor_cache.py --cache_dir .cache/tensors            # 查看缓存
+    python tensor_cache.py --cache_dir .cache/tensors --clear    # 清空缓存
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from history_dataset import encode_draws
+
+# 编码规则或存储格式变化时递增，使旧缓存失效
+CACHE_VERSION = 1
+
+COLORS = ('red', 'blue')
+
+
+def file_digest(file_path: str, chunk_size: int = 1 << 20) -> str:
+    """文件内容的 sha256"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(content_digest: str, num_red_balls: int, num_blue_balls: int) -> str:
+    raw = f"v{CACHE_VERSION}|{content_digest}|red={num_red_balls}|blue={num_blue_balls}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32]
+
+
+class CachedHistory:
+    """
+    缓存中的历史数据
+
+    只提供 len() 和 one_hot()，可直接传给 encode_draws / LotteryLSTMModel 的训练方法
+    """
+
+    def __init__(self, matrices: Dict[str, np.ndarray], meta: Dict):
+        self.matrices = matrices
+        self.meta = meta
+
+    def __len__(self) -> int:
+        return int(self.meta['num_draws'])
+
+    def one_hot(self, field: str, num_classes: int, dtype=np.float32) -> np.ndarray:
+        matrix = self.matrices[field]
+        if matrix.shape[1] != num_classes:
+            raise ValueError(f"缓存的 {field} 号码数为 {matrix.shape[1]}，与 {num_classes} 不一致")
+        return matrix if matrix.dtype == dtype else matrix.astype(dtype)
+
+
+class TensorCache:
+    """内容寻址的训练矩阵缓存"""
+
+    def __init__(self, cache_dir: str, max_bytes: int = 2 << 30, max_entries: int = 64):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    def _entry_dir(self, key: str) -> Path:
+        return self.cache_dir / key
+
+    def get(self, key: str) -> Optional[CachedHistory]:
+        entry = self._entry_dir(key)
+        meta_path = entry / 'meta.json'
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            matrices = {color: np.load(entry / f"{color}.npy", mmap_mode='r') for color in COLORS}
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+        if meta.get('version') != CACHE_VERSION:
+            return None
+        # 以 meta.json 的修改时间记录最近使用时间
+        os.utime(meta_path)
+        return CachedHistory(matrices, meta)
+
+    def put(self, key: str, history_data, num_red_balls: int, num_blue_balls: int, source: str = '') -> CachedHistory:
+        """编码并写入缓存，返回内存映射加载的结果"""
+        matrices = {
+            'red': encode_draws(history_data, 'red', num_red_balls),
+            'blue': encode_draws(history_data, 'blue', num_blue_balls),
+        }
+        meta = {
+            'version': CACHE_VERSION,
+            'source': source,
+            'num_draws': len(history_data),
+            'num_red_balls': num_red_balls,
+            'num_blue_balls': num_blue_balls,
+            'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'bytes': int(sum(matrix.nbytes for matrix in matrices.values())),
+        }
+
+        entry = self._entry_dir(key)
+        if entry.exists() and self.get(key) is None:
+            # 损坏或不完整的条目
+            shutil.rmtree(entry, ignore_errors=True)
+
+        # 先写入临时目录再重命名，避免并发训练进程读到写了一半的条目
+        tmp_dir = Path(tempfile.mkdtemp(prefix=f".{key}.", dir=self.cache_dir))
+        try:
+            for color, matrix in matrices.items():
+                np.save(tmp_dir / f"{color}.npy", matrix)
+            with open(tmp_dir / 'meta.json', 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_dir, entry)
+        except OSError:
+            # 其他进程已写入相同条目
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        self.evict(keep=key)
+        cached = self.get(key)
+        return cached if cached is not None else CachedHistory(matrices, meta)
+
+    def load_or_prepare(
+        self,
+        history_file: str,
+        num_red_balls: int,
+        num_blue_balls: int,
+        loader: Callable[[str], object]
+    ) -> CachedHistory:
+        """
+        按文件内容查找缓存，未命中时用 loader 加载历史数据并编码写入
+
+        Args:
+            history_file: 历史数据文件
+            loader: 加载函数（如 history_dataset.load_history_file）
+        """
+        start = time.perf_counter()
+        key = cache_key(file_digest(history_file), num_red_balls, num_blue_balls)
+        cached = self.get(key)
+        if cached is not None:
+            self.hits += 1
+            print(f"💾 张量缓存命中: {key} ({len(cached)} 期, {time.perf_counter() - start:.3f}s)")
+            return cached
+
+        self.misses += 1
+        cached = self.put(key, loader(history_file), num_red_balls, num_blue_balls, source=str(history_file))
+        print(f"💾 张量缓存未命中，已写入: {key} ({len(cached)} 期, {time.perf_counter() - start:.3f}s)")
+        return cached
+
+    def entries(self) -> List[Dict]:
+        """所有缓存条目，最近使用的在前"""
+        result = []
+        for entry in self.cache_dir.iterdir():
+            meta_path = entry / 'meta.json'
+            if entry.name.startswith('.') or not meta_path.exists():
+                continue
+            size = sum(path.stat().st_size for path in entry.iterdir())
+            result.append({
+                'key': entry.name,
+                'bytes': size,
+                'last_used': meta_path.stat().st_mtime,
+                'path': entry
+            })
+        return sorted(result, key=lambda item: item['last_used'], reverse=True)
+
+    def evict(self, keep: Optional[str] = None) -> int:
+        """按最近使用时间淘汰超出容量或条目数上限的缓存，返回淘汰数量"""
+        total = 0
+        evicted = 0
+        for index, item in enumerate(self.entries()):
+            total += item['bytes']
+            if item['key'] == keep:
+                continue
+            if index >= self.max_entries or total > self.max_bytes:
+                shutil.rmtree(item['path'], ignore_errors=True)
+                total -= item['bytes']
+                evicted += 1
+        if evicted:
+            print(f"🧹 张量缓存淘汰 {evicted} 个条目")
+        return evicted
+
+    def clear(self):
+        for item in self.entries():
+            shutil.rmtree(item['path'], ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='训练张量缓存管理')
+    parser.add_argument('--cache_dir', type=str, required=True, help='缓存目录')
+    parser.add_argument('--clear', action='store_true', help='清空缓存')
+
+    args = parser.parse_args()
+
+    cache = TensorCache(args.cache_dir)
+    if args.clear:
+        cache.clear()
+        print(f"✅ 已清空缓存: {args.cache_dir}")
+        return
+
+    entries = cache.entries()
+    print(f"缓存目录: {args.cache_dir}, 共 {len(entries)} 个条目, "
+          f"{sum(item['bytes'] for item in entries) / 1024 / 1024:.2f} MB")
+    for item in entries:
+        with open(item['path'] / 'meta.json', 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        last_used = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(item['last_used']))
+        print(f"  {item['key']}  {meta['num_draws']:>6} 期  red={meta['num_red_balls']:<3} "
+              f"blue={meta['num_blue_balls']:<3} {item['bytes'] / 1024:>10.1f} KB  {last_used}  {meta['source']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+# ml/ 下的脚本以顶层模块互相导入
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def raw_draw(issue: int, red_count: int = 6, blue_count: int = 1) -> dict:
+    """与开奖接口相同格式的一期数据（号码由期号决定）"""
+    red = sorted({(issue * 7 + i * 5) % 33 + 1 for i in range(red_count * 3)})[:red_count]
+    blue = [(issue + i) % 16 + 1 for i in range(blue_count)]
+    return {
+        'issue': str(issue),
+        'red': ' '.join(f"{n:02d}" for n in red),
+        'blue': ' '.join(f"{n:02d}" for n in blue),
+        'drawdate': f"day-{issue}"
+    }
+
+
+class HistoryStub:
+    """
+    本地开奖接口桩：GET /history?code=..&size=.. 返回最新的 size 期（最新一期在前）
+
+    draws 为 {code: [期号, ...]}，shapes 为 {code: (红球数, 蓝球数)}，
+    requests 记录每次请求的 (code, size, 线程名)
+    """
+
+    def __init__(self):
+        self.draws = {}
+        self.shapes = {}
+        self.requests = []
+        self.duplicate_latest = False
+        self._lock = threading.Lock()
+
+    def add(self, code: str, first: int, last: int, red_count: int = 6, blue_count: int = 1):
+        self.draws.setdefault(code, []).extend(range(first, last + 1))
+        self.shapes[code] = (red_count, blue_count)
+
+    def handle(self, handler: BaseHTTPRequestHandler):
+        url = urlparse(handler.path)
+        query = parse_qs(url.query)
+        code = query['code'][0]
+        size = int(query['size'][0])
+        with self._lock:
+            self.requests.append((code, size, threading.current_thread().name))
+        issues = sorted(self.draws.get(code, []), reverse=True)[:size]
+        data = [raw_draw(issue, *self.shapes.get(code, (6, 1))) for issue in issues]
+        if self.duplicate_latest and data:
+            data.insert(1, dict(data[0]))
+        body = json.dumps({'code': 0, 'data': data}).encode()
+        handler.send_response(200 if url.path.endswith('/history') else 404)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+
+@pytest.fixture
+def history_api():
+    """启动本地开奖接口桩，返回 (stub, base_url)"""
+    stub = HistoryStub()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            stub.handle(self)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    try:
+        yield stub, f"http://127.0.0.1:{server.server_address[1]}/api/"
+    finally:
+        server.shutdown()
+        server.server_close()
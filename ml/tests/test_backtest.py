@@ -0,0 +1,119 @@
+import numpy as np
+import pytest
+
+import backtest
+from backtest import backtest_models, build_backtest_windows, summarize_hits
+from history_dataset import encode_draws, sliding_windows
+
+NUM_CLASSES = {'red': 10, 'blue': 4}
+
+
+def chronological(num_draws=12):
+    return [
+        {
+            'issue': f"2024{i + 1:03d}",
+            'red': [f"{(i + j) % 10 + 1:02d}" for j in range(3)],
+            'blue': [f"{i % 4 + 1:02d}"]
+        }
+        for i in range(num_draws)
+    ]
+
+
+def test_only_draws_after_start_issue_are_evaluated():
+    history = chronological()
+    inputs, targets, issues = build_backtest_windows(history, NUM_CLASSES, ['red'], 3, '2024008')
+
+    assert issues == ['2024009', '2024010', '2024011', '2024012']
+    assert inputs['red'].shape == (4, 3, 10)
+    np.testing.assert_array_equal(targets['red'], encode_draws(history, 'red', 10)[8:])
+    np.testing.assert_array_equal(targets['blue'], encode_draws(history, 'blue', 4)[8:])
+
+    _, _, issues = build_backtest_windows(history, NUM_CLASSES, ['red'], 3, '2024008', last=2)
+    assert issues == ['2024011', '2024012']
+
+
+def test_window_order_follows_time_order():
+    history = chronological()
+    windows, _ = sliding_windows(encode_draws(history, 'red', 10), 3)
+
+    oldest, _, _ = build_backtest_windows(history, NUM_CLASSES, ['red'], 3, '2024008', 'oldest_first')
+    newest, _, _ = build_backtest_windows(history, NUM_CLASSES, ['red'], 3, '2024008', 'newest_first')
+
+    np.testing.assert_array_equal(oldest['red'], windows[5:])
+    # newest_first 窗口位置 0 为截止点前最近一期（与 LSTMPredictor 一致）
+    np.testing.assert_array_equal(newest['red'], windows[5:, ::-1])
+    np.testing.assert_array_equal(newest['red'][0, 0], encode_draws(history, 'red', 10)[7])
+
+
+def test_multi_head_input_puts_blue_after_red():
+    history = chronological()
+    inputs, _, _ = build_backtest_windows(history, NUM_CLASSES, ['multi'], 3, '2024010')
+    red, _, _ = build_backtest_windows(history, NUM_CLASSES, ['red'], 3, '2024010')
+    blue, _, _ = build_backtest_windows(history, NUM_CLASSES, ['blue'], 3, '2024010')
+
+    assert list(inputs) == ['multi']
+    np.testing.assert_array_equal(inputs['multi'], np.concatenate([red['red'], blue['blue']], axis=2))
+
+
+def test_history_without_issues_is_rejected():
+    history = [{'red': item['red'], 'blue': item['blue']} for item in chronological()]
+    with pytest.raises(ValueError):
+        build_backtest_windows(history, NUM_CLASSES, ['red'], 3, '2024008')
+
+
+def test_summarize_hits_counts_top_k_matches():
+    targets = np.array([[1, 1, 0, 0], [0, 0, 1, 1]], dtype=np.float32)
+    probabilities = np.array([[0.9, 0.1, 0.8, 0.0], [0.1, 0.2, 0.3, 0.9]])
+
+    result = summarize_hits(probabilities, targets, ['1', '2'])
+
+    assert result['top_k'] == 2 and result['draw_size'] == 2
+    assert result['distribution'] == {'0': 0, '1': 1, '2': 1}
+    assert result['mean_hits'] == 1.5
+    assert result['random_expected_hits'] == 1.0
+    assert summarize_hits(probabilities[:0], targets[:0], []) is None
+
+
+class OracleRunner:
+    """按输入窗口的最后一期（oldest_first）把下一期号码预测为开奖号码"""
+
+    history = None
+
+    def __init__(self, model_path, key, chunk_size=1024):
+        self.key = key
+
+    def predict(self, X):
+        lookup = {}
+        for color in ('red', 'blue'):
+            matrix = encode_draws(self.history, color, NUM_CLASSES[color])
+            lookup[color] = {matrix[i].tobytes(): matrix[i + 1] for i in range(len(matrix) - 1)}
+        outputs = {}
+        for color in (('red', 'blue') if self.key == 'multi' else (self.key,)):
+            offset = NUM_CLASSES['red'] if self.key == 'multi' and color == 'blue' else 0
+            latest = X[:, -1, offset:offset + NUM_CLASSES[color]]
+            outputs[color] = np.stack([lookup[color][row.astype(np.float32).tobytes()] for row in latest])
+        return outputs
+
+
+@pytest.mark.parametrize('model_files', [
+    {'red': 'lottery_lstm_red.tflite', 'blue': 'lottery_lstm_blue.tflite'},
+    {'multi': 'lottery_lstm_multi.tflite'},
+])
+def test_backtest_models_scores_each_color(monkeypatch, model_files):
+    history = chronological()
+    OracleRunner.history = history
+    monkeypatch.setattr(backtest, 'ModelRunner', OracleRunner)
+
+    # 输入最新一期在后的窗口，newest_first 的历史数据会先按期号排序
+    results = backtest_models(history[::-1], model_files, NUM_CLASSES, '2024008',
+                              sequence_length=3, time_order='oldest_first')
+
+    assert sorted(results) == ['blue', 'red']
+    assert results['red']['mean_hits'] == 3 and results['blue']['mean_hits'] == 1
+    assert results['red']['first_issue'] == '2024009' and results['red']['num_draws'] == 4
+    assert results['red']['start_issue'] == '2024008'
+
+    only_blue = backtest_models(history, model_files, NUM_CLASSES, '2024008', colors=['blue'],
+                                sequence_length=3, time_order='oldest_first')
+    assert list(only_blue) == ['blue']
+    assert backtest_models(history, model_files, NUM_CLASSES, '2024012', sequence_length=3) == {}
@@ -0,0 +1,125 @@
+import math
+
+import numpy as np
+import pytest
+
+from batch_scorer import RECENT_WINDOW, SCORE_NAMES, score_numbers, select_cut_points
+
+
+def sample_history(num_draws: int, number_range, per_draw: int, replace: bool, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    low, high = number_range
+    history = []
+    for i in range(num_draws):
+        numbers = rng.choice(np.arange(low, high + 1), size=per_draw, replace=replace)
+        history.append({'issue': f"2024{i + 1:04d}", 'red': [f"{n:02d}" for n in numbers], 'blue': []})
+    # 打乱顺序，score_numbers 应按期号排序
+    rng.shuffle(history)
+    return history
+
+
+def reference_scores(history, field, number_range):
+    """
+    逐号码照搬 PredictionEngine.kt 的 calculate*Score（history[0] 为最新一期，不含 markovCache）
+    """
+    draws = [[int(n) for n in item[field]] for item in history]
+    states = [','.join(sorted(item[field])) for item in history]
+    recent = draws[:RECENT_WINDOW]
+    older = draws[RECENT_WINDOW:2 * RECENT_WINDOW]
+    size = len(draws)
+    scores = {name: [] for name in SCORE_NAMES}
+
+    for number in range(number_range[0], number_range[1] + 1):
+        appearances = sum(draw.count(number) for draw in draws)
+        scores['frequency'].append(min(appearances / size / 0.2, 1.0))
+
+        omission = 0
+        for draw in draws:
+            if number in draw:
+                break
+            omission += 1
+        max_omission = current = 0
+        for draw in reversed(draws):
+            if number in draw:
+                max_omission = max(max_omission, current)
+                current = 0
+            else:
+                current += 1
+        max_omission = max(max_omission, current)
+        scores['omission'].append(
+            0.5 if max_omission == 0 else 1 / (1 + math.exp(-5 * (omission / max_omission - 0.5)))
+        )
+
+        recent_hits = sum(number in draw for draw in recent)
+        if not older:
+            scores['trend'].append(0.5)
+        else:
+            trend = (recent_hits / len(recent) - sum(number in draw for draw in older) / len(older) + 0.2) / 0.4
+            scores['trend'].append(min(max(trend, 0.0), 1.0))
+
+        co_occurrences = {}
+        for draw in draws:
+            if number in draw:
+                for other in draw:
+                    if other != number:
+                        co_occurrences[other] = co_occurrences.get(other, 0) + 1
+        average = sum(co_occurrences.values()) / len(co_occurrences) / size if co_occurrences else 0.0
+        scores['association'].append(min(average / 0.1, 1.0))
+
+        if size < 2:
+            scores['markov'].append(0.5)
+        else:
+            transitions = occurrences = 0
+            for i in range(size - 1):
+                if states[i] == states[0]:
+                    occurrences += 1
+                    transitions += number in draws[i + 1]
+            scores['markov'].append(min(max(transitions / occurrences, 0.0), 1.0) if occurrences else 0.5)
+
+        prior = appearances / size
+        likelihood = recent_hits / appearances if appearances > 0 else 0.0
+        evidence = len(recent) / size
+        scores['bayes'].append(min(max(likelihood * prior / evidence, 0.0), 1.0))
+
+    return {name: np.asarray(values) for name, values in scores.items()}
+
+
+@pytest.mark.parametrize('number_range, per_draw, replace', [
+    ((1, 12), 3, False),   # 乐透型，号码不重复
+    ((0, 4), 3, True),     # 位置型，同一期可能出现重复数字
+])
+def test_scores_match_prediction_engine(number_range, per_draw, replace):
+    history = sample_history(60, number_range, per_draw, replace)
+    chronological = sorted(history, key=lambda item: item['issue'])
+    cuts = [1, 2, 5, RECENT_WINDOW, RECENT_WINDOW + 1, 2 * RECENT_WINDOW + 3, 60]
+
+    scores = score_numbers(history, 'red', number_range, cuts)
+
+    np.testing.assert_array_equal(scores['numbers'], np.arange(number_range[0], number_range[1] + 1))
+    for row, cut in enumerate(cuts):
+        # App 看到的历史：截止点之前的各期，最新一期在前
+        expected = reference_scores(chronological[:cut][::-1], 'red', number_range)
+        for name in SCORE_NAMES:
+            np.testing.assert_allclose(scores[name][row], expected[name], atol=1e-6, err_msg=f"{name} @ {cut}")
+
+
+def test_out_of_range_numbers_are_ignored():
+    history = [
+        {'issue': '1', 'red': ['01', '99']},
+        {'issue': '2', 'red': ['02', '00']},
+    ]
+    scores = score_numbers(history, 'red', (1, 3))
+    np.testing.assert_allclose(scores['frequency'][-1], [1.0, 1.0, 0.0])
+
+
+def test_cut_points_are_validated():
+    history = sample_history(5, (1, 5), 2, False)
+    with pytest.raises(ValueError):
+        score_numbers(history, 'red', (1, 5), [0])
+    with pytest.raises(ValueError):
+        score_numbers(history, 'red', (1, 5), [6])
+
+
+def test_select_cut_points_keeps_latest():
+    np.testing.assert_array_equal(select_cut_points(10, None, 1), np.arange(1, 11))
+    np.testing.assert_array_equal(select_cut_points(10, 5, 2), [6, 8, 10])
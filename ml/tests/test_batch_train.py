@@ -0,0 +1,30 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import batch_train
+from train_lstm_model import LOTTERY_CONFIG
+
+ML_DIR = Path(__file__).resolve().parent.parent
+
+
+def test_all_lottery_types_follow_lottery_config():
+    assert batch_train.ALL_LOTTERY_TYPES == list(LOTTERY_CONFIG)
+
+
+def test_import_does_not_load_tensorflow():
+    # 工作进程在 _init_worker 中设置线程数，之前不能导入 TensorFlow
+    code = "import sys, batch_train; print('tensorflow' in sys.modules)"
+    output = subprocess.run([sys.executable, '-c', code], cwd=ML_DIR, capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == 'False'
+
+
+def test_missing_history_file_fails_job(tmp_path):
+    result = batch_train.train_job(
+        'ssq', 'red', str(tmp_path / 'missing.json'), str(tmp_path / 'models'),
+        epochs=1, batch_size=4, sequence_length=3, validation_split=0.2
+    )
+
+    assert result['status'] == 'failed'
+    assert 'missing.json' in result['error']
+    assert result['lottery_type'] == 'ssq' and result['color'] == 'red'
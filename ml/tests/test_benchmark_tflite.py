@@ -0,0 +1,60 @@
+import numpy as np
+
+from benchmark_tflite import compare_results, find_models, model_field, prepare_combined_input, prepare_input
+
+HISTORY = [
+    {'red': ['01', '05', '33'], 'blue': ['16']},
+    {'red': ['02', '34', '00'], 'blue': ['17']},
+    {'red': ['03'], 'blue': ['01']},
+]
+
+
+def test_prepare_input_follows_lstm_predictor():
+    x = prepare_input(HISTORY, 'red', 33, sequence_length=4)
+
+    assert x.shape == (1, 4, 33) and x.dtype == np.float32
+    # 最新一期在前，越界号码（34、00）忽略，不足的期全为 0
+    assert np.flatnonzero(x[0, 0]).tolist() == [0, 4, 32]
+    assert np.flatnonzero(x[0, 1]).tolist() == [1]
+    assert np.flatnonzero(x[0, 2]).tolist() == [2]
+    assert not x[0, 3].any()
+
+
+def test_combined_input_puts_blue_after_red():
+    x = prepare_combined_input(HISTORY, 33, 16, sequence_length=3)
+
+    assert x.shape == (1, 3, 49)
+    np.testing.assert_array_equal(x[..., :33], prepare_input(HISTORY, 'red', 33, 3))
+    np.testing.assert_array_equal(x[..., 33:], prepare_input(HISTORY, 'blue', 16, 3))
+    assert np.flatnonzero(x[0, 0]).tolist() == [0, 4, 32, 33 + 15]
+    assert np.flatnonzero(x[0, 1]).tolist() == [1]
+
+
+def test_find_models_skips_step_models(tmp_path):
+    for name in ('lottery_lstm_red.tflite', 'lottery_lstm_blue.tflite', 'lottery_lstm_multi.tflite',
+                 'lottery_lstm_red_step.tflite', 'lottery_lstm_multi_step.tflite', 'other.tflite'):
+        (tmp_path / name).write_bytes(b'')
+
+    assert [p.name for p in find_models(str(tmp_path))] == [
+        'lottery_lstm_blue.tflite', 'lottery_lstm_multi.tflite', 'lottery_lstm_red.tflite'
+    ]
+    assert [model_field(p) for p in find_models(str(tmp_path))] == ['blue', None, 'red']
+
+
+def test_compare_results_flags_regressions_above_threshold():
+    def result(load_ms, p50):
+        return {'models': [{
+            'model': 'lottery_lstm_red.tflite',
+            'cold_load_ms': load_ms,
+            'size_kb': 100.0,
+            'configs': [
+                {'threads': 1, 'batch_size': 1, 'p50_ms': p50, 'p95_ms': 1.0, 'p99_ms': 1.0},
+                {'threads': 1, 'batch_size': 8, 'error': 'fixed batch'}
+            ]
+        }]}
+
+    regressions = compare_results(result(10.0, 1.0), result(10.5, 1.5), threshold=0.10)
+
+    assert [(item['metric'], round(item['change'], 2)) for item in regressions] == [
+        ('threads=1,batch=1:p50_ms', 0.5)
+    ]
@@ -0,0 +1,96 @@
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from batch_scorer import NUMBER_RANGES
+from bulk_verifier import DIGIT_LOTTERIES, PRIZE_RULES, TicketEncoder, popcount, verify_all
+
+# (开奖红球数, 开奖蓝球数, 投注红球数, 投注蓝球数)，投注可为复式
+SHAPES = {
+    'ssq': (6, 1, 8, 2),
+    'dlt': (5, 2, 5, 2),
+    'qlc': (7, 1, 7, 0),
+    'kl8': (20, 0, 10, 0),
+    'fc3d': (3, 0, 3, 0),
+    'pl5': (5, 0, 5, 0),
+    'qxc': (6, 1, 6, 1),
+}
+
+
+def random_items(lottery_type: str, count: int, red: int, blue: int, rng):
+    ranges = NUMBER_RANGES[lottery_type]
+    items = []
+    for _ in range(count):
+        item = {}
+        for color, k in (('red', red), ('blue', blue)):
+            low, high = ranges[color]
+            if lottery_type in DIGIT_LOTTERIES:
+                numbers = rng.integers(low, high + 1, size=k)
+            else:
+                numbers = rng.choice(np.arange(low, high + 1), size=k, replace=False)
+            item[color] = [f"{n:02d}" for n in numbers]
+        items.append(item)
+    return items
+
+
+def reference_tier(lottery_type: str, ticket: dict, draw: dict):
+    """按开奖规则逐注核对"""
+    rule = PRIZE_RULES[lottery_type]
+    if lottery_type in DIGIT_LOTTERIES:
+        a = [int(n) for n in ticket['red'] + ticket.get('blue', [])]
+        b = [int(n) for n in draw['red'] + draw.get('blue', [])]
+        positions = sum(x == y for x, y in zip(a, b))
+        multiset = sum((Counter(a) & Counter(b)).values())
+        return rule(positions, multiset)
+    red = len(set(ticket['red']) & set(draw['red']))
+    blue = len(set(ticket.get('blue', [])) & set(draw.get('blue', [])))
+    return rule(red, blue)
+
+
+@pytest.mark.parametrize('lottery_type', list(SHAPES))
+def test_verify_all_matches_brute_force(lottery_type):
+    rng = np.random.default_rng(1)
+    draw_red, draw_blue, ticket_red, ticket_blue = SHAPES[lottery_type]
+    draws = random_items(lottery_type, 40, draw_red, draw_blue, rng)
+    tickets = random_items(lottery_type, 60, ticket_red, ticket_blue, rng)
+    # 保证高奖级也被覆盖
+    tickets[0] = dict(draws[3])
+    if lottery_type in ('fc3d', 'pl3'):
+        tickets[1] = {'red': draws[5]['red'][::-1]}
+
+    encoder = TicketEncoder(lottery_type)
+    # 很小的分块，覆盖多块拼接
+    counts = verify_all(encoder, encoder.encode(tickets), encoder.encode(draws), chunk_cells=97)
+
+    expected = np.zeros_like(counts)
+    for row, ticket in enumerate(tickets):
+        for draw in draws:
+            tier = reference_tier(lottery_type, ticket, draw)
+            expected[row, encoder.tiers.index(tier) if tier else len(encoder.tiers)] += 1
+    np.testing.assert_array_equal(counts, expected)
+    assert counts[0, 0] >= 1
+
+
+def test_parallel_workers_keep_ticket_order():
+    encoder = TicketEncoder('ssq')
+    draws = encoder.random_tickets(30, seed=1)
+    tickets = encoder.random_tickets(500, seed=2)
+
+    serial = verify_all(encoder, tickets, draws, workers=1, chunk_cells=30 * 64)
+    parallel = verify_all(encoder, tickets, draws, workers=2, chunk_cells=30 * 64)
+    np.testing.assert_array_equal(parallel, serial)
+    assert (serial.sum(axis=1) == 30).all()
+
+
+def test_random_tickets_have_draw_shape():
+    encoder = TicketEncoder('dlt')
+    tickets = encoder.random_tickets(100, seed=0)
+    assert (popcount(tickets[:, :encoder.words_a]).sum(axis=1) == 5).all()
+    assert (popcount(tickets[:, encoder.words_a:]).sum(axis=1) == 2).all()
+
+def test_unknown_lottery_and_bad_digit_count_are_rejected():
+    with pytest.raises(ValueError):
+        TicketEncoder('unknown')
+    with pytest.raises(ValueError):
+        TicketEncoder('fc3d').encode([{'red': ['1', '2']}])
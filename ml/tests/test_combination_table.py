@@ -0,0 +1,82 @@
+import math
+from itertools import combinations
+
+import numpy as np
+import pytest
+
+import combination_table
+from combination_table import (
+    CombinationTable, build_table, combination_features, combination_rank, enumerate_combinations, parse_filters
+)
+
+PRIMES = {2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41, 43, 47, 53, 59, 61, 67, 71, 73, 79}
+
+
+def reference_features(combo, low, high):
+    zone_size = (high - low + 1) // 3
+    mid = (low + high) // 2
+    zones = [min((n - low) // zone_size, 2) for n in combo]
+    return {
+        'sum': sum(combo),
+        'span': combo[-1] - combo[0],
+        'ac': len({b - a for a, b in combinations(combo, 2)}) - (len(combo) - 1),
+        'odd': sum(n % 2 for n in combo),
+        'prime': sum(n in PRIMES for n in combo),
+        'zone1': zones.count(0),
+        'zone2': zones.count(1),
+        'zone3': zones.count(2),
+        'big': sum(n > mid for n in combo),
+    }
+
+
+@pytest.mark.parametrize('low, high, k', [(1, 12, 2), (1, 16, 5), (1, 33, 6)])
+def test_enumeration_matches_itertools(low, high, k):
+    combos = enumerate_combinations(low, high, k)
+    expected = list(combinations(range(low, high + 1), k))
+    assert combos.shape == (math.comb(high - low + 1, k), k)
+    # 只对前后各一段逐行比较，避免大表在 Python 中展开过慢
+    assert [tuple(row) for row in combos[:2000].tolist()] == expected[:2000]
+    assert [tuple(row) for row in combos[-2000:].tolist()] == expected[-2000:]
+
+
+def test_features_and_rank_match_brute_force():
+    low, high, k = 1, 20, 5
+    combos = enumerate_combinations(low, high, k)
+    features = combination_features(combos, low, high)
+    for row, combo in enumerate(combinations(range(low, high + 1), k)):
+        assert combination_rank(list(combo)[::-1], low, high) == row
+        if row % 7 == 0:
+            expected = reference_features(combo, low, high)
+            assert {name: int(values[row]) for name, values in features.items()} == expected, combo
+
+
+def test_built_table_filters_and_ranks_like_brute_force(tmp_path, monkeypatch):
+    # 分块边界不与首号码分组对齐
+    monkeypatch.setattr(combination_table, 'CHUNK_ROWS', 37)
+    build_table(str(tmp_path), 'dlt', 'blue')
+    table = CombinationTable(str(tmp_path), 'dlt', 'blue')
+    combos = list(combinations(range(1, 13), 2))
+
+    assert len(table) == len(combos) == 66
+    filters = parse_filters('sum=10:14, odd=1')
+    assert filters == {'sum': (10, 14), 'odd': (1, 1)}
+    expected_rows = [row for row, combo in enumerate(combos)
+                     if 10 <= sum(combo) <= 14 and sum(n % 2 for n in combo) == 1]
+    assert table.filter(filters).tolist() == expected_rows
+    with pytest.raises(KeyError):
+        table.mask({'unknown': (0, 1)})
+
+    probabilities = np.random.default_rng(0).random(12).astype(np.float32)
+    rows, scores = table.rank(table.filter({}), probabilities, top=3)
+    brute = sorted(range(len(combos)), key=lambda row: -sum(probabilities[n - 1] for n in combos[row]))[:3]
+    assert rows.tolist() == brute
+    np.testing.assert_allclose(scores, [sum(probabilities[n - 1] for n in combos[row]) for row in brute], rtol=1e-6)
+
+    row = table.row_of([11, 3])
+    assert tuple(table.numbers[row]) == (3, 11)
+    assert table.features(row) == reference_features((3, 11), 1, 12)
+
+
+def test_digit_lotteries_are_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        build_table(str(tmp_path), 'fc3d', 'red')
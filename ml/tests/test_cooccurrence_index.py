@@ -0,0 +1,70 @@
+from itertools import combinations
+
+import numpy as np
+import pytest
+
+from batch_scorer import score_numbers
+from cooccurrence_index import CooccurrenceIndex, update_index_file
+
+
+def sample_history(num_draws: int, low: int, high: int, per_draw: int, replace: bool, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            'issue': f"2024{i + 1:04d}",
+            'red': [f"{n:02d}" for n in rng.choice(np.arange(low, high + 1), size=per_draw, replace=replace)]
+        }
+        for i in range(num_draws)
+    ]
+
+
+def test_counts_match_brute_force():
+    history = sample_history(50, 1, 33, 6, replace=False)
+    index = CooccurrenceIndex.build('ssq', 'red', history[::-1])
+    draws = [{int(n) for n in item['red']} for item in history]
+
+    for a, b in [(1, 2), (5, 5), (7, 30), (33, 1)]:
+        assert index.pair_count(a, b) == sum(a in draw and b in draw for draw in draws)
+    for a, b, c in combinations([3, 9, 14, 21, 28], 3):
+        assert index.triple_count(c, a, b) == sum({a, b, c} <= draw for draw in draws)
+    for a, b in [(1, 2), (12, 12), (33, 4)]:
+        expected = sum(a in prev and b in cur for prev, cur in zip(draws, draws[1:]))
+        assert int(index.transitions[a - 1, b - 1]) == expected
+
+    partners = index.top_partners(9, k=5)
+    assert [count for _, count in partners] == sorted((count for _, count in partners), reverse=True)
+    assert partners[0][1] == max(index.pair_count(9, n) for n in range(1, 34) if n != 9)
+
+    third = index.top_third_partners(3, 9, k=3)
+    assert third[0][1] == max(index.triple_count(3, 9, n) for n in range(1, 34) if n not in (3, 9))
+
+
+def test_association_scores_match_batch_scorer():
+    # 位置型彩种：同一期可出现重复数字
+    history = sample_history(40, 0, 9, 3, replace=True)
+    index = CooccurrenceIndex.build('fc3d', 'red', history)
+    expected = score_numbers(history, 'red', (0, 9), [40])['association'][0]
+    np.testing.assert_allclose(index.association_scores(), expected, atol=1e-6)
+
+
+def test_invalid_queries_raise():
+    index = CooccurrenceIndex.build('ssq', 'red', sample_history(5, 1, 33, 6, replace=False))
+    with pytest.raises(ValueError):
+        index.pair_count(0, 1)
+    with pytest.raises(ValueError):
+        index.triple_count(1, 1, 2)
+
+
+def test_incremental_file_update_matches_rebuild(tmp_path):
+    history = sample_history(30, 1, 33, 6, replace=False)
+    path = str(tmp_path / 'cooc_ssq.npz')
+
+    update_index_file(path, 'ssq', 'red', history[:12])
+    incremental = update_index_file(path, 'ssq', 'red', history)
+    rebuilt = CooccurrenceIndex.build('ssq', 'red', history)
+    loaded = CooccurrenceIndex.load(path)
+
+    for index in (incremental, loaded):
+        assert index.history_size == 30 and index.last_issue == '20240030'
+        for name in ('pairs', 'triples', 'transitions', 'weighted_pairs', 'previous'):
+            np.testing.assert_array_equal(getattr(index, name), getattr(rebuilt, name))
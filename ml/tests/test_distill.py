@@ -0,0 +1,67 @@
+"""
+蒸馏学生模型测试（需要 TensorFlow，未安装时跳过）
+
+使用方法:
+    python -m pytest -q ml/tests
+"""
+
+import numpy as np
+import pytest
+
+tf = pytest.importorskip('tensorflow')
+
+from history_dataset import sliding_windows
+from train_lstm_model import LotteryLSTMModel
+
+NUM_RED = 12
+NUM_BLUE = 5
+SEQUENCE_LENGTH = 4
+
+
+def sample_history(num_draws: int = 40, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            'issue': f"2024{num_draws - i:03d}",
+            'red': [f"{n:02d}" for n in sorted(rng.choice(np.arange(1, NUM_RED + 1), size=3, replace=False))],
+            'blue': [f"{rng.integers(1, NUM_BLUE + 1):02d}"]
+        }
+        for i in range(num_draws)
+    ]
+
+
+def small_model(architecture: str) -> LotteryLSTMModel:
+    tf.keras.utils.set_random_seed(0)
+    return LotteryLSTMModel(
+        num_red_balls=NUM_RED,
+        num_blue_balls=NUM_BLUE,
+        sequence_length=SEQUENCE_LENGTH,
+        lstm_units_1=8,
+        lstm_units_2=6,
+        dense_units=4,
+        architecture=architecture
+    )
+
+
+@pytest.mark.parametrize('architecture, student_type', [('separate', 'gru'), ('multi_head', 'conv')])
+def test_students_keep_teacher_signature(architecture, student_type):
+    model = small_model(architecture)
+    history = sample_history()
+
+    students = model.distill(history, student_type=student_type, units=4, epochs=1, batch_size=8)
+
+    for key, teacher, matrix in model._model_matrices(history):
+        student = students[key]
+        X, _ = sliding_windows(matrix, SEQUENCE_LENGTH)
+        assert student.count_params() < teacher.count_params()
+        assert tuple(student.inputs[0].shape) == tuple(teacher.inputs[0].shape)
+        expected = model._heads(key, teacher.predict(X, verbose=0))
+        actual = model._heads(key, student.predict(X, verbose=0))
+        assert {color: value.shape for color, value in actual.items()} == \
+            {color: value.shape for color, value in expected.items()}
+        assert all(((value >= 0) & (value <= 1)).all() for value in actual.values())
+
+
+def test_unknown_student_type_is_rejected():
+    with pytest.raises(ValueError):
+        small_model('separate').distill(sample_history(), student_type='transformer', epochs=1)
@@ -0,0 +1,58 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fetch_history_data import LotteryDataFetcher, RateLimiter, fetch_many
+
+
+def test_each_thread_gets_its_own_session():
+    fetcher = LotteryDataFetcher('key', 'http://127.0.0.1:1/api')
+    barrier = threading.Barrier(4)
+
+    def session_id(_):
+        barrier.wait()
+        return id(fetcher.session), fetcher.session is fetcher.session
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(session_id, range(4)))
+
+    assert all(same for _, same in results)
+    assert len({ident for ident, _ in results}) == 4
+
+
+def test_rate_limiter_spaces_requests_across_threads():
+    limiter = RateLimiter(50.0)
+    times = []
+    lock = threading.Lock()
+
+    def acquire(_):
+        limiter.acquire()
+        with lock:
+            times.append(time.monotonic())
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(acquire, range(6)))
+
+    times.sort()
+    # 6 次请求至少相隔 5 个间隔（0.02 秒），留出计时误差
+    assert times[-1] - times[0] >= 5 * 0.02 * 0.9
+
+
+def test_fetch_many_writes_each_type(history_api, tmp_path):
+    stub, base_url = history_api
+    stub.add('ssq', 1001, 1012)
+    stub.add('qlc', 2001, 2012, red_count=7)
+    output = str(tmp_path / 'history_{lottery_type}.json')
+
+    results = fetch_many(['ssq', 'qlc'], 10, output, api_key='key', base_url=base_url,
+                         concurrency=2, rate_limit=0.0, retry=1)
+
+    assert [item['lottery_type'] for item in results] == ['ssq', 'qlc']
+    assert [item['status'] for item in results] == ['ok', 'ok']
+    with open(tmp_path / 'history_ssq.json', encoding='utf-8') as f:
+        data = json.load(f)['data']
+    assert [item['issue'] for item in data] == [str(i) for i in range(1012, 1002, -1)]
+    with open(tmp_path / 'history_qlc.json', encoding='utf-8') as f:
+        assert all(len(item['red']) == 7 for item in json.load(f)['data'])
+    assert sorted(code for code, _, _ in stub.requests) == ['qlc', 'ssq']
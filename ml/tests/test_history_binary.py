@@ -0,0 +1,102 @@
+import json
+
+import numpy as np
+import pytest
+
+from history_binary import binary_to_json, json_to_binary, load_history_binary, save_history_binary
+from history_dataset import encode_draws
+
+
+def sample_history(num_draws=25, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            'red': [f"{n:02d}" for n in sorted(rng.choice(np.arange(1, 34), size=6, replace=False))],
+            'blue': [f"{rng.integers(1, 17):02d}"],
+            'issue': f"2024{num_draws - i:03d}",
+            'date': f"2024-01-{i % 28 + 1:02d}"
+        }
+        for i in range(num_draws)
+    ]
+
+
+def round_trip(tmp_path, history, created_at='2024-01-01 00:00:00'):
+    """JSON -> .lhb -> JSON，返回转换回的 JSON 内容"""
+    with open(tmp_path / 'in.json', 'w', encoding='utf-8') as f:
+        json.dump({'data': history, 'count': len(history), 'created_at': created_at}, f)
+    assert json_to_binary(str(tmp_path / 'in.json'), str(tmp_path / 'h.lhb')) == len(history)
+    assert binary_to_json(str(tmp_path / 'h.lhb'), str(tmp_path / 'out.json')) == len(history)
+    with open(tmp_path / 'out.json', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_json_binary_json_round_trip(tmp_path):
+    history = sample_history()
+    result = round_trip(tmp_path, history)
+
+    assert result == {'data': history, 'count': len(history), 'created_at': '2024-01-01 00:00:00'}
+
+
+@pytest.mark.parametrize('history', [
+    # 部分记录缺少期号或日期
+    [
+        {'red': ['01', '02'], 'blue': ['03'], 'issue': '2024003', 'date': '2024-01-03'},
+        {'red': ['04', '05'], 'blue': ['06'], 'date': '2024-01-02'},
+        {'red': ['07', '08'], 'blue': ['09'], 'issue': '2024001'},
+        {'red': ['10', '11'], 'blue': ['12']},
+    ],
+    # 全部没有期号/日期
+    [{'red': ['1', '2', '3'], 'blue': []}, {'red': ['4', '5', '6'], 'blue': []}],
+    # 空字符串与缺失不同
+    [{'red': ['01'], 'blue': ['02'], 'issue': ''}, {'red': ['03'], 'blue': ['04']}],
+    [],
+])
+def test_round_trip_keeps_missing_fields(tmp_path, history):
+    assert round_trip(tmp_path, history)['data'] == history
+
+
+def test_archive_reads_like_a_list(tmp_path):
+    history = sample_history()
+    save_history_binary(history, str(tmp_path / 'h.lhb'))
+    archive = load_history_binary(str(tmp_path / 'h.lhb'))
+
+    assert len(archive) == len(history)
+    assert archive[0] == history[0] and archive[-1] == history[-1]
+    assert archive[3:7] == history[3:7]
+    assert list(archive) == history
+    with pytest.raises(IndexError):
+        archive[len(history)]
+
+
+@pytest.mark.parametrize('field, num_classes', [('red', 33), ('blue', 16)])
+def test_one_hot_matches_encode_draws(tmp_path, field, num_classes):
+    history = sample_history()
+    save_history_binary(history, str(tmp_path / 'h.lhb'))
+    archive = load_history_binary(str(tmp_path / 'h.lhb'))
+
+    np.testing.assert_array_equal(
+        encode_draws(archive, field, num_classes),
+        encode_draws(history, field, num_classes)
+    )
+
+
+@pytest.mark.parametrize('history', [
+    [{'red': ['01', '2'], 'blue': []}],
+    [{'red': ['01', '02'], 'blue': []}, {'red': ['03'], 'blue': []}],
+    [{'red': ['300'], 'blue': []}],
+    [{'red': ['01'], 'blue': [], 'issue': 2024001}],
+    [{'red': ['01'], 'blue': [], 'sales': '100'}],
+])
+def test_rejects_input_that_cannot_round_trip(tmp_path, history):
+    with pytest.raises(ValueError):
+        save_history_binary(history, str(tmp_path / 'h.lhb'))
+
+
+def test_rejects_unsupported_version(tmp_path):
+    path = tmp_path / 'h.lhb'
+    save_history_binary(sample_history(3), str(path))
+    raw = path.read_bytes()
+    path.write_bytes(raw.replace(b'"version": 2', b'"version": 9', 1))
+
+    with pytest.raises(ValueError):
+        load_history_binary(str(path))
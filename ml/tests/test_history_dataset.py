@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from history_dataset import encode_draws, sliding_windows
+
+
+def reference_windows(history_data, field, num_classes, sequence_length):
+    """原 LotteryLSTMModel.prepare_data 的逐期循环"""
+    sequences = []
+    targets = []
+    for i in range(len(history_data) - sequence_length):
+        seq = []
+        for j in range(i, i + sequence_length):
+            vector = np.zeros(num_classes)
+            for num in history_data[j][field]:
+                vector[int(num) - 1] = 1
+            seq.append(vector)
+        sequences.append(seq)
+
+        target = np.zeros(num_classes)
+        for num in history_data[i + sequence_length][field]:
+            target[int(num) - 1] = 1
+        targets.append(target)
+    return np.array(sequences), np.array(targets)
+
+
+def sample_history(num_draws=30, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            'red': [f"{n:02d}" for n in sorted(rng.choice(np.arange(1, 34), size=6, replace=False))],
+            'blue': [f"{rng.integers(1, 17):02d}"]
+        }
+        for _ in range(num_draws)
+    ]
+
+
+@pytest.mark.parametrize('field, num_classes', [('red', 33), ('blue', 16)])
+@pytest.mark.parametrize('sequence_length', [1, 5, 10])
+def test_windows_match_per_draw_loop(field, num_classes, sequence_length):
+    history = sample_history()
+    X, y = sliding_windows(encode_draws(history, field, num_classes), sequence_length)
+    ref_X, ref_y = reference_windows(history, field, num_classes, sequence_length)
+
+    assert X.shape == ref_X.shape and y.shape == ref_y.shape
+    np.testing.assert_array_equal(X, ref_X)
+    np.testing.assert_array_equal(y, ref_y)
+
+
+def test_duplicates_and_unpadded_numbers_match_loop():
+    history = [
+        {'red': ['01', '01', '3'], 'blue': ['02']},
+        {'red': ['05', '5', '05'], 'blue': ['02', '02']},
+        {'red': [], 'blue': ['01']},
+        {'red': ['07'], 'blue': []},
+    ]
+    for field, num_classes in (('red', 8), ('blue', 4)):
+        X, y = sliding_windows(encode_draws(history, field, num_classes), 2)
+        ref_X, ref_y = reference_windows(history, field, num_classes, 2)
+        np.testing.assert_array_equal(X, ref_X)
+        np.testing.assert_array_equal(y, ref_y)
+
+
+def test_out_of_range_number_raises_like_loop():
+    history = [{'red': ['01', '09'], 'blue': ['01']}] * 3
+    with pytest.raises(IndexError):
+        reference_windows(history, 'red', 8, 1)
+    with pytest.raises(IndexError):
+        encode_draws(history, 'red', 8)
+
+
+def test_default_dtype_is_float32_and_windows_are_views():
+    matrix = encode_draws(sample_history(), 'red', 33)
+    X, y = sliding_windows(matrix, 4)
+
+    assert matrix.dtype == np.float32
+    assert np.shares_memory(X, matrix) and np.shares_memory(y, matrix)
+    assert encode_draws(sample_history(), 'red', 33, dtype=np.uint8).dtype == np.uint8
+
+
+def test_too_short_history_gives_no_windows():
+    X, y = sliding_windows(encode_draws(sample_history(4), 'blue', 16), 4)
+    assert X.shape == (0, 4, 16) and y.shape == (0, 16)
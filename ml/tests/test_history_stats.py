@@ -0,0 +1,84 @@
+import json
+
+import numpy as np
+
+from history_stats import RECENT_WINDOW, HistoryStats, load_stats, update_stats_bundle
+
+
+def sample_history(num_draws: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            'issue': f"2024{i + 1:04d}",
+            'red': [f"{n:02d}" for n in sorted(rng.choice(np.arange(1, 34), size=6, replace=False))],
+            'blue': [f"{rng.integers(1, 17):02d}"]
+        }
+        for i in range(num_draws)
+    ]
+
+
+def reference(history, color, number_range):
+    """按 PredictionEngine 的方式直接扫描历史（最新一期在前）"""
+    draws = [[int(n) for n in item[color]] for item in reversed(history)]
+    recent, older = draws[:RECENT_WINDOW], draws[RECENT_WINDOW:2 * RECENT_WINDOW]
+    result = {name: [] for name in ('frequency', 'current_omission', 'max_omission',
+                                    'recent_frequency', 'older_frequency')}
+    for number in range(number_range[0], number_range[1] + 1):
+        result['frequency'].append(sum(draw.count(number) for draw in draws))
+        result['current_omission'].append(next((i for i, draw in enumerate(draws) if number in draw), len(draws)))
+        longest = current = 0
+        for draw in reversed(draws):
+            current = 0 if number in draw else current + 1
+            longest = max(longest, current)
+        result['max_omission'].append(longest)
+        result['recent_frequency'].append(sum(number in draw for draw in recent))
+        result['older_frequency'].append(sum(number in draw for draw in older))
+    return result
+
+
+def test_build_matches_full_scan():
+    history = sample_history(45)
+    stats = HistoryStats.build('ssq', history[::-1]).to_dict()
+
+    assert stats['history_size'] == 45
+    assert stats['last_issue'] == '20240045'
+    assert (stats['recent_size'], stats['older_size']) == (RECENT_WINDOW, RECENT_WINDOW)
+    for color, number_range in (('red', (1, 33)), ('blue', (1, 16))):
+        expected = reference(history, color, number_range)
+        for name, values in expected.items():
+            assert stats['colors'][color][name] == values, (color, name)
+
+
+def test_incremental_update_matches_rebuild(tmp_path):
+    history = sample_history(40)
+    stats_file = str(tmp_path / 'stats_ssq.json')
+
+    update_stats_bundle(stats_file, 'ssq', history[:15])
+    for end in (16, 27, 40):
+        incremental = update_stats_bundle(stats_file, 'ssq', history[:end]).to_dict()
+        rebuilt = HistoryStats.build('ssq', history[:end]).to_dict()
+        for data in (incremental, rebuilt):
+            data.pop('updated_at')
+        assert incremental == rebuilt
+
+    assert load_stats(stats_file).history_size == 40
+
+
+def test_gap_or_bad_version_triggers_rebuild(tmp_path):
+    history = sample_history(30)
+    stats_file = tmp_path / 'stats_ssq.json'
+
+    update_stats_bundle(str(stats_file), 'ssq', history[:10])
+    # 新数据不包含统计包的 last_issue，无法衔接
+    stats = update_stats_bundle(str(stats_file), 'ssq', history[12:30])
+    assert stats.history_size == 18
+
+    data = json.loads(stats_file.read_text(encoding='utf-8'))
+    data['version'] = 0
+    stats_file.write_text(json.dumps(data), encoding='utf-8')
+    stats = update_stats_bundle(str(stats_file), 'ssq', history)
+    assert stats.history_size == 30
+
+
+def test_load_missing_file_returns_none(tmp_path):
+    assert load_stats(str(tmp_path / 'missing.json')) is None
@@ -0,0 +1,59 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from train_lstm_model import inspect_history
+
+ML_DIR = Path(__file__).resolve().parent.parent
+
+
+def sample_history(num_draws: int):
+    # 最新一期在前
+    return [
+        {'issue': str(2024000 + i), 'red': [f"{(i + k * 5) % 33 + 1:02d}" for k in range(6)],
+         'blue': [f"{i % 16 + 1:02d}"]}
+        for i in range(num_draws, 0, -1)
+    ]
+
+
+def run_mode(tmp_path, mode: str, *extra: str):
+    history_file = tmp_path / 'history.json'
+    history_file.write_text(json.dumps({'data': sample_history(40)}), encoding='utf-8')
+    return subprocess.run(
+        [sys.executable, 'train_lstm_model.py', '--lottery_type', 'ssq', '--history_file', str(history_file),
+         '--output_dir', str(tmp_path / 'models'), '--mode', mode, *extra],
+        cwd=ML_DIR, capture_output=True, text=True, timeout=120
+    )
+
+
+@pytest.mark.parametrize('mode, extra', [
+    ('inspect', ()),
+    ('dry_run', ()),
+    ('dry_run', ('--architecture', 'multi_head')),
+])
+def test_modes_run_without_tensorflow(tmp_path, mode, extra):
+    result = run_mode(tmp_path, mode, *extra)
+
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert f"✅ {mode} 完成" in result.stdout
+    assert 'TensorFlow 未导入' in result.stdout
+    assert not (tmp_path / 'models').exists()
+
+
+def test_inspect_history_reports_problems():
+    history = sample_history(15)
+    history[1] = dict(history[0])
+    history[2] = dict(history[2], red=['01', '40'])
+
+    problems = inspect_history(history, 33, 16, sequence_length=10, validation_split=0.15)
+
+    assert any('重复期号' in problem for problem in problems)
+    assert any('超出 1..33' in problem for problem in problems)
+    assert any('数据量不足' in problem for problem in problems)
+
+
+def test_inspect_history_accepts_clean_data():
+    assert inspect_history(sample_history(40), 33, 16, sequence_length=10, validation_split=0.15) == []
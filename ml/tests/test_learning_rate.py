@@ -0,0 +1,15 @@
+import pytest
+
+from train_lstm_model import BASE_BATCH_SIZE, MAX_LEARNING_RATE, scaled_learning_rate
+
+
+def test_learning_rate_scales_with_sqrt_batch_size():
+    assert scaled_learning_rate(0.001, BASE_BATCH_SIZE) == pytest.approx(0.001)
+    assert scaled_learning_rate(0.001, BASE_BATCH_SIZE * 4) == pytest.approx(0.002)
+    assert scaled_learning_rate(0.001, BASE_BATCH_SIZE // 4) == pytest.approx(0.0005)
+    # 批次大小为 0 时按 1 计算，不会得到 0 学习率
+    assert scaled_learning_rate(0.001, 0) == scaled_learning_rate(0.001, 1) > 0
+
+
+def test_learning_rate_is_capped():
+    assert scaled_learning_rate(0.005, BASE_BATCH_SIZE * 64) == MAX_LEARNING_RATE
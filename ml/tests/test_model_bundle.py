@@ -0,0 +1,92 @@
+import json
+
+import pytest
+
+from model_bundle import ALIGNMENT, ModelBundle, build_bundle, collect_models
+from train_lstm_model import TRAINING_META_FILE
+
+
+def fake_tflite(tag: str, size: int = 3000) -> bytes:
+    """前 8 字节带 TFLite 文件标识的假模型"""
+    body = (tag.encode() * size)[:size]
+    return b'\x1c\x00\x00\x00TFL3' + body
+
+
+def write_model_dir(directory, keys, meta=None):
+    directory.mkdir(parents=True, exist_ok=True)
+    for key in keys:
+        (directory / f"lottery_lstm_{key}.tflite").write_bytes(fake_tflite(f"{directory.name}-{key}"))
+    if meta is not None:
+        (directory / TRAINING_META_FILE).write_text(json.dumps(meta), encoding='utf-8')
+
+
+def test_build_verify_and_extract_round_trip(tmp_path):
+    write_model_dir(tmp_path / 'ssq', ['red', 'blue'],
+                    {'architecture': 'separate', 'sequence_length': 10, 'time_order': 'newest_first'})
+    write_model_dir(tmp_path / 'dlt', ['multi'])
+    model_dir = str(tmp_path / '{lottery_type}')
+
+    entries = collect_models(model_dir, ['ssq', 'dlt', 'kl8'])
+    assert list(entries) == ['ssq', 'dlt']
+    assert entries['ssq']['sequence_length'] == 10 and entries['dlt']['sequence_length'] == 8
+    build_bundle(entries, str(tmp_path / 'models.lmb'))
+
+    with ModelBundle(str(tmp_path / 'models.lmb')) as bundle:
+        assert bundle.verify() == []
+        assert bundle.model_keys('ssq') == ['red', 'blue'] and bundle.model_keys('dlt') == ['multi']
+        for lottery_type, key in (('ssq', 'red'), ('ssq', 'blue'), ('dlt', 'multi')):
+            spec = bundle.entry(lottery_type)['models'][key]
+            assert spec['offset'] % ALIGNMENT == 0
+            assert bytes(bundle.model_view(lottery_type, key)) == \
+                (tmp_path / lottery_type / f"lottery_lstm_{key}.tflite").read_bytes()
+        assert bundle.entry('ssq')['models']['red']['inputs'] == {'red_lstm_input': [1, 10, 33]}
+
+        paths = bundle.extract(str(tmp_path / 'assets'))
+    assert sorted(path.name for path in paths) == [
+        'lottery_lstm_blue_ssq.tflite', 'lottery_lstm_multi_dlt.tflite', 'lottery_lstm_red_ssq.tflite'
+    ]
+    assert (tmp_path / 'assets' / 'lottery_lstm_multi_dlt.tflite').read_bytes() == \
+        (tmp_path / 'dlt' / 'lottery_lstm_multi.tflite').read_bytes()
+
+
+def test_verify_reports_corruption(tmp_path):
+    write_model_dir(tmp_path / 'ssq', ['red', 'blue'])
+    build_bundle(collect_models(str(tmp_path / '{lottery_type}'), ['ssq']), str(tmp_path / 'models.lmb'))
+
+    with ModelBundle(str(tmp_path / 'models.lmb')) as bundle:
+        offset = bundle.entry('ssq')['models']['blue']['offset']
+    data = bytearray((tmp_path / 'models.lmb').read_bytes())
+    data[offset + 100] ^= 0xFF
+    (tmp_path / 'models.lmb').write_bytes(bytes(data))
+
+    with ModelBundle(str(tmp_path / 'models.lmb')) as bundle:
+        assert bundle.verify() == ['ssq/blue: SHA-256 不一致']
+
+
+def test_oldest_first_models_are_not_bundled(tmp_path):
+    write_model_dir(tmp_path / 'ssq', ['red', 'blue'], {'architecture': 'separate', 'time_order': 'oldest_first'})
+    write_model_dir(tmp_path / 'dlt', ['red', 'blue'], {'architecture': 'separate', 'time_order': 'newest_first'})
+
+    entries = collect_models(str(tmp_path / '{lottery_type}'), ['ssq', 'dlt'])
+    assert list(entries) == ['dlt']
+
+
+def test_extract_refuses_oldest_first_entries(tmp_path):
+    write_model_dir(tmp_path / 'ssq', ['red', 'blue'])
+    write_model_dir(tmp_path / 'dlt', ['multi'])
+    entries = collect_models(str(tmp_path / '{lottery_type}'), ['ssq', 'dlt'])
+    # 旧版本打包工具不检查时间顺序
+    entries['dlt']['time_order'] = 'oldest_first'
+    build_bundle(entries, str(tmp_path / 'models.lmb'))
+
+    with ModelBundle(str(tmp_path / 'models.lmb')) as bundle:
+        with pytest.raises(ValueError, match='dlt'):
+            bundle.extract(str(tmp_path / 'assets'))
+    assert not (tmp_path / 'assets').exists()
+
+
+def test_non_tflite_files_are_rejected(tmp_path):
+    write_model_dir(tmp_path / 'ssq', ['red', 'blue'])
+    (tmp_path / 'ssq' / 'lottery_lstm_red.tflite').write_bytes(b'not a model')
+    with pytest.raises(ValueError):
+        build_bundle(collect_models(str(tmp_path / '{lottery_type}'), ['ssq']), str(tmp_path / 'models.lmb'))
@@ -0,0 +1,96 @@
+import threading
+
+import numpy as np
+import pytest
+
+import prediction_server
+from prediction_server import ModelWorker, find_model_files, format_probabilities
+
+
+class FakeInterpreter:
+    def __init__(self, model_path: str, num_threads: int):
+        self.model_path = model_path
+        self.sequence_length = int(open(model_path, encoding='utf-8').read())
+
+    def get_input_details(self):
+        return [{'shape': np.array([1, self.sequence_length, 0])}]
+
+
+@pytest.fixture
+def fake_tflite(monkeypatch):
+    """用输出窗口第一行的假解释器代替 TFLite，并记录每次推理的批次大小"""
+    batches = []
+
+    def run_batch(interpreter, X, chunk_size):
+        batches.append(len(X))
+        return X[:, 0, :].copy()
+
+    monkeypatch.setattr(prediction_server, 'load_interpreter', FakeInterpreter)
+    monkeypatch.setattr(prediction_server, 'run_batch', run_batch)
+    return batches
+
+
+def write_models(directory, names, sequence_length: int = 3):
+    directory.mkdir(parents=True, exist_ok=True)
+    for name in names:
+        (directory / name).write_text(str(sequence_length), encoding='utf-8')
+
+
+def history(num_draws: int):
+    # 最新一期在前，第 i 期的红球为 i+1
+    return [{'red': [f"{i + 1:02d}"], 'blue': [f"{i % 16 + 1:02d}"]} for i in range(num_draws)]
+
+
+def test_find_model_files_prefers_multi_and_lottery_suffix(tmp_path):
+    write_models(tmp_path / 'ssq', ['lottery_lstm_red.tflite', 'lottery_lstm_blue.tflite'])
+    assert set(find_model_files(str(tmp_path / '{lottery_type}'), 'ssq')) == {'red', 'blue'}
+
+    write_models(tmp_path / 'ssq', ['lottery_lstm_multi.tflite'])
+    assert list(find_model_files(str(tmp_path / '{lottery_type}'), 'ssq')) == ['multi']
+
+    write_models(tmp_path / 'assets', ['lottery_lstm_red_dlt.tflite', 'lottery_lstm_blue_dlt.tflite',
+                                       'lottery_lstm_multi.tflite'])
+    paths = find_model_files(str(tmp_path / 'assets'), 'dlt')
+    assert {key: path.name for key, path in paths.items()} == {
+        'red': 'lottery_lstm_red_dlt.tflite', 'blue': 'lottery_lstm_blue_dlt.tflite'
+    }
+    # 只有红球模型时不可用
+    write_models(tmp_path / 'partial', ['lottery_lstm_red.tflite'])
+    assert find_model_files(str(tmp_path / 'partial'), 'ssq') == {}
+
+
+def test_format_probabilities_uses_app_keys():
+    assert format_probabilities(np.array([0.25, 0.5], dtype=np.float32)) == {'01': 0.25, '02': 0.5}
+
+
+def test_worker_builds_app_input_and_batches_concurrent_requests(tmp_path, fake_tflite):
+    write_models(tmp_path, ['lottery_lstm_red.tflite', 'lottery_lstm_blue.tflite'])
+    worker = ModelWorker('ssq', find_model_files(str(tmp_path), 'ssq'), max_batch=8, max_wait_ms=200)
+    try:
+        assert worker.sequence_length == 3 and worker.time_order == 'newest_first'
+        with pytest.raises(ValueError):
+            worker.submit(history(2))
+
+        barrier = threading.Barrier(4)
+        results = [None] * 4
+
+        def request(i):
+            barrier.wait()
+            results[i] = worker.submit(history(3 + i)).result(timeout=5)
+
+        threads = [threading.Thread(target=request, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # 窗口第一行为最新一期（红球 01）
+        for result in results:
+            assert result['red']['01'] == 1.0 and sum(result['red'].values()) == 1.0
+            assert len(result['red']) == 33 and len(result['blue']) == 16
+        metrics = worker.metrics()
+        assert metrics['requests'] == 4 and metrics['errors'] == 0
+        # 预热 1 次，并发请求合并为少于 4 个批次
+        assert fake_tflite[0] == 1 and metrics['batches'] < 4
+    finally:
+        worker.close()
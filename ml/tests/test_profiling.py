@@ -0,0 +1,54 @@
+import json
+
+import numpy as np
+import pytest
+
+from history_dataset import sliding_windows
+from profiling import StageProfiler, array_bytes
+
+
+def test_array_bytes_counts_shared_buffers_once():
+    matrix = np.zeros((100, 8), dtype=np.float32)
+    X, y = sliding_windows(matrix, 10)
+    separate = np.ones(16, dtype=np.float64)
+
+    result = array_bytes({'X': X, 'y': y}, [matrix, separate], 'not an array')
+
+    assert result['logical'] == X.nbytes + y.nbytes + matrix.nbytes + separate.nbytes
+    assert result['backing'] == matrix.nbytes + separate.nbytes
+
+
+def test_stages_are_recorded_and_exported(tmp_path):
+    profiler = StageProfiler(name='test')
+    with profiler.stage('prepare', lottery_type='ssq') as record:
+        profiler.record_arrays(record, np.zeros(10, dtype=np.int64))
+        record['rows'] = 10
+    with pytest.raises(RuntimeError):
+        with profiler.stage('train'):
+            raise RuntimeError('boom')
+
+    profiler.save(str(tmp_path / 'profile.json'), str(tmp_path / 'trace.json'))
+
+    stages = json.loads((tmp_path / 'profile.json').read_text(encoding='utf-8'))['stages']
+    assert [stage['name'] for stage in stages] == ['prepare', 'train']
+    assert stages[0]['lottery_type'] == 'ssq' and stages[0]['rows'] == 10
+    assert stages[0]['array_bytes'] == {'logical': 80, 'backing': 80}
+    assert stages[0]['wall_s'] >= 0 and stages[0]['peak_rss_mb'] > 0
+    assert stages[1]['error'] == 'RuntimeError: boom'
+
+    events = json.loads((tmp_path / 'trace.json').read_text(encoding='utf-8'))['traceEvents']
+    assert [(event['name'], event['ph'], event['cat']) for event in events] == [
+        ('prepare', 'X', 'stage'), ('train', 'X', 'stage')
+    ]
+    assert events[0]['args']['rows'] == 10
+
+
+def test_disabled_profiler_records_nothing(tmp_path):
+    profiler = StageProfiler(enabled=False)
+    with profiler.stage('prepare') as record:
+        profiler.record_arrays(record, np.zeros(4))
+    profiler.save(str(tmp_path / 'profile.json'))
+
+    assert profiler.events == [] and profiler.epoch_callbacks('train') == []
+    assert 'array_bytes' not in record
+    assert not (tmp_path / 'profile.json').exists()
@@ -0,0 +1,33 @@
+from history_dataset import draws_after, sort_chronologically
+from train_lstm_model import TRAINING_META_VERSION, check_resume_meta
+
+CONFIG = {'architecture': 'separate', 'sequence_length': 10, 'time_order': 'newest_first'}
+
+
+def meta(**overrides):
+    return {'version': TRAINING_META_VERSION, 'last_issue': '2024050',
+            'architecture': 'separate', 'sequence_length': 10, **overrides}
+
+
+def test_compatible_meta_has_no_problems():
+    # 旧版元数据没有 time_order，按默认值 newest_first 比较
+    assert check_resume_meta(meta(), CONFIG) == []
+
+
+def test_incompatible_meta_is_reported():
+    assert check_resume_meta(None, CONFIG) == ['没有 training_meta.json']
+    assert check_resume_meta(meta(version=0), CONFIG) == ['训练元数据版本 0 不受支持']
+
+    problems = check_resume_meta(meta(sequence_length=8, time_order='oldest_first', last_issue=None), CONFIG)
+    assert len(problems) == 3
+    assert problems[0].startswith('sequence_length') and problems[1].startswith('time_order')
+
+
+def test_draws_after_returns_only_new_draws():
+    history = [{'issue': str(2024000 + i)} for i in range(55, 40, -1)]
+    chronological = sort_chronologically(history)
+
+    assert [item['issue'] for item in draws_after(chronological, '2024050')] == [str(2024000 + i) for i in range(51, 56)]
+    assert draws_after(chronological, '2024055') == []
+    # 本地历史不包含已训练到的期号：中间可能缺期，不能继续训练
+    assert draws_after(chronological, '2024030') is None
@@ -0,0 +1,84 @@
+"""
+单步模型与窗口模型的一致性测试（需要 TensorFlow，未安装时跳过）
+
+使用方法:
+    python -m pytest -q ml/tests
+"""
+
+import numpy as np
+import pytest
+
+tf = pytest.importorskip('tensorflow')
+
+from history_dataset import sliding_windows
+from train_lstm_model import LotteryLSTMModel, StepRing
+
+NUM_RED = 12
+NUM_BLUE = 5
+SEQUENCE_LENGTH = 4
+
+
+def sample_history(num_draws: int = 40, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            'issue': f"2024{i + 1:03d}",
+            'red': [f"{n:02d}" for n in sorted(rng.choice(np.arange(1, NUM_RED + 1), size=3, replace=False))],
+            'blue': [f"{rng.integers(1, NUM_BLUE + 1):02d}"]
+        }
+        for i in range(num_draws)
+    ]
+
+
+def small_model(architecture: str, time_order: str = 'oldest_first') -> LotteryLSTMModel:
+    tf.keras.utils.set_random_seed(0)
+    return LotteryLSTMModel(
+        num_red_balls=NUM_RED,
+        num_blue_balls=NUM_BLUE,
+        sequence_length=SEQUENCE_LENGTH,
+        lstm_units_1=8,
+        lstm_units_2=6,
+        dense_units=4,
+        architecture=architecture,
+        time_order=time_order
+    )
+
+
+@pytest.mark.parametrize('architecture', ['separate', 'multi_head'])
+def test_replay_steps_matches_window_model(architecture):
+    model = small_model(architecture)
+    for key, window_model, matrix in model._model_matrices(sample_history()):
+        X, _ = sliding_windows(matrix, SEQUENCE_LENGTH)
+        X = X.astype(np.float32)
+        step_model = model.build_step_model(key)
+
+        expected = model._heads(key, window_model.predict(X, verbose=0))
+        actual = model._heads(key, model.replay_steps(lambda feeds: step_model(feeds, training=False), X))
+        for color in expected:
+            np.testing.assert_allclose(actual[color], expected[color], atol=1e-5)
+
+
+@pytest.mark.parametrize('architecture', ['separate', 'multi_head'])
+def test_step_ring_matches_latest_window(architecture):
+    model = small_model(architecture)
+    for key, window_model, matrix in model._model_matrices(sample_history()):
+        X, _ = sliding_windows(matrix, SEQUENCE_LENGTH)
+        expected = model._heads(key, window_model.predict(X.astype(np.float32), verbose=0))
+        step_model = model.build_step_model(key)
+        ring = StepRing(lambda feeds: step_model(feeds, training=False), model._state_sizes(), SEQUENCE_LENGTH)
+
+        # 输入第 t 期后，最近的窗口为 t - SEQUENCE_LENGTH + 1
+        for t, draw in enumerate(matrix[:len(X) + SEQUENCE_LENGTH - 1]):
+            outputs = ring.update(draw)
+            if t < SEQUENCE_LENGTH - 1:
+                assert outputs is None
+                continue
+            actual = model._heads(key, outputs)
+            for color in expected:
+                np.testing.assert_allclose(actual[color][0], expected[color][t - SEQUENCE_LENGTH + 1], atol=1e-5)
+
+
+def test_step_export_requires_oldest_first(tmp_path):
+    model = small_model('separate', time_order='newest_first')
+    with pytest.raises(ValueError):
+        model.export_step_models(sample_history(), str(tmp_path))
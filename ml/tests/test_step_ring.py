@@ -0,0 +1,25 @@
+import numpy as np
+
+from train_lstm_model import STEP_INPUT, StepRing
+
+
+def test_step_ring_outputs_slot_with_full_window():
+    seen = []
+
+    def step_fn(feeds):
+        seen.append({name: np.array(value) for name, value in feeds.items()})
+        # 状态每步加 1，概率输出为输入状态之和
+        return {'h_out': feeds['h'] + 1.0, 'prob': feeds['h'].sum(axis=1, keepdims=True)}
+
+    ring = StepRing(step_fn, {'h': 2}, 3)
+    outputs = [ring.update(np.full(5, i, dtype=np.float32)) for i in range(6)]
+
+    assert outputs[:2] == [None, None]
+    # 每次输出的槽在此前刚好执行了 2 步（2 步 x 2 维）
+    assert [float(item['prob'][0, 0]) for item in outputs[2:]] == [4.0, 4.0, 4.0, 4.0]
+    assert all(item['prob'].shape == (1, 1) for item in outputs[2:])
+    # 每期一次推理，批次为 sequence_length（与窗口模型的计算量相同）
+    assert len(seen) == 6 and all(len(feeds[STEP_INPUT]) == 3 for feeds in seen)
+    # 每次对所有槽输入同一期
+    assert seen[4][STEP_INPUT].shape == (3, 5) and (seen[4][STEP_INPUT] == 4).all()
+    assert not seen[0]['h'].any()
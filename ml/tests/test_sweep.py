@@ -0,0 +1,48 @@
+import json
+
+import pytest
+
+from sweep import DEFAULT_PARAMS, DEFAULT_SPACE, build_trials, leaderboard, parse_space
+
+
+def test_parse_space_accepts_json_string_and_file(tmp_path):
+    assert parse_space('') == DEFAULT_SPACE
+    assert parse_space('{"batch_size": [8, 64]}') == {'batch_size': [8, 64]}
+
+    space_file = tmp_path / 'space.json'
+    space_file.write_text(json.dumps({'sequence_length': [4]}), encoding='utf-8')
+    assert parse_space(str(space_file)) == {'sequence_length': [4]}
+
+
+@pytest.mark.parametrize('value', ['{"learning_rate": [0.1]}', '{"batch_size": []}', '{"batch_size": 16}'])
+def test_parse_space_rejects_invalid_values(value):
+    with pytest.raises(ValueError):
+        parse_space(value)
+
+
+def test_grid_covers_all_combinations_with_defaults():
+    trials = build_trials({'batch_size': [8, 16], 'dense_units': [4, 8, 16]}, 'grid', 0, seed=0)
+
+    assert len(trials) == 6
+    assert {(t['batch_size'], t['dense_units']) for t in trials} == {(b, d) for b in (8, 16) for d in (4, 8, 16)}
+    assert all(t['lstm_units_1'] == DEFAULT_PARAMS['lstm_units_1'] for t in trials)
+
+
+def test_random_search_samples_distinct_trials_reproducibly():
+    first = build_trials(DEFAULT_SPACE, 'random', 5, seed=7)
+
+    assert len(first) == 5
+    assert len({tuple(sorted(t.items())) for t in first}) == 5
+    assert first == build_trials(DEFAULT_SPACE, 'random', 5, seed=7)
+    # 请求数量超过组合数时退化为网格
+    assert len(build_trials({'batch_size': [8, 16]}, 'random', 10, seed=0)) == 2
+
+
+def test_leaderboard_puts_failed_trials_last():
+    results = [
+        {'trial': 0, 'status': 'failed'},
+        {'trial': 1, 'status': 'ok', 'best_val_loss': 0.5},
+        {'trial': 2, 'status': 'pruned', 'best_val_loss': 0.7},
+        {'trial': 3, 'status': 'ok', 'best_val_loss': 0.3},
+    ]
+    assert [item['trial'] for item in leaderboard(results)] == [3, 1, 2, 0]
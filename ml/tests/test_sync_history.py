@@ -0,0 +1,83 @@
+from draw_store import DrawStore
+from fetch_history_data import LotteryDataFetcher, sync_history
+
+
+def sizes(stub):
+    return [size for _, size, _ in stub.requests]
+
+
+def test_first_sync_stores_latest_draws(history_api, tmp_path):
+    stub, base_url = history_api
+    stub.add('ssq', 1001, 1030)
+
+    with DrawStore(str(tmp_path / 'draws.db')) as store:
+        result = sync_history(LotteryDataFetcher('key', base_url), store, 'ssq', max_count=20)
+
+        assert result == {'added': 20, 'gap': None}
+        assert store.count('ssq') == 20
+        assert store.latest_issue('ssq') == '1030'
+        exported = store.export_training_data('ssq')
+        assert [item['issue'] for item in exported] == [str(i) for i in range(1030, 1010, -1)]
+        assert exported[0]['date'] == 'day-1030' and len(exported[0]['red']) == 6
+    assert sizes(stub) == [20]
+
+
+def test_incremental_sync_doubles_until_local_latest_is_covered(history_api, tmp_path):
+    stub, base_url = history_api
+    stub.add('ssq', 1001, 1020)
+    fetcher = LotteryDataFetcher('key', base_url)
+
+    with DrawStore(str(tmp_path / 'draws.db')) as store:
+        sync_history(fetcher, store, 'ssq', max_count=20)
+        stub.requests.clear()
+        stub.add('ssq', 1021, 1023)
+
+        result = sync_history(fetcher, store, 'ssq', max_count=20, initial_size=2)
+
+        assert result == {'added': 3, 'gap': None}
+        assert store.count('ssq') == 23
+        assert store.latest_issue('ssq') == '1023'
+    # 2 期只有新数据，4 期覆盖本地最新的 1020
+    assert sizes(stub) == [2, 4]
+
+
+def test_sync_dedupes_by_issue(history_api, tmp_path):
+    stub, base_url = history_api
+    stub.add('ssq', 1001, 1010)
+    fetcher = LotteryDataFetcher('key', base_url)
+
+    with DrawStore(str(tmp_path / 'draws.db')) as store:
+        sync_history(fetcher, store, 'ssq', max_count=10)
+
+        assert sync_history(fetcher, store, 'ssq', max_count=10) == {'added': 0, 'gap': None}
+
+        # 接口在一次响应中重复返回同一期
+        stub.duplicate_latest = True
+        stub.add('ssq', 1011, 1011)
+        assert sync_history(fetcher, store, 'ssq', max_count=10) == {'added': 1, 'gap': None}
+        assert store.count('ssq') == 11
+
+
+def test_sync_reports_gap_when_max_count_does_not_reach_local_latest(history_api, tmp_path):
+    stub, base_url = history_api
+    stub.add('ssq', 1001, 1005)
+    fetcher = LotteryDataFetcher('key', base_url)
+
+    with DrawStore(str(tmp_path / 'draws.db')) as store:
+        sync_history(fetcher, store, 'ssq', max_count=5)
+        stub.requests.clear()
+        stub.add('ssq', 1006, 1030)
+
+        result = sync_history(fetcher, store, 'ssq', max_count=8, initial_size=2)
+
+        assert result == {'added': 8, 'gap': {'after': '1005', 'before': '1023'}}
+        assert store.count('ssq') == 13
+    assert sizes(stub) == [2, 4, 8]
+
+
+def test_sync_returns_none_when_api_has_no_data(history_api, tmp_path):
+    _, base_url = history_api
+
+    with DrawStore(str(tmp_path / 'draws.db')) as store:
+        assert sync_history(LotteryDataFetcher('key', base_url), store, 'ssq', retry=1) is None
+        assert store.count('ssq') == 0
@@ -0,0 +1,83 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from history_dataset import encode_draws, load_history_file
+from tensor_cache import CACHE_VERSION, TensorCache, cache_key, file_digest
+
+
+def write_history(path, num_draws: int, offset: int = 0):
+    data = [
+        {'issue': str(2024000 + i), 'red': [f"{(i + offset + k) % 33 + 1:02d}" for k in range(0, 12, 2)],
+         'blue': [f"{(i + offset) % 16 + 1:02d}"]}
+        for i in range(num_draws)
+    ]
+    path.write_text(json.dumps({'data': data}), encoding='utf-8')
+    return data
+
+
+def test_miss_then_hit_returns_same_matrices(tmp_path):
+    history_file = tmp_path / 'history.json'
+    data = write_history(history_file, 20)
+    cache = TensorCache(str(tmp_path / 'cache'))
+    calls = []
+
+    def loader(path):
+        calls.append(path)
+        return load_history_file(path)
+
+    first = cache.load_or_prepare(str(history_file), 33, 16, loader)
+    second = cache.load_or_prepare(str(history_file), 33, 16, loader)
+
+    assert (cache.misses, cache.hits) == (1, 1)
+    assert len(calls) == 1 and len(second) == 20
+    assert isinstance(second.matrices['red'], np.memmap)
+    np.testing.assert_array_equal(second.one_hot('red', 33), encode_draws(data, 'red', 33))
+    np.testing.assert_array_equal(first.one_hot('blue', 16), second.one_hot('blue', 16))
+    with pytest.raises(ValueError):
+        second.one_hot('red', 35)
+
+
+def test_key_depends_on_content_and_config(tmp_path):
+    history_file = tmp_path / 'history.json'
+    write_history(history_file, 10)
+    digest = file_digest(str(history_file))
+
+    assert cache_key(digest, 33, 16) != cache_key(digest, 35, 12)
+    write_history(history_file, 10, offset=1)
+    assert file_digest(str(history_file)) != digest
+
+
+def test_stale_version_is_a_miss(tmp_path):
+    history_file = tmp_path / 'history.json'
+    write_history(history_file, 10)
+    cache = TensorCache(str(tmp_path / 'cache'))
+    cache.load_or_prepare(str(history_file), 33, 16, load_history_file)
+
+    key = cache_key(file_digest(str(history_file)), 33, 16)
+    meta_path = tmp_path / 'cache' / key / 'meta.json'
+    meta = json.loads(meta_path.read_text(encoding='utf-8'))
+    meta['version'] = CACHE_VERSION - 1
+    meta_path.write_text(json.dumps(meta), encoding='utf-8')
+
+    assert cache.get(key) is None
+    cache.load_or_prepare(str(history_file), 33, 16, load_history_file)
+    assert cache.misses == 2 and cache.get(key) is not None
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = TensorCache(str(tmp_path / 'cache'), max_entries=2)
+    keys = []
+    for i in range(3):
+        history_file = tmp_path / f"history_{i}.json"
+        write_history(history_file, 5, offset=i)
+        cache.load_or_prepare(str(history_file), 33, 16, load_history_file)
+        keys.append(cache_key(file_digest(str(history_file)), 33, 16))
+        # 保证修改时间可区分
+        meta_path = tmp_path / 'cache' / keys[-1] / 'meta.json'
+        os.utime(meta_path, (1000 + i, 1000 + i))
+
+    remaining = {item['key'] for item in cache.entries()}
+    assert remaining == {keys[1], keys[2]}
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from tflite_utils import run_batch, top_k_agreement, top_k_indices
+
+
+class FakeInterpreter:
+    """
+    按 TFLite Interpreter 接口模拟的解释器：输出为输入窗口各列之和，
+    fixed_batch 为 True 时批次维不可调整（如 builtin 导出的模型）
+    """
+
+    def __init__(self, num_classes: int, fixed_batch: bool = False, quantized: bool = False):
+        self.shape = np.array([1, 4, num_classes])
+        self.fixed_batch = fixed_batch
+        self.quantization = (0.5, 10) if quantized else (0.0, 0)
+        self.dtype = np.int8 if quantized else np.float32
+        self.invocations = []
+        self.tensor = None
+
+    def get_input_details(self):
+        return [{'index': 0, 'shape': self.shape, 'dtype': self.dtype, 'quantization': self.quantization}]
+
+    def get_output_details(self):
+        return [{'index': 1, 'shape': self.shape[[0, 2]], 'dtype': self.dtype, 'quantization': self.quantization}]
+
+    def resize_tensor_input(self, index, shape):
+        if self.fixed_batch:
+            raise RuntimeError('batch dimension is fixed')
+        self.shape = np.array(shape)
+
+    def allocate_tensors(self):
+        pass
+
+    def set_tensor(self, index, value):
+        assert value.dtype == self.dtype and len(value) == self.shape[0]
+        self.tensor = value
+
+    def invoke(self):
+        self.invocations.append(len(self.tensor))
+
+    def get_tensor(self, index):
+        return self.tensor.sum(axis=1, dtype=self.dtype)
+
+
+@pytest.mark.parametrize('fixed_batch, expected_calls', [(False, [4, 4, 2]), (True, [1] * 10)])
+def test_run_batch_chunks_or_falls_back_to_single_rows(fixed_batch, expected_calls):
+    X = np.random.default_rng(0).random((10, 4, 3)).astype(np.float32)
+    interpreter = FakeInterpreter(3, fixed_batch=fixed_batch)
+
+    outputs = run_batch(interpreter, X, chunk_size=4)
+
+    np.testing.assert_allclose(outputs, X.sum(axis=1), rtol=1e-6)
+    assert interpreter.invocations == expected_calls
+
+
+def test_run_batch_quantizes_inputs_and_dequantizes_outputs():
+    # scale 0.5、zero_point 10：1.0 量化为 12，4 期相加后为 48，反量化为 (48 - 10) * 0.5
+    X = np.ones((2, 4, 3), dtype=np.float32)
+    outputs = run_batch(FakeInterpreter(3, quantized=True), X)
+    np.testing.assert_allclose(outputs, np.full((2, 3), 19.0))
+
+
+def test_run_batch_empty_input():
+    assert run_batch(FakeInterpreter(5), np.zeros((0, 4, 5))).shape == (0, 5)
+
+
+def test_top_k_helpers():
+    probabilities = np.array([[0.1, 0.4, 0.3, 0.2], [0.9, 0.1, 0.5, 0.7]])
+    np.testing.assert_array_equal(top_k_indices(probabilities, 2), [[1, 2], [0, 3]])
+    assert top_k_indices(probabilities, 10).shape == (2, 4)
+
+    candidate = np.array([[0.4, 0.1, 0.3, 0.2], [0.9, 0.1, 0.5, 0.7]])
+    # 第 1 行 top-2 重合 1 个，第 2 行重合 2 个
+    assert top_k_agreement(probabilities, candidate, 2) == pytest.approx(0.75)
+    assert top_k_agreement(np.zeros((0, 4)), np.zeros((0, 4)), 2) == 1.0
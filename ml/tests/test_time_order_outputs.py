@@ -0,0 +1,70 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from backtest import find_backtest_models
+from model_bundle import collect_models
+from prediction_server import find_model_files
+from train_lstm_model import TRAINING_META_FILE, print_next_steps, tflite_file_name
+
+ML_DIR = Path(__file__).resolve().parent.parent
+
+
+def write_outputs(directory, time_order: str, keys=('red', 'blue')):
+    directory.mkdir(parents=True, exist_ok=True)
+    for key in keys:
+        for variant in ('', '_step', '_student'):
+            (directory / tflite_file_name(key, time_order, variant)).write_bytes(b'\x1c\x00\x00\x00TFL3' + b'x' * 64)
+    (directory / TRAINING_META_FILE).write_text(
+        json.dumps({'architecture': 'separate', 'time_order': time_order}), encoding='utf-8'
+    )
+
+
+def test_oldest_first_files_do_not_use_app_names():
+    assert tflite_file_name('red') == 'lottery_lstm_red.tflite'
+    assert tflite_file_name('multi', 'newest_first', '_int8') == 'lottery_lstm_multi_int8.tflite'
+    assert tflite_file_name('red', 'oldest_first') == 'lottery_lstm_red_oldest_first.tflite'
+    assert tflite_file_name('blue', 'oldest_first', '_step') == 'lottery_lstm_blue_oldest_first_step.tflite'
+
+
+def test_readers_follow_training_meta_time_order(tmp_path):
+    write_outputs(tmp_path / 'ssq', 'oldest_first')
+
+    paths = find_model_files(str(tmp_path / '{lottery_type}'), 'ssq')
+    assert {key: path.name for key, path in paths.items()} == {
+        'red': 'lottery_lstm_red_oldest_first.tflite', 'blue': 'lottery_lstm_blue_oldest_first.tflite'
+    }
+    assert find_backtest_models(tmp_path / 'ssq', 'tflite', 'oldest_first') == paths
+    assert find_backtest_models(tmp_path / 'ssq', 'tflite') == {}
+    # 找到模型后仍按 time_order 拒绝打包为 App 资源
+    assert collect_models(str(tmp_path / '{lottery_type}'), ['ssq']) == {}
+
+
+def test_next_steps_copy_only_app_models(capsys):
+    print_next_steps('models', 'dlt', 'separate', 'newest_first')
+    commands = [line.split() for line in capsys.readouterr().out.splitlines() if line.strip().startswith('cp ')]
+    assert [command[1:] for command in commands] == [
+        ['models/lottery_lstm_red.tflite', '../app/src/main/assets/lottery_lstm_red_dlt.tflite'],
+        ['models/lottery_lstm_blue.tflite', '../app/src/main/assets/lottery_lstm_blue_dlt.tflite'],
+    ]
+
+    print_next_steps('models', 'ssq', 'multi_head', 'oldest_first')
+    assert 'cp ' not in capsys.readouterr().out
+
+
+def test_dry_run_lists_oldest_first_outputs(tmp_path):
+    history = [{'issue': str(2024000 + i), 'red': [f"{(i + k * 5) % 33 + 1:02d}" for k in range(6)],
+                'blue': [f"{i % 16 + 1:02d}"]} for i in range(40)]
+    (tmp_path / 'history.json').write_text(json.dumps({'data': history}), encoding='utf-8')
+    result = subprocess.run(
+        [sys.executable, 'train_lstm_model.py', '--history_file', str(tmp_path / 'history.json'),
+         '--mode', 'dry_run', '--time_order', 'oldest_first', '--step_export'],
+        cwd=ML_DIR, capture_output=True, text=True, timeout=120
+    )
+
+    assert result.returncode == 0, result.stdout + result.stderr
+    outputs = result.stdout.split('输出:')[1].splitlines()[0]
+    assert 'lottery_lstm_red_oldest_first.tflite' in outputs
+    assert 'lottery_lstm_blue_oldest_first_step.tflite' in outputs
+    assert 'lottery_lstm_red.tflite' not in outputs
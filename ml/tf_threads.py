@@ -0,0 +1,22 @@
+"""
+TensorFlow CPU 线程设置
+
+批量训练、超参搜索的工作进程和高吞吐训练共用，必须在 TensorFlow 运行时初始化之前调用
+
+依赖:
+    pip install tensorflow
+"""
+
+import os
+
+
+def configure_tf_threads(intra_threads: int, inter_threads: int):
+    """在导入 TensorFlow 之前通过环境变量限制线程数，再设置 tf.config.threading"""
+    os.environ['OMP_NUM_THREADS'] = str(intra_threads)
+    os.environ['TF_NUM_INTRAOP_THREADS'] = str(intra_threads)
+    os.environ['TF_NUM_INTEROP_THREADS'] = str(inter_threads)
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(intra_threads)
+    tf.config.threading.set_inter_op_parallelism_threads(inter_threads)
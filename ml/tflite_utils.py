@@ -0,0 +1,156 @@
+"""
+TFLite 推理工具
+
+封装解释器加载、批量推理（自动处理量化输入输出和固定批次模型）以及延迟测量，
+供导出对比、基准测试、回测等脚本共用
+
+依赖:
+    pip install tensorflow numpy
+"""
+
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+def load_interpreter(
+    model_path: Optional[str] = None,
+    model_content: Optional[bytes] = None,
+    num_threads: Optional[int] = None
+):
+    """
+    创建并初始化 TFLite 解释器
+
+    使用完整 TensorFlow 提供的解释器，可以运行包含 Select TF Ops 的模型
+    """
+    import tensorflow as tf
+
+    interpreter = tf.lite.Interpreter(
+        model_path=model_path,
+        model_content=model_content,
+        num_threads=num_threads
+    )
+    interpreter.allocate_tensors()
+    return interpreter
+
+
+def _quantize(x: np.ndarray, detail: Dict) -> np.ndarray:
+    scale, zero_point = detail['quantization']
+    if detail['dtype'] in (np.int8, np.uint8) and scale:
+        info = np.iinfo(detail['dtype'])
+        return np.clip(np.round(x / scale + zero_point), info.min, info.max).astype(detail['dtype'])
+    return x.astype(detail['dtype'])
+
+
+def _dequantize(y: np.ndarray, detail: Dict) -> np.ndarray:
+    scale, zero_point = detail['quantization']
+    if detail['dtype'] in (np.int8, np.uint8) and scale:
+        return (y.astype(np.float32) - zero_point) * scale
+    return y.astype(np.float32)
+
+
+def _resize_batch(interpreter, batch_size: int) -> bool:
+    """尝试将输入批次维调整为 batch_size，模型不支持时返回 False"""
+    detail = interpreter.get_input_details()[0]
+    if detail['shape'][0] == batch_size:
+        return True
+    try:
+        shape = list(detail['shape'])
+        shape[0] = batch_size
+        interpreter.resize_tensor_input(detail['index'], shape)
+        interpreter.allocate_tensors()
+        return True
+    except (ValueError, RuntimeError):
+        return False
+
+
+def invoke(interpreter, x: np.ndarray, output_index: int = 0) -> np.ndarray:
+    """对一个批次执行推理，x 的批次维须与当前输入形状一致"""
+    input_detail = interpreter.get_input_details()[0]
+    output_detail = interpreter.get_output_details()[output_index]
+    interpreter.set_tensor(input_detail['index'], _quantize(x, input_detail))
+    interpreter.invoke()
+    return _dequantize(interpreter.get_tensor(output_detail['index']), output_detail)
+
+
+def run_batch(
+    interpreter,
+    X: np.ndarray,
+    chunk_size: int = 256,
+    output_index: int = 0
+) -> np.ndarray:
+    """
+    批量推理
+
+    按 chunk_size 调整输入批次维，一次调用处理一整块窗口；
+    模型批次维固定（如 builtin 导出的 [1, ...]）时退化为逐条推理
+
+    Args:
+        interpreter: TFLite 解释器
+        X: (n, sequence_length, num_classes) 输入窗口
+        chunk_size: 每次推理的批次大小
+        output_index: 输出张量序号
+
+    Returns:
+        (n, num_classes) float32 输出
+    """
+    X = np.asarray(X, dtype=np.float32)
+    if len(X) == 0:
+        shape = interpreter.get_output_details()[output_index]['shape']
+        return np.zeros((0, *shape[1:]), dtype=np.float32)
+
+    outputs: List[np.ndarray] = []
+    for start in range(0, len(X), chunk_size):
+        chunk = X[start:start + chunk_size]
+        if _resize_batch(interpreter, len(chunk)):
+            outputs.append(invoke(interpreter, chunk, output_index))
+        else:
+            _resize_batch(interpreter, 1)
+            outputs.extend(invoke(interpreter, row[np.newaxis], output_index) for row in chunk)
+    return np.concatenate(outputs, axis=0)
+
+
+def measure_latency(
+    interpreter,
+    x: np.ndarray,
+    runs: int = 100,
+    warmup: int = 10
+) -> np.ndarray:
+    """
+    测量单批次推理延迟
+
+    Returns:
+        每次推理耗时（毫秒）
+    """
+    _resize_batch(interpreter, len(x))
+    for _ in range(warmup):
+        invoke(interpreter, x)
+
+    timings = np.empty(runs, dtype=np.float64)
+    for i in range(runs):
+        start = time.perf_counter()
+        invoke(interpreter, x)
+        timings[i] = (time.perf_counter() - start) * 1000
+    return timings
+
+
+def top_k_indices(probabilities: np.ndarray, k: int) -> np.ndarray:
+    """每行概率最高的 k 个号码下标（按概率降序）"""
+    k = min(k, probabilities.shape[1])
+    top = np.argpartition(-probabilities, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(probabilities, top, axis=1), axis=1)
+    return np.take_along_axis(top, order, axis=1)
+
+
+def top_k_agreement(reference: np.ndarray, candidate: np.ndarray, k: int) -> float:
+    """两组预测 top-k 号码的平均重合比例"""
+    if len(reference) == 0:
+        return 1.0
+    ref = top_k_indices(reference, k)
+    cand = top_k_indices(candidate, k)
+    ref_mask = np.zeros(reference.shape, dtype=bool)
+    cand_mask = np.zeros(candidate.shape, dtype=bool)
+    np.put_along_axis(ref_mask, ref, True, axis=1)
+    np.put_along_axis(cand_mask, cand, True, axis=1)
+    return float((ref_mask & cand_mask).sum(axis=1).mean() / ref.shape[1])
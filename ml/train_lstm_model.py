@@ -4,21 +4,186 @@ LSTM 彩票预测模型训练脚本
 使用 TensorFlow 训练 LSTM 模型，然后转换为 TensorFlow Lite 格式
 用于 Android 应用中的彩票号码预测
 
+TensorFlow 在首次构建模型时才导入，--mode inspect / prepare / dry_run 不依赖 TensorFlow，
+可在 CI 或没有安装 TensorFlow 的机器上快速检查数据和训练配置
+
 依赖:
     pip install tensorflow numpy pandas
 
 使用方法:
     python train_lstm_model.py --lottery_type ssq --history_file history.json
+    python train_lstm_model.py --lottery_type ssq --history_file history.json --mode inspect
+    python train_lstm_model.py --lottery_type ssq --history_file history.json --mode dry_run
+    python train_lstm_model.py --lottery_type ssq --history_file history.json --mode prepare --cache_dir .cache/tensors
+    python train_lstm_model.py --lottery_type ssq --history_file history.json --high_throughput
+    python train_lstm_model.py --lottery_type ssq --history_file history.json --mode benchmark
+    python train_lstm_model.py --lottery_type ssq --history_file history.json --resume_from models
+    python train_lstm_model.py --lottery_type ssq --history_file history.json --distill --student_type conv
+    python train_lstm_model.py --lottery_type ssq --history_file history.json --time_order oldest_first --step_export
+    python train_lstm_model.py --lottery_type ssq --history_file history.json --cache_dir .cache/tensors
+    python train_lstm_model.py --lottery_type ssq --history_file history.json --profile profile_train.json
 """
 
-import tensorflow as tf
+# 类型注解不在定义时求值，避免为注解导入 TensorFlow
+from __future__ import annotations
+
+import importlib
+import importlib.util
 import numpy as np
 import json
 import argparse
+import os
+import sys
+import time
 from pathlib import Path
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
+
+from draw_store import issue_sort_key
+from history_dataset import encode_draws, load_history_file, sliding_windows, sort_chronologically
+from profiling import StageProfiler
+from tensor_cache import TensorCache
+from tf_threads import configure_tf_threads
+
+
+class _LazyModule:
+    """首次访问属性时才导入的模块代理"""
+    
+    def __init__(self, name: str, on_load=None):
+        self._name = name
+        self._on_load = on_load
+        self._module = None
+    
+    def _load(self):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+            if self._on_load is not None:
+                self._on_load(self._module)
+        return self._module
+    
+    def __getattr__(self, attr: str):
+        # 只有实例上不存在的属性才会进入这里
+        return getattr(self._load(), attr)
+
+
+def _print_tf_version(module):
+    print(f"TensorFlow version: {module.__version__}")
+
+
+# 模型构建、训练、保存和转换用到 tf 时才真正导入 TensorFlow
+tf = _LazyModule('tensorflow', on_load=_print_tf_version)
+
+# 根据彩票类型设置球号范围
+LOTTERY_CONFIG = {
+    'ssq': {'red': 33, 'blue': 16},  # 双色球: 红球1-33选6, 蓝球1-16选1
+    'dlt': {'red': 35, 'blue': 12},  # 大乐透: 红球1-35选5, 蓝球1-12选2
+    'qlc': {'red': 30, 'blue': 30},  # 七乐彩: 基本号1-30选7, 特别号1-30选1
+    'fc3d': {'red': 10, 'blue': 10},  # 福彩3D: 百位、十位、个位各0-9
+    'qxc': {'red': 10, 'blue': 15},   # 七星彩: 前6位0-9, 第7位0-14
+    'pl3': {'red': 10, 'blue': 10},   # 排列3: 百位、十位、个位各0-9
+    'pl5': {'red': 10, 'blue': 10},   # 排列5: 5位数字，每位0-9
+    'kl8': {'red': 80, 'blue': 1},    # 快乐8: 1-80选20个号码
+}
+
+COLOR_NAMES = {'red': '红球', 'blue': '蓝球'}
+
+# 多头模型的输入/输出名称（TFLite 签名中的键名，Android 端按名称取输出）
+MULTI_HEAD_INPUT = 'draw_input'
+MULTI_HEAD_OUTPUTS = {'red': 'red_output', 'blue': 'blue_output'}
+
+# 高吞吐模式：学习率按批次大小的平方根放大（Adam 常用的缩放方式），以 CLI 默认批次 16 为基准
+BASE_BATCH_SIZE = 16
+MAX_LEARNING_RATE = 0.01
+
+# TFLite 导出方式
+#   select_ops: 当前默认，float16 权重 + Select TF Ops（需要 Flex delegate）
+#   builtin:    仅内置算子，LSTM 融合为 UnidirectionalSequenceLSTM，float16 权重
+#   int8:       仅内置算子，基于真实历史窗口校准的全整型量化（输入输出保持 float32）
+TFLITE_VARIANTS = ('select_ops', 'builtin', 'int8')
+
+# 训练元数据（与模型文件放在同一目录），--resume_from 据此判断模型配置和已训练到的期号
+TRAINING_META_FILE = 'training_meta.json'
+TRAINING_META_VERSION = 1
+
+# 蒸馏学生模型：gru 为单层窄 GRU，conv 为单层 1D 卷积；均按固定序列长度展开，导出后只含内置算子
+STUDENT_TYPES = ('gru', 'conv')
+# 延迟对比的线程数：1 对应低端机单线程，4 与 LSTMPredictor 一致
+DISTILL_LATENCY_THREADS = (1, 4)
+
+# 窗口内各期的时间顺序
+#   newest_first: 当前默认，与 LSTMPredictor 一致，窗口位置 0 为最新一期
+#   oldest_first: 训练前按期号升序排列，窗口最后一步为最新一期，可导出单步模型（--step_export）
+TIME_ORDERS = ('newest_first', 'oldest_first')
+
+# 单步（有状态）导出的输入/输出名称：每次输入一期号码和两层 LSTM 的 h/c 状态，
+# 输出号码概率和更新后的状态（状态输出名为状态名加 _out）
+STEP_INPUT = 'draw_step'
+STEP_STATE_NAMES = ('lstm1_h', 'lstm1_c', 'lstm2_h', 'lstm2_c')
+
+# 旧版训练元数据中没有的配置项取默认值
+META_DEFAULTS = {'time_order': 'newest_first'}
+
+
+def tflite_file_name(key: str, time_order: str = 'newest_first', variant: str = '') -> str:
+    """
+    导出的 TFLite 文件名，key 为 red / blue / multi，variant 如 _int8、_student、_step
+
+    oldest_first 的窗口顺序与 LSTMPredictor 相反，文件名加 _oldest_first，
+    不会与可复制为 App 资源的 lottery_lstm_{red,blue,multi}.tflite 混淆
+    """
+    order = '' if time_order == 'newest_first' else f"_{time_order}"
+    return f"lottery_lstm_{key}{order}{variant}.tflite"
+
 
-print(f"TensorFlow version: {tf.__version__}")
+class StepRing:
+    """
+    单步模型的逐期推理，结果与窗口模型完全一致
+    
+    保存 sequence_length 个错开的状态槽，每期新开奖对所有槽执行一步（一次批次为
+    sequence_length 的推理）。第 u 次更新前清零槽 u % sequence_length，
+    因此每次更新后总有一个槽恰好输入了最近 sequence_length 期，它的输出即窗口模型对最近窗口的输出。
+    
+    不节省计算：每期执行的 LSTM 步数（sequence_length 个槽各一步）与窗口模型推理一次相同，
+    用于逐期输入开奖时校验单步模型与窗口模型一致。只保存一个状态并一直延续时每期只需一步，
+    但状态包含窗口之外的所有更早开奖，与按固定长度窗口训练的模型不再一致
+    （见 export_step_models 报告中的 carried 误差）
+    """
+    
+    def __init__(self, step_fn, state_sizes: Dict[str, int], sequence_length: int):
+        """
+        Args:
+            step_fn: 输入 {STEP_INPUT: (n, input_dim), 状态名: (n, units)}，返回输出字典
+            state_sizes: 各状态的维度
+            sequence_length: 窗口长度
+        """
+        self.step_fn = step_fn
+        self.sequence_length = sequence_length
+        self.states = {name: np.zeros((sequence_length, units), dtype=np.float32) for name, units in state_sizes.items()}
+        self.updates = 0
+    
+    def update(self, draw: np.ndarray) -> Optional[Dict[str, np.ndarray]]:
+        """
+        输入最新一期的 one-hot 向量 (input_dim,)
+        
+        Returns:
+            已输入满 sequence_length 期时为最近窗口的概率输出（批次维为 1），否则为 None
+        """
+        slot = self.updates % self.sequence_length
+        for values in self.states.values():
+            values[slot] = 0.0
+        draws = np.repeat(np.asarray(draw, dtype=np.float32)[np.newaxis], self.sequence_length, axis=0)
+        outputs = self.step_fn({STEP_INPUT: draws, **self.states})
+        # 解释器的输出缓冲区会在下次推理时被覆盖，需要复制
+        self.states = {name: np.array(outputs[f"{name}_out"], dtype=np.float32) for name in self.states}
+        self.updates += 1
+        if self.updates < self.sequence_length:
+            return None
+        
+        full = self.updates % self.sequence_length
+        state_outputs = {f"{name}_out" for name in self.states}
+        return {
+            name: np.array(value)[full:full + 1]
+            for name, value in outputs.items() if name not in state_outputs
+        }
 
 
 class LotteryLSTMModel:
@@ -33,6 +198,11 @@ class LotteryLSTMModel:
         Dropout: 0.2
         Dense Layer: 32 units (ReLU)
         Output Layer: num_classes (Sigmoid for binary classification of each number)
+    
+    architecture='multi_head' 时改为单个模型:
+        Input: [batch_size, sequence_length, num_red_balls + num_blue_balls]
+        共享 LSTM 主干: LSTM 128 -> Dropout -> LSTM 64 -> Dropout
+        红球/蓝球输出头: 各自 Dense 32 (ReLU) -> Dense num_classes (Sigmoid)
     """
     
     def __init__(
@@ -42,18 +212,96 @@ class LotteryLSTMModel:
         sequence_length: int = 10,
         lstm_units_1: int = 128,
         lstm_units_2: int = 64,
-        dense_units: int = 32
+        dense_units: int = 32,
+        architecture: str = 'separate',
+        profiler: Optional[StageProfiler] = None,
+        learning_rate: float = 0.001,
+        jit_compile: bool = False,
+        colors: Tuple[str, ...] = ('red', 'blue'),
+        time_order: str = 'newest_first'
     ):
+        """
+        colors 为分开模型时要构建的颜色，只训练单个颜色的任务（batch_train、sweep）
+        传 ('red',) 或 ('blue',)，不构建用不到的另一个模型；多头模型必须包含红球和蓝球
+        
+        time_order 见 TIME_ORDERS，只记录在训练元数据中并用于单步导出的检查，
+        调用方负责按该顺序排列 history_data（oldest_first 时使用 sort_chronologically）
+        """
+        if architecture not in ('separate', 'multi_head'):
+            raise ValueError(f"不支持的模型架构: {architecture}")
+        if time_order not in TIME_ORDERS:
+            raise ValueError(f"不支持的时间顺序: {time_order}")
+        unknown = [color for color in colors if color not in COLOR_NAMES]
+        if unknown or not colors:
+            raise ValueError(f"不支持的颜色: {', '.join(unknown) or '(空)'}")
+        if architecture == 'multi_head' and set(colors) != set(COLOR_NAMES):
+            raise ValueError("多头模型必须同时包含红球和蓝球")
+        
         self.num_red_balls = num_red_balls
         self.num_blue_balls = num_blue_balls
         self.sequence_length = sequence_length
         self.lstm_units_1 = lstm_units_1
         self.lstm_units_2 = lstm_units_2
         self.dense_units = dense_units
+        self.architecture = architecture
+        self.time_order = time_order
+        self.learning_rate = learning_rate
+        # XLA 编译整个训练步，CPU 上可减少小算子的调度开销
+        self.jit_compile = jit_compile
+        # 各模型每轮训练耗时，用于计算吞吐
+        self.throughput: Dict[str, Dict] = {}
+        # 各模型训练结束时的最佳 val_loss，写入训练元数据
+        self.val_loss: Dict[str, float] = {}
+        # distill() 训练的学生模型，键为 red / blue 或 multi
+        self.students: Dict[str, tf.keras.Model] = {}
+        self.student_type: Optional[str] = None
+        # 未开启剖析时使用禁用的剖析器，各阶段无需判断
+        self.profiler = profiler or StageProfiler(enabled=False)
+        
+        if architecture == 'multi_head':
+            # 单个模型：共享主干 + 红球/蓝球两个输出头
+            self.model = self._build_multi_head_model()
+            self.red_model = None
+            self.blue_model = None
+        else:
+            # 创建两个模型：红球和蓝球（只构建 colors 中的颜色）
+            self.model = None
+            self.red_model = self._build_model(num_red_balls, "red_lstm") if 'red' in colors else None
+            self.blue_model = self._build_model(num_blue_balls, "blue_lstm") if 'blue' in colors else None
+    
+    def _compile_options(self) -> Dict:
+        """只在开启时传 jit_compile，兼容不支持该参数的旧版 TensorFlow"""
+        return {'jit_compile': True} if self.jit_compile else {}
+    
+    def _compile_model(
+        self,
+        model: tf.keras.Model,
+        learning_rate: Optional[float] = None,
+        with_metrics: bool = True
+    ):
+        """
+        编译模型（新建模型、加载已有模型继续训练和蒸馏学生模型共用）
+        
+        with_metrics 为 False 时只计算 loss（蒸馏的软目标不是 0/1，准确率等指标没有意义）
+        """
+        def metrics():
+            if not with_metrics:
+                return []
+            return ['accuracy', tf.keras.metrics.Precision(), tf.keras.metrics.Recall()]
         
-        # 创建两个模型：红球和蓝球
-        self.red_model = self._build_model(num_red_balls, "red_lstm")
-        self.blue_model = self._build_model(num_blue_balls, "blue_lstm")
+        if self.architecture == 'multi_head':
+            loss = {name: 'binary_crossentropy' for name in MULTI_HEAD_OUTPUTS.values()}
+            metric_config = {name: metrics() for name in MULTI_HEAD_OUTPUTS.values()}
+        else:
+            loss = 'binary_crossentropy'
+            metric_config = metrics()
+        
+        model.compile(
+            optimizer=tf.keras.optimizers.Adam(learning_rate=learning_rate or self.learning_rate),
+            loss=loss,
+            metrics=metric_config,
+            **self._compile_options()
+        )
     
     def _build_model(self, num_classes: int, name: str) -> tf.keras.Model:
         """构建 LSTM 模型"""
@@ -93,14 +341,101 @@ class LotteryLSTMModel:
         ], name=name)
         
         # 编译模型
-        model.compile(
-            optimizer=tf.keras.optimizers.Adam(learning_rate=0.001),
-            loss='binary_crossentropy',
-            metrics=['accuracy', tf.keras.metrics.Precision(), tf.keras.metrics.Recall()]
+        self._compile_model(model)
+        
+        return model
+    
+    def _build_multi_head_model(self) -> tf.keras.Model:
+        """构建共享 LSTM 主干的多头模型"""
+        inputs = tf.keras.layers.Input(
+            shape=(self.sequence_length, self.num_red_balls + self.num_blue_balls),
+            name=MULTI_HEAD_INPUT
         )
         
+        # 共享主干
+        x = tf.keras.layers.LSTM(self.lstm_units_1, return_sequences=True, name="shared_lstm1")(inputs)
+        x = tf.keras.layers.Dropout(0.2, name="shared_dropout1")(x)
+        x = tf.keras.layers.LSTM(self.lstm_units_2, return_sequences=False, name="shared_lstm2")(x)
+        x = tf.keras.layers.Dropout(0.2, name="shared_dropout2")(x)
+        
+        # 红球/蓝球输出头
+        outputs = {}
+        for color in ('red', 'blue'):
+            head = tf.keras.layers.Dense(
+                self.dense_units,
+                activation='relu',
+                name=f"{color}_dense"
+            )(x)
+            outputs[MULTI_HEAD_OUTPUTS[color]] = tf.keras.layers.Dense(
+                self.num_classes(color),
+                activation='sigmoid',
+                name=MULTI_HEAD_OUTPUTS[color]
+            )(head)
+        
+        model = tf.keras.Model(inputs=inputs, outputs=outputs, name="multi_head_lstm")
+        self._compile_model(model)
+        
+        return model
+    
+    def _build_student(self, key: str, student_type: str, units: int) -> tf.keras.Model:
+        """
+        构建蒸馏用的小模型，输入/输出层名称和形状与教师模型一致，导出的 TFLite 可直接替换
+        
+        gru:  GRU(units) -> Dense num_classes (Sigmoid)
+        conv: Conv1D(units, 3) -> Flatten -> Dense num_classes (Sigmoid)
+        
+        GRU 按序列长度展开（unroll），转换时不产生 while 循环，不需要 Select TF Ops
+        """
+        if student_type not in STUDENT_TYPES:
+            raise ValueError(f"不支持的学生模型类型: {student_type}")
+        
+        if key == 'multi':
+            input_dim = self.num_red_balls + self.num_blue_balls
+            input_name = MULTI_HEAD_INPUT
+            heads = {MULTI_HEAD_OUTPUTS[color]: self.num_classes(color) for color in ('red', 'blue')}
+        else:
+            input_dim = self.num_classes(key)
+            input_name = f"{key}_lstm_input"
+            heads = {f"{key}_lstm_output": input_dim}
+        
+        inputs = tf.keras.layers.Input(shape=(self.sequence_length, input_dim), name=input_name)
+        if student_type == 'gru':
+            x = tf.keras.layers.GRU(units, unroll=True, name=f"{key}_student_gru")(inputs)
+        else:
+            x = tf.keras.layers.Conv1D(units, 3, activation='relu', name=f"{key}_student_conv")(inputs)
+            x = tf.keras.layers.Flatten(name=f"{key}_student_flatten")(x)
+        
+        outputs = {
+            name: tf.keras.layers.Dense(num_classes, activation='sigmoid', name=name)(x)
+            for name, num_classes in heads.items()
+        }
+        if key != 'multi':
+            outputs = next(iter(outputs.values()))
+        
+        model = tf.keras.Model(inputs=inputs, outputs=outputs, name=f"{key}_student_{student_type}")
+        self._compile_model(model, with_metrics=False)
         return model
     
+    def _join_heads(self, outputs) -> np.ndarray:
+        """多头模型 predict 的输出（字典或按输出顺序的列表）拼接为 (n, num_red_balls + num_blue_balls)"""
+        if isinstance(outputs, dict):
+            outputs = [outputs[MULTI_HEAD_OUTPUTS[color]] for color in ('red', 'blue')]
+        return np.concatenate(outputs, axis=1)
+    
+    def encode_combined(self, history_data: List[dict]) -> np.ndarray:
+        """将红球和蓝球拼接为多头模型的输入矩阵 (n_draws, num_red_balls + num_blue_balls)"""
+        return np.concatenate([
+            encode_draws(history_data, 'red', self.num_red_balls),
+            encode_draws(history_data, 'blue', self.num_blue_balls)
+        ], axis=1)
+    
+    def _split_targets(self, y):
+        """将拼接的目标拆分为多头模型各输出头的目标"""
+        return {
+            MULTI_HEAD_OUTPUTS['red']: y[:, :self.num_red_balls],
+            MULTI_HEAD_OUTPUTS['blue']: y[:, self.num_red_balls:]
+        }
+    
     def prepare_data(
         self,
         history_data: List[dict]
@@ -117,174 +452,1112 @@ class LotteryLSTMModel:
         Returns:
             X_red, y_red, X_blue, y_blue
         """
-        # 红球数据
-        red_sequences = []
-        red_targets = []
-        
-        # 蓝球数据
-        blue_sequences = []
-        blue_targets = []
-        
-        # 滑动窗口创建序列
-        for i in range(len(history_data) - self.sequence_length):
-            # 红球
-            red_seq = []
-            for j in range(i, i + self.sequence_length):
-                red_vector = np.zeros(self.num_red_balls)
-                for num in history_data[j]['red']:
-                    red_vector[int(num) - 1] = 1
-                red_seq.append(red_vector)
-            red_sequences.append(red_seq)
-            
-            # 红球目标（下一期）
-            red_target = np.zeros(self.num_red_balls)
-            for num in history_data[i + self.sequence_length]['red']:
-                red_target[int(num) - 1] = 1
-            red_targets.append(red_target)
-            
-            # 蓝球
-            blue_seq = []
-            for j in range(i, i + self.sequence_length):
-                blue_vector = np.zeros(self.num_blue_balls)
-                for num in history_data[j]['blue']:
-                    blue_vector[int(num) - 1] = 1
-                blue_seq.append(blue_vector)
-            blue_sequences.append(blue_seq)
-            
-            # 蓝球目标（下一期）
-            blue_target = np.zeros(self.num_blue_balls)
-            for num in history_data[i + self.sequence_length]['blue']:
-                blue_target[int(num) - 1] = 1
-            blue_targets.append(blue_target)
-        
-        return (
-            np.array(red_sequences),
-            np.array(red_targets),
-            np.array(blue_sequences),
-            np.array(blue_targets)
+        # 每期只编码一次，窗口和目标均为 one-hot 矩阵的视图
+        red_matrix = encode_draws(history_data, 'red', self.num_red_balls)
+        blue_matrix = encode_draws(history_data, 'blue', self.num_blue_balls)
+        
+        X_red, y_red = sliding_windows(red_matrix, self.sequence_length)
+        X_blue, y_blue = sliding_windows(blue_matrix, self.sequence_length)
+        
+        return X_red, y_red, X_blue, y_blue
+    
+    def make_streaming_dataset(
+        self,
+        matrix: np.ndarray,
+        start: int,
+        end: int,
+        batch_size: int,
+        shuffle_buffer: int = 0
+    ) -> tf.data.Dataset:
+        """
+        基于 one-hot 矩阵按需生成滑动窗口的 tf.data 流水线
+        
+        只保存一份 (n_draws, num_classes) 矩阵，窗口在每个批次中按索引 gather 生成
+        
+        Args:
+            matrix: one-hot 历史矩阵
+            start: 起始窗口索引（含）
+            end: 结束窗口索引（不含）
+            batch_size: 批次大小
+            shuffle_buffer: 打乱缓冲区大小，0 表示不打乱（验证集）
+        
+        Returns:
+            产出 (X, y) 批次的数据集
+        """
+        history = tf.constant(matrix)
+        offsets = tf.range(self.sequence_length, dtype=tf.int64)
+        
+        def gather_windows(indices):
+            windows = tf.gather(history, indices[:, tf.newaxis] + offsets)
+            targets = tf.gather(history, indices + self.sequence_length)
+            return windows, targets
+        
+        dataset = tf.data.Dataset.range(start, end)
+        if shuffle_buffer > 0:
+            dataset = dataset.shuffle(shuffle_buffer, reshuffle_each_iteration=True)
+        dataset = dataset.batch(batch_size)
+        dataset = dataset.map(gather_windows, num_parallel_calls=tf.data.AUTOTUNE)
+        return dataset.prefetch(tf.data.AUTOTUNE)
+    
+    def _callbacks(self) -> List[tf.keras.callbacks.Callback]:
+        """训练回调：早停 + 学习率衰减"""
+        return [
+            tf.keras.callbacks.EarlyStopping(
+                monitor='val_loss',
+                patience=10,
+                restore_best_weights=True
+            ),
+            tf.keras.callbacks.ReduceLROnPlateau(
+                monitor='val_loss',
+                factor=0.5,
+                patience=5,
+                min_lr=0.00001
+            )
+        ]
+    
+    def _throughput_callback(self, key: str, num_samples: int) -> tf.keras.callbacks.Callback:
+        """记录每轮训练部分的耗时（不含验证），结果写入 self.throughput[key]"""
+        record = {'num_samples': num_samples, 'epoch_seconds': []}
+        self.throughput[key] = record
+        
+        class ThroughputMeter(tf.keras.callbacks.Callback):
+            def on_epoch_begin(self, epoch, logs=None):
+                self.start = time.perf_counter()
+                self.train_end = None
+            
+            def on_test_begin(self, logs=None):
+                # fit 内的验证在训练步之后执行
+                if self.train_end is None:
+                    self.train_end = time.perf_counter()
+            
+            def on_epoch_end(self, epoch, logs=None):
+                end = self.train_end or time.perf_counter()
+                record['epoch_seconds'].append(end - self.start)
+        
+        return ThroughputMeter()
+    
+    def _report_throughput(self, key: str):
+        """打印吞吐（样本/秒），首轮包含图构建和 XLA 编译，单独列出"""
+        record = self.throughput.get(key)
+        if not record or not record['epoch_seconds']:
+            return
+        seconds = record['epoch_seconds']
+        steady = seconds[1:] if len(seconds) > 1 else seconds
+        record['samples_per_sec'] = record['num_samples'] / max(float(np.median(steady)), 1e-9)
+        record['first_epoch_seconds'] = seconds[0]
+        print(f"⚡ 训练吞吐: {record['samples_per_sec']:.0f} 样本/秒 "
+              f"(首轮 {seconds[0]:.2f}s, 之后每轮中位 {np.median(steady):.2f}s)")
+    
+    def _record_val_loss(self, key: str, history):
+        """早停会恢复最佳权重，记录最小的 val_loss"""
+        val_loss = history.history.get('val_loss') if history is not None else None
+        if val_loss:
+            self.val_loss[key] = float(min(val_loss))
+    
+    def _num_train_windows(self, num_draws: int, validation_split: float) -> int:
+        """训练窗口数（与 validation_split 的切分点一致）"""
+        return int(max(num_draws - self.sequence_length, 0) * (1.0 - validation_split))
+    
+    def _fit_streaming(
+        self,
+        model: tf.keras.Model,
+        matrix: np.ndarray,
+        epochs: int,
+        batch_size: int,
+        validation_split: float,
+        shuffle_buffer: int,
+        split_targets: bool = False,
+        extra_callbacks: Optional[List[tf.keras.callbacks.Callback]] = None
+    ):
+        """
+        流式训练单个模型，验证集取时间上最后的窗口
+        
+        split_targets 为 True 时按多头模型的输出头拆分目标
+        """
+        num_windows = max(len(matrix) - self.sequence_length, 0)
+        # 与 Keras validation_split 的切分点一致
+        split_at = int(num_windows * (1.0 - validation_split))
+        
+        train_ds = self.make_streaming_dataset(
+            matrix, 0, split_at, batch_size, shuffle_buffer
+        )
+        val_ds = None
+        if split_at < num_windows:
+            val_ds = self.make_streaming_dataset(
+                matrix, split_at, num_windows, batch_size
+            )
+        
+        if split_targets:
+            train_ds = train_ds.map(lambda x, y: (x, self._split_targets(y)))
+            if val_ds is not None:
+                val_ds = val_ds.map(lambda x, y: (x, self._split_targets(y)))
+        
+        print(f"流式训练: 训练窗口 {split_at}, 验证窗口 {num_windows - split_at}")
+        return model.fit(
+            train_ds,
+            epochs=epochs,
+            validation_data=val_ds,
+            callbacks=self._callbacks() + list(extra_callbacks or []),
+            verbose=1
         )
     
-    def train(
+    def get_model(self, color: str) -> tf.keras.Model:
+        """按颜色获取模型 ('red' 或 'blue')"""
+        model = self.red_model if color == 'red' else self.blue_model
+        if model is None and self.architecture == 'separate':
+            raise ValueError(f"没有构建{COLOR_NAMES[color]}模型（colors 不包含 {color}）")
+        return model
+    
+    def num_classes(self, color: str) -> int:
+        """按颜色获取号码总数"""
+        return self.num_red_balls if color == 'red' else self.num_blue_balls
+    
+    def train_color(
         self,
         history_data: List[dict],
+        color: str,
         epochs: int = 100,
         batch_size: int = 32,
-        validation_split: float = 0.2
+        validation_split: float = 0.2,
+        streaming: bool = False,
+        shuffle_buffer: int = 1024,
+        extra_callbacks: Optional[List[tf.keras.callbacks.Callback]] = None
     ):
-        """训练模型"""
-        print(f"准备训练数据... (历史数据: {len(history_data)} 期)")
-        X_red, y_red, X_blue, y_blue = self.prepare_data(history_data)
+        """
+        训练单个颜色的模型
         
-        print(f"红球训练集形状: X={X_red.shape}, y={y_red.shape}")
-        print(f"蓝球训练集形状: X={X_blue.shape}, y={y_blue.shape}")
+        Args:
+            history_data: 历史开奖数据列表
+            color: 'red' 或 'blue'
+            extra_callbacks: 追加到默认回调之后的 Keras 回调（如超参搜索的提前终止）
+            其余参数同 train()
+        """
+        if self.architecture == 'multi_head':
+            raise ValueError("多头模型不支持按颜色单独训练，请使用 train()")
+        
+        model = self.get_model(color)
+        with self.profiler.stage(f"prepare_data:{color}") as record:
+            matrix = encode_draws(history_data, color, self.num_classes(color))
+            X, y = (None, None) if streaming else sliding_windows(matrix, self.sequence_length)
+            self.profiler.record_arrays(record, matrix, X, y)
         
-        # 训练红球模型
         print("\n" + "="*50)
-        print("训练红球 LSTM 模型...")
+        print(f"训练{COLOR_NAMES[color]} LSTM 模型...")
         print("="*50)
-        red_history = self.red_model.fit(
-            X_red, y_red,
-            epochs=epochs,
-            batch_size=batch_size,
-            validation_split=validation_split,
-            callbacks=[
-                tf.keras.callbacks.EarlyStopping(
-                    monitor='val_loss',
-                    patience=10,
-                    restore_best_weights=True
-                ),
-                tf.keras.callbacks.ReduceLROnPlateau(
-                    monitor='val_loss',
-                    factor=0.5,
-                    patience=5,
-                    min_lr=0.00001
+        
+        callbacks = list(extra_callbacks or []) + self.profiler.epoch_callbacks(f"fit:{color}")
+        callbacks.append(self._throughput_callback(color, self._num_train_windows(len(matrix), validation_split)))
+        with self.profiler.stage(f"fit:{color}"):
+            if streaming:
+                print(f"{COLOR_NAMES[color]}历史矩阵形状: {matrix.shape}")
+                history = self._fit_streaming(
+                    model, matrix, epochs, batch_size,
+                    validation_split, shuffle_buffer,
+                    extra_callbacks=callbacks
                 )
-            ],
-            verbose=1
+            else:
+                print(f"{COLOR_NAMES[color]}训练集形状: X={X.shape}, y={y.shape}")
+                history = model.fit(
+                    X, y,
+                    epochs=epochs,
+                    batch_size=batch_size,
+                    validation_split=validation_split,
+                    callbacks=self._callbacks() + callbacks,
+                    verbose=1
+                )
+        self._report_throughput(color)
+        self._record_val_loss(color, history)
+        return history
+    
+    def train(
+        self,
+        history_data: List[dict],
+        epochs: int = 100,
+        batch_size: int = 32,
+        validation_split: float = 0.2,
+        streaming: bool = False,
+        shuffle_buffer: int = 1024
+    ):
+        """
+        训练模型
+        
+        Args:
+            history_data: 历史开奖数据列表
+            epochs: 训练轮数
+            batch_size: 批次大小
+            validation_split: 验证集比例（取时间上最后的窗口）
+            streaming: 是否使用 tf.data 流式生成窗口，不物化完整窗口张量
+            shuffle_buffer: 流式模式下的打乱缓冲区大小
+        """
+        print(f"准备训练数据... (历史数据: {len(history_data)} 期)")
+        
+        if self.architecture == 'multi_head':
+            return self._train_multi_head(
+                history_data, epochs, batch_size,
+                validation_split, streaming, shuffle_buffer
+            )
+        
+        red_history = self.train_color(
+            history_data, 'red', epochs, batch_size,
+            validation_split, streaming, shuffle_buffer
+        )
+        blue_history = self.train_color(
+            history_data, 'blue', epochs, batch_size,
+            validation_split, streaming, shuffle_buffer
         )
         
-        # 训练蓝球模型
+        return red_history, blue_history
+    
+    def _train_multi_head(
+        self,
+        history_data: List[dict],
+        epochs: int,
+        batch_size: int,
+        validation_split: float,
+        streaming: bool,
+        shuffle_buffer: int
+    ):
+        """训练多头模型，返回单个训练历史"""
+        with self.profiler.stage("prepare_data:multi") as record:
+            matrix = self.encode_combined(history_data)
+            X, y = (None, None) if streaming else sliding_windows(matrix, self.sequence_length)
+            self.profiler.record_arrays(record, matrix, X, y)
+        
         print("\n" + "="*50)
-        print("训练蓝球 LSTM 模型...")
+        print("训练多头 LSTM 模型（红球 + 蓝球）...")
         print("="*50)
-        blue_history = self.blue_model.fit(
-            X_blue, y_blue,
-            epochs=epochs,
-            batch_size=batch_size,
-            validation_split=validation_split,
-            callbacks=[
-                tf.keras.callbacks.EarlyStopping(
-                    monitor='val_loss',
-                    patience=10,
-                    restore_best_weights=True
-                ),
-                tf.keras.callbacks.ReduceLROnPlateau(
-                    monitor='val_loss',
-                    factor=0.5,
-                    patience=5,
-                    min_lr=0.00001
-                )
-            ],
-            verbose=1
-        )
         
-        return red_history, blue_history
+        callbacks = self.profiler.epoch_callbacks("fit:multi")
+        callbacks.append(self._throughput_callback('multi', self._num_train_windows(len(matrix), validation_split)))
+        with self.profiler.stage("fit:multi"):
+            if streaming:
+                print(f"历史矩阵形状: {matrix.shape}")
+                history = self._fit_streaming(
+                    self.model, matrix, epochs, batch_size,
+                    validation_split, shuffle_buffer, split_targets=True,
+                    extra_callbacks=callbacks
+                )
+            else:
+                print(f"训练集形状: X={X.shape}, y={y.shape}")
+                history = self.model.fit(
+                    X, self._split_targets(y),
+                    epochs=epochs,
+                    batch_size=batch_size,
+                    validation_split=validation_split,
+                    callbacks=self._callbacks() + callbacks,
+                    verbose=1
+                )
+        self._report_throughput('multi')
+        self._record_val_loss('multi', history)
+        return history
     
-    def save_models(self, output_dir: str):
-        """保存 Keras 模型"""
+    def save_model(self, color: str, output_dir: str) -> str:
+        """保存单个颜色的 Keras 模型"""
         output_path = Path(output_dir)
         output_path.mkdir(parents=True, exist_ok=True)
         
-        red_path = output_path / "lottery_lstm_red.h5"
-        blue_path = output_path / "lottery_lstm_blue.h5"
+        model_path = output_path / f"lottery_lstm_{color}.h5"
+        self.get_model(color).save(str(model_path))
+        return str(model_path)
+    
+    def save_models(self, output_dir: str):
+        """保存 Keras 模型"""
+        if self.architecture == 'multi_head':
+            output_path = Path(output_dir)
+            output_path.mkdir(parents=True, exist_ok=True)
+            model_path = output_path / "lottery_lstm_multi.h5"
+            self.model.save(str(model_path))
+            print(f"\n✅ Keras 多头模型已保存: {model_path}")
+            return str(model_path)
         
-        self.red_model.save(str(red_path))
-        self.blue_model.save(str(blue_path))
+        red_path = self.save_model('red', output_dir)
+        blue_path = self.save_model('blue', output_dir)
         
         print(f"\n✅ Keras 模型已保存:")
         print(f"   红球: {red_path}")
         print(f"   蓝球: {blue_path}")
         
-        return str(red_path), str(blue_path)
+        return red_path, blue_path
     
-    def convert_to_tflite(self, output_dir: str):
-        """转换为 TensorFlow Lite 格式"""
+    def model_config(self) -> Dict:
+        """决定模型结构的配置，继续训练时必须与已保存的模型一致"""
+        return {
+            'architecture': self.architecture,
+            'num_red_balls': self.num_red_balls,
+            'num_blue_balls': self.num_blue_balls,
+            'sequence_length': self.sequence_length,
+            'lstm_units_1': self.lstm_units_1,
+            'lstm_units_2': self.lstm_units_2,
+            'dense_units': self.dense_units,
+            'time_order': self.time_order
+        }
+    
+    def save_training_meta(self, output_dir: str, history_data, mode: str = 'full', extra: Optional[Dict] = None) -> str:
+        """
+        保存训练元数据 (training_meta.json)
+        
+        last_issue 为训练数据中最新的期号，数据没有期号（如张量缓存）时为 None，
+        此时之后无法用 --resume_from 继续训练
+        """
+        issues = draw_issues(history_data)
+        meta = {
+            'version': TRAINING_META_VERSION,
+            **self.model_config(),
+            'learning_rate': self.learning_rate,
+            'mode': mode,
+            'trained_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'num_draws': len(history_data),
+            'last_issue': max(issues, key=issue_sort_key) if issues else None,
+            'val_loss': dict(self.val_loss),
+            **(extra or {})
+        }
+        
         output_path = Path(output_dir)
         output_path.mkdir(parents=True, exist_ok=True)
+        meta_path = output_path / TRAINING_META_FILE
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        print(f"✅ 训练元数据已保存: {meta_path}")
+        return str(meta_path)
+    
+    def load_models(self, model_dir: str, learning_rate: Optional[float] = None):
+        """加载已保存的 Keras 模型替换当前模型，并以 learning_rate 重新编译"""
+        model_path = Path(model_dir)
         
-        # 转换红球模型
-        print("\n转换红球模型为 TFLite...")
-        red_converter = tf.lite.TFLiteConverter.from_keras_model(self.red_model)
-        red_converter.optimizations = [tf.lite.Optimize.DEFAULT]
-        red_converter.target_spec.supported_types = [tf.float16]  # 使用 float16 减小模型大小
+        def load(name: str) -> tf.keras.Model:
+            # 不恢复优化器状态，继续训练使用新的（较小的）学习率
+            model = tf.keras.models.load_model(str(model_path / name), compile=False)
+            self._compile_model(model, learning_rate)
+            return model
+        
+        if self.architecture == 'multi_head':
+            self.model = load("lottery_lstm_multi.h5")
+        else:
+            self.red_model = load("lottery_lstm_red.h5")
+            self.blue_model = load("lottery_lstm_blue.h5")
+    
+    def resume_training(
+        self,
+        history_data: List[dict],
+        last_issue: str,
+        epochs: int = 5,
+        batch_size: int = 16,
+        replay_ratio: float = 1.0,
+        min_replay: int = 64,
+        eval_size: int = 128,
+        tolerance: float = 0.02,
+        seed: int = 42
+    ) -> Dict:
+        """
+        在已加载的模型上继续训练（先调用 load_models）
+        
+        只训练包含 last_issue 之后新开奖期的窗口，并混入旧窗口的随机回放样本防止遗忘。
+        另取一组旧窗口（不参与训练）在训练前后各评估一次 loss，
+        任一模型的 loss 上升超过 tolerance（相对值）即判定为退化
+        
+        Args:
+            history_data: 完整的历史开奖数据（需要期号），窗口顺序与完整训练一致
+            last_issue: 已保存模型训练到的最新期号
+            replay_ratio: 回放窗口数与新窗口数之比
+            min_replay: 回放窗口数下限
+            eval_size: 评估用旧窗口数上限
+        
+        Returns:
+            结果字典，status 为 up_to_date / resumed / degraded / incompatible
+        """
+        issues = draw_issues(history_data)
+        if issues is None:
+            return {'status': 'incompatible', 'reason': '历史数据缺少期号'}
+        if last_issue not in issues:
+            # 数据被替换或与训练时的数据之间有缺口，无法确定哪些窗口是新的
+            return {'status': 'incompatible', 'reason': f"历史数据中没有期号 {last_issue}"}
+        
+        last_key = issue_sort_key(last_issue)
+        new_rows = np.array([issue_sort_key(issue) > last_key for issue in issues], dtype=np.int64)
+        result = {'new_draws': int(new_rows.sum())}
+        if not result['new_draws']:
+            return {'status': 'up_to_date', **result}
+        
+        # 窗口 i 覆盖第 i .. i+sequence_length 期（含目标），其中有新开奖期即为新窗口
+        num_windows = max(len(issues) - self.sequence_length, 0)
+        counts = np.concatenate([[0], np.cumsum(new_rows)])
+        spans = counts[self.sequence_length + 1:self.sequence_length + 1 + num_windows] - counts[:num_windows]
+        new_idx = np.flatnonzero(spans > 0)
+        old_idx = np.flatnonzero(spans == 0)
+        
+        rng = np.random.default_rng(seed)
+        old_idx = rng.permutation(old_idx)
+        num_eval = min(eval_size, len(old_idx) // 2)
+        eval_idx = np.sort(old_idx[:num_eval])
+        rest = old_idx[num_eval:]
+        num_replay = min(len(rest), max(min_replay, int(np.ceil(replay_ratio * len(new_idx)))))
+        train_idx = rng.permutation(np.concatenate([new_idx, rest[:num_replay]]))
+        result.update({
+            'new_windows': int(len(new_idx)),
+            'replay_windows': int(num_replay),
+            'eval_windows': int(num_eval),
+            'metrics': {}
+        })
+        print(f"🔁 继续训练: 新开奖 {result['new_draws']} 期, 新窗口 {len(new_idx)}, "
+              f"回放旧窗口 {num_replay}, 评估旧窗口 {num_eval}")
+        
+        if self.architecture == 'multi_head':
+            targets = [('multi', self.model, self.encode_combined(history_data))]
+        else:
+            targets = [
+                (color, self.get_model(color), encode_draws(history_data, color, self.num_classes(color)))
+                for color in ('red', 'blue')
+            ]
+        
+        degraded = []
+        for key, model, matrix in targets:
+            X, y = sliding_windows(matrix, self.sequence_length)
+            split = self._split_targets if self.architecture == 'multi_head' else (lambda values: values)
+            
+            def evaluate(indices) -> Optional[float]:
+                if not len(indices):
+                    return None
+                scores = model.evaluate(X[indices], split(y[indices]), batch_size=256, verbose=0, return_dict=True)
+                return float(scores['loss'])
+            
+            metrics = {'eval_loss_before': evaluate(eval_idx), 'new_loss_before': evaluate(new_idx)}
+            
+            print(f"\n继续训练 {key} 模型: {len(train_idx)} 个窗口, {epochs} 轮")
+            callbacks = self.profiler.epoch_callbacks(f"resume_fit:{key}")
+            callbacks.append(self._throughput_callback(key, len(train_idx)))
+            with self.profiler.stage(f"resume_fit:{key}"):
+                # 花式索引只复制选中的窗口
+                model.fit(
+                    X[train_idx], split(y[train_idx]),
+                    epochs=epochs,
+                    batch_size=batch_size,
+                    shuffle=True,
+                    callbacks=callbacks,
+                    verbose=1
+                )
+            self._report_throughput(key)
+            
+            metrics['eval_loss_after'] = evaluate(eval_idx)
+            metrics['new_loss_after'] = evaluate(new_idx)
+            before, after = metrics['eval_loss_before'], metrics['eval_loss_after']
+            metrics['degraded'] = before is not None and after > before * (1.0 + tolerance)
+            if metrics['degraded']:
+                degraded.append(key)
+            if after is not None:
+                self.val_loss[key] = after
+            result['metrics'][key] = metrics
+        
+        result['status'] = 'degraded' if degraded else 'resumed'
+        if degraded:
+            result['reason'] = f"旧窗口 loss 上升超过 {tolerance:.1%}: {', '.join(degraded)}"
+        return result
+    
+    def _convert_keras_model(
+        self,
+        model: tf.keras.Model,
+        variant: str = 'select_ops',
+        representative_windows: Optional[np.ndarray] = None
+    ) -> bytes:
+        """
+        转换 Keras 模型为 TFLite
+        
+        Args:
+            model: Keras 模型
+            variant: 导出方式，见 TFLITE_VARIANTS
+            representative_windows: int8 量化校准用的历史窗口 (n, sequence_length, num_classes)
+        """
+        if variant != 'select_ops':
+            return self._convert_builtin(model, variant, representative_windows)
+        
+        converter = tf.lite.TFLiteConverter.from_keras_model(model)
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]  # 使用 float16 减小模型大小
         # 兼容LSTM：启用Select TF Ops并禁用tensor_list_ops降级
-        red_converter.target_spec.supported_ops = [
+        converter.target_spec.supported_ops = [
             tf.lite.OpsSet.TFLITE_BUILTINS,
             tf.lite.OpsSet.SELECT_TF_OPS
         ]
-        red_converter._experimental_lower_tensor_list_ops = False
-        red_tflite = red_converter.convert()
+        converter._experimental_lower_tensor_list_ops = False
+        return converter.convert()
+    
+    def _convert_builtin(
+        self,
+        model: tf.keras.Model,
+        variant: str,
+        representative_windows: Optional[np.ndarray]
+    ) -> bytes:
+        """仅使用内置算子导出（builtin / int8）"""
+        if variant not in TFLITE_VARIANTS:
+            raise ValueError(f"不支持的导出方式: {variant}")
         
-        red_tflite_path = output_path / "lottery_lstm_red.tflite"
-        with open(red_tflite_path, 'wb') as f:
-            f.write(red_tflite)
+        # 固定批次为 1 的具体函数，转换器才能把 Keras LSTM 融合为内置 LSTM 算子
+        input_spec = tf.TensorSpec([1, *model.input_shape[1:]], tf.float32)
+        run_model = tf.function(lambda x: model(x, training=False))
+        concrete_func = run_model.get_concrete_function(input_spec)
         
-        # 转换蓝球模型
-        print("转换蓝球模型为 TFLite...")
-        blue_converter = tf.lite.TFLiteConverter.from_keras_model(self.blue_model)
-        blue_converter.optimizations = [tf.lite.Optimize.DEFAULT]
-        blue_converter.target_spec.supported_types = [tf.float16]
-        # 兼容LSTM：启用Select TF Ops并禁用tensor_list_ops降级
-        blue_converter.target_spec.supported_ops = [
-            tf.lite.OpsSet.TFLITE_BUILTINS,
-            tf.lite.OpsSet.SELECT_TF_OPS
+        converter = tf.lite.TFLiteConverter.from_concrete_functions([concrete_func], model)
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        
+        if variant == 'builtin':
+            converter.target_spec.supported_types = [tf.float16]
+            converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS]
+        else:
+            if representative_windows is None or len(representative_windows) == 0:
+                raise ValueError("int8 量化需要代表性数据集")
+            
+            def representative_dataset():
+                for window in representative_windows:
+                    yield [np.asarray(window, dtype=np.float32)[np.newaxis]]
+            
+            converter.representative_dataset = representative_dataset
+            converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        
+        return converter.convert()
+    
+    def convert_model_to_tflite(self, color: str, output_dir: str) -> str:
+        """将单个颜色的模型转换为 TensorFlow Lite 格式"""
+        output_path = Path(output_dir)
+        output_path.mkdir(parents=True, exist_ok=True)
+        
+        tflite_model = self._convert_keras_model(self.get_model(color))
+        
+        tflite_path = output_path / tflite_file_name(color, self.time_order)
+        with open(tflite_path, 'wb') as f:
+            f.write(tflite_model)
+        
+        return str(tflite_path)
+    
+    def export_variants(
+        self,
+        history_data: List[dict],
+        output_dir: str,
+        variants: List[str],
+        calibration_samples: int = 200,
+        latency_runs: int = 100
+    ) -> dict:
+        """
+        导出多种 TFLite 变体，并与当前默认导出 (select_ops) 对比
+        
+        按时间顺序划分窗口：前 85% 抽样作为 int8 校准数据，后 15% 作为评估数据。
+        对比项：文件大小、与 Keras 输出的平均误差、top-k 一致率、top-k 命中数、单次推理延迟
+        
+        Returns:
+            对比报告，同时写入 output_dir/export_report.json
+        """
+        from tflite_utils import load_interpreter, measure_latency, run_batch, top_k_agreement, top_k_indices
+        
+        if self.architecture != 'separate':
+            raise ValueError("多头模型暂不支持变体导出对比")
+        
+        output_path = Path(output_dir)
+        output_path.mkdir(parents=True, exist_ok=True)
+        variants = ['select_ops'] + [v for v in variants if v != 'select_ops']
+        report = {'baseline': 'select_ops', 'models': {}}
+        
+        for color in ('red', 'blue'):
+            model = self.get_model(color)
+            matrix = encode_draws(history_data, color, self.num_classes(color))
+            X, y = sliding_windows(matrix, self.sequence_length)
+            split_at = int(len(X) * 0.85)
+            calibration = X[:split_at] if split_at > 0 else X
+            eval_X, eval_y = (X[split_at:], y[split_at:]) if split_at < len(X) else (X, y)
+            
+            sample_idx = np.linspace(0, len(calibration) - 1, min(calibration_samples, len(calibration))).astype(int)
+            representative = calibration[sample_idx]
+            
+            keras_probs = model.predict(eval_X, batch_size=256, verbose=0)
+            k = max(1, int(round(float(eval_y.sum(axis=1).mean())))) if len(eval_y) else 1
+            
+            results = {}
+            for variant in variants:
+                print(f"\n导出{COLOR_NAMES[color]}模型 ({variant})...")
+                try:
+                    tflite_model = self._convert_keras_model(model, variant, representative)
+                except Exception as e:
+                    print(f"  ❌ 导出失败: {e}")
+                    results[variant] = {'error': f"{type(e).__name__}: {e}"}
+                    continue
+                
+                suffix = '' if variant == 'select_ops' else f'_{variant}'
+                tflite_path = output_path / tflite_file_name(color, self.time_order, suffix)
+                with open(tflite_path, 'wb') as f:
+                    f.write(tflite_model)
+                
+                interpreter = load_interpreter(model_path=str(tflite_path), num_threads=4)
+                probs = run_batch(interpreter, eval_X)
+                timings = measure_latency(interpreter, X[-1:], runs=latency_runs)
+                
+                hits = 0.0
+                if len(eval_y):
+                    top = top_k_indices(probs, k)
+                    hits = float(np.take_along_axis(eval_y, top, axis=1).sum(axis=1).mean())
+                
+                results[variant] = {
+                    'path': str(tflite_path),
+                    'size_kb': tflite_path.stat().st_size / 1024,
+                    'mean_abs_diff_vs_keras': float(np.abs(probs - keras_probs).mean()) if len(probs) else 0.0,
+                    'top_k_agreement_vs_keras': top_k_agreement(keras_probs, probs, k),
+                    'top_k_hits': hits,
+                    'latency_p50_ms': float(np.percentile(timings, 50)),
+                    'latency_p95_ms': float(np.percentile(timings, 95))
+                }
+            
+            baseline = results.get('select_ops', {})
+            for variant, metrics in results.items():
+                if 'error' in metrics or 'error' in baseline or not baseline:
+                    continue
+                metrics['size_ratio'] = metrics['size_kb'] / baseline['size_kb']
+                metrics['top_k_hits_delta'] = metrics['top_k_hits'] - baseline['top_k_hits']
+                metrics['latency_p50_delta_ms'] = metrics['latency_p50_ms'] - baseline['latency_p50_ms']
+            
+            report['models'][color] = {
+                'top_k': k,
+                'eval_windows': int(len(eval_X)),
+                'variants': results
+            }
+        
+        print("\n" + "="*72)
+        print("📊 TFLite 导出对比 (基准: select_ops)")
+        print("="*72)
+        print(f"{'模型':<6}{'方式':<12}{'大小KB':>9}{'大小比':>8}{'误差':>9}{'top-k一致':>10}{'命中Δ':>8}{'p50 ms':>9}")
+        print("-"*72)
+        for color, entry in report['models'].items():
+            for variant, m in entry['variants'].items():
+                if 'error' in m:
+                    print(f"{color:<6}{variant:<12}  ❌ {m['error'][:48]}")
+                    continue
+                print(f"{color:<6}{variant:<12}{m['size_kb']:>9.1f}{m.get('size_ratio', 1.0):>8.2f}"
+                      f"{m['mean_abs_diff_vs_keras']:>9.4f}{m['top_k_agreement_vs_keras']:>10.2%}"
+                      f"{m.get('top_k_hits_delta', 0.0):>+8.3f}{m['latency_p50_ms']:>9.3f}")
+        
+        report_path = output_path / "export_report.json"
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n✅ 对比报告已保存: {report_path}")
+        
+        return report
+    
+    def _model_matrices(self, history_data) -> List[Tuple[str, tf.keras.Model, np.ndarray]]:
+        """(模型键, 模型, one-hot 矩阵)，分开模型为 red / blue，多头模型为 multi"""
+        if self.architecture == 'multi_head':
+            return [('multi', self.model, self.encode_combined(history_data))]
+        return [
+            (color, self.get_model(color), encode_draws(history_data, color, self.num_classes(color)))
+            for color in ('red', 'blue')
         ]
-        blue_converter._experimental_lower_tensor_list_ops = False
-        blue_tflite = blue_converter.convert()
+    
+    def distill(
+        self,
+        history_data,
+        student_type: str = 'gru',
+        units: int = 32,
+        epochs: int = 60,
+        batch_size: int = 32,
+        validation_split: float = 0.15,
+        alpha: float = 0.2
+    ) -> Dict[str, tf.keras.Model]:
+        """
+        用训练好的模型（教师）蒸馏小模型（学生）
+        
+        学生的目标为 alpha * 真实开奖 + (1 - alpha) * 教师输出的各号码概率，
+        二元交叉熵对目标是线性的，等价于两项 loss 按 alpha 加权。
+        验证集与训练时一样取时间上最后的窗口
+        
+        Args:
+            history_data: 历史开奖数据
+            student_type: 学生模型类型，见 STUDENT_TYPES
+            units: 学生模型 GRU 单元数 / 卷积核数
+            alpha: 真实开奖在目标中的权重，0 为纯软目标
+        
+        Returns:
+            各模型键对应的学生模型，同时保存在 self.students
+        """
+        self.students = {}
+        self.student_type = student_type
+        for key, teacher, matrix in self._model_matrices(history_data):
+            X, y = sliding_windows(matrix, self.sequence_length)
+            soft = teacher.predict(X, batch_size=256, verbose=0)
+            if key == 'multi':
+                soft = self._join_heads(soft)
+            targets = (alpha * y + (1.0 - alpha) * soft).astype(np.float32)
+            split = self._split_targets if key == 'multi' else (lambda values: values)
+            
+            student = self._build_student(key, student_type, units)
+            print("\n" + "="*50)
+            print(f"蒸馏 {key} 学生模型 ({student_type}, {units} 单元): "
+                  f"参数量 {student.count_params():,} / 教师 {teacher.count_params():,}")
+            print("="*50)
+            
+            callbacks = self.profiler.epoch_callbacks(f"distill_fit:{key}")
+            callbacks.append(self._throughput_callback(f"student:{key}", self._num_train_windows(len(matrix), validation_split)))
+            with self.profiler.stage(f"distill_fit:{key}"):
+                history = student.fit(
+                    X, split(targets),
+                    epochs=epochs,
+                    batch_size=batch_size,
+                    validation_split=validation_split,
+                    callbacks=self._callbacks() + callbacks,
+                    verbose=1
+                )
+            self._report_throughput(f"student:{key}")
+            self._record_val_loss(f"student:{key}", history)
+            self.students[key] = student
+        return self.students
+    
+    def _tflite_heads(self, interpreter, key: str, X: np.ndarray) -> Dict[str, np.ndarray]:
+        """TFLite 批量推理，返回各颜色的概率；多头模型按签名中的输出名称取输出"""
+        from tflite_utils import run_batch
+        
+        if key != 'multi':
+            return {key: run_batch(interpreter, X)}
+        
+        runner = interpreter.get_signature_runner()
+        try:
+            outputs = runner(**{MULTI_HEAD_INPUT: X.astype(np.float32)})
+        except (ValueError, RuntimeError):
+            # 批次维固定的模型逐条推理
+            rows = [runner(**{MULTI_HEAD_INPUT: row[np.newaxis].astype(np.float32)}) for row in X]
+            outputs = {name: np.concatenate([row[name] for row in rows]) for name in MULTI_HEAD_OUTPUTS.values()}
+        return {color: np.asarray(outputs[name], dtype=np.float32) for color, name in MULTI_HEAD_OUTPUTS.items()}
+    
+    def export_students(
+        self,
+        history_data,
+        output_dir: str,
+        validation_split: float = 0.15,
+        latency_runs: int = 100
+    ) -> dict:
+        """
+        导出蒸馏后的学生模型，并与教师模型的 TFLite 对比（先调用 distill 和 convert_to_tflite）
+        
+        学生模型与教师模型的输入/输出签名相同，文件名加 _student 后缀，
+        如 lottery_lstm_red_student.tflite、lottery_lstm_multi_student.tflite（见 tflite_file_name）。
+        在验证窗口上对比：文件大小、参数量、单条推理延迟（1 线程和 4 线程）、
+        与教师 top-k 号码的一致率、top-k 命中数
+        
+        Returns:
+            对比报告，同时写入 output_dir/distill_report.json
+        """
+        from tflite_utils import load_interpreter, measure_latency, top_k_agreement, top_k_indices
+        
+        if not self.students:
+            raise ValueError("没有学生模型，请先调用 distill()")
+        
+        output_path = Path(output_dir)
+        output_path.mkdir(parents=True, exist_ok=True)
+        report = {'student_type': self.student_type, 'models': {}}
+        
+        for key, teacher, matrix in self._model_matrices(history_data):
+            student = self.students[key]
+            X, y = sliding_windows(matrix, self.sequence_length)
+            split_at = int(len(X) * (1.0 - validation_split))
+            eval_X, eval_y = (X[split_at:], y[split_at:]) if split_at < len(X) else (X, y)
+            if key == 'multi':
+                eval_y = self._split_targets(eval_y)
+                eval_y = {color: eval_y[name] for color, name in MULTI_HEAD_OUTPUTS.items()}
+            else:
+                eval_y = {key: eval_y}
+            
+            teacher_path = output_path / tflite_file_name(key, self.time_order)
+            if not teacher_path.exists():
+                with open(teacher_path, 'wb') as f:
+                    f.write(self._convert_keras_model(teacher))
+            
+            print(f"\n导出 {key} 学生模型...")
+            student_path = output_path / tflite_file_name(key, self.time_order, '_student')
+            with open(student_path, 'wb') as f:
+                f.write(self._convert_keras_model(student))
+            
+            entry = {'eval_windows': int(len(eval_X)), 'heads': {}}
+            probs = {}
+            for role, model, path in (('teacher', teacher, teacher_path), ('student', student, student_path)):
+                latency = {}
+                for threads in DISTILL_LATENCY_THREADS:
+                    interpreter = load_interpreter(model_path=str(path), num_threads=threads)
+                    timings = measure_latency(interpreter, X[-1:], runs=latency_runs)
+                    latency[str(threads)] = {
+                        'p50_ms': float(np.percentile(timings, 50)),
+                        'p95_ms': float(np.percentile(timings, 95))
+                    }
+                probs[role] = self._tflite_heads(interpreter, key, eval_X)
+                entry[role] = {
+                    'path': str(path),
+                    'size_kb': path.stat().st_size / 1024,
+                    'params': int(model.count_params()),
+                    'latency': latency
+                }
+            entry['size_ratio'] = entry['student']['size_kb'] / entry['teacher']['size_kb']
+            
+            for color, actual in eval_y.items():
+                k = max(1, int(round(float(actual.sum(axis=1).mean())))) if len(actual) else 1
+                teacher_probs, student_probs = probs['teacher'][color], probs['student'][color]
+                
+                def hits(values: np.ndarray) -> float:
+                    if not len(actual):
+                        return 0.0
+                    return float(np.take_along_axis(actual, top_k_indices(values, k), axis=1).sum(axis=1).mean())
+                
+                entry['heads'][color] = {
+                    'top_k': k,
+                    'top_k_agreement': top_k_agreement(teacher_probs, student_probs, k),
+                    'mean_abs_diff': float(np.abs(teacher_probs - student_probs).mean()) if len(eval_X) else 0.0,
+                    'teacher_top_k_hits': hits(teacher_probs),
+                    'student_top_k_hits': hits(student_probs)
+                }
+            report['models'][key] = entry
+        
+        threads = DISTILL_LATENCY_THREADS
+        print("\n" + "="*78)
+        print(f"📊 蒸馏对比 (学生: {self.student_type})")
+        print("="*78)
+        print(f"{'模型':<7}{'角色':<9}{'大小KB':>9}{'参数量':>10}"
+              + ''.join(f"{f'p50@{n}线程':>12}" for n in threads))
+        print("-"*78)
+        for key, entry in report['models'].items():
+            for role in ('teacher', 'student'):
+                m = entry[role]
+                print(f"{key:<7}{role:<9}{m['size_kb']:>9.1f}{m['params']:>10,}"
+                      + ''.join(f"{m['latency'][str(n)]['p50_ms']:>10.3f}ms" for n in threads))
+            for color, h in entry['heads'].items():
+                print(f"  └ {COLOR_NAMES[color]} top-{h['top_k']} 一致率 {h['top_k_agreement']:.2%}, "
+                      f"命中 教师 {h['teacher_top_k_hits']:.3f} / 学生 {h['student_top_k_hits']:.3f}")
+        
+        report_path = output_path / "distill_report.json"
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n✅ 蒸馏报告已保存: {report_path}")
+        
+        return report
+    
+    def _state_sizes(self) -> Dict[str, int]:
+        """单步模型各状态的维度"""
+        return dict(zip(STEP_STATE_NAMES, (self.lstm_units_1, self.lstm_units_1, self.lstm_units_2, self.lstm_units_2)))
+    
+    def build_step_model(self, key: str) -> tf.keras.Model:
+        """
+        构建与已训练模型共享权重的单步模型
+        
+        两层 LSTM 换成权重相同的 LSTMCell，h/c 状态作为显式输入和输出，输出头直接复用原模型的层。
+        从全零状态开始按窗口位置 0..sequence_length-1 依次输入，最后一步的概率与窗口模型一致
+        
+        Args:
+            key: red / blue（分开模型）或 multi（多头模型）
+        """
+        if key == 'multi':
+            model, prefix = self.model, 'shared'
+            input_dim = self.num_red_balls + self.num_blue_balls
+            heads = {name: (f"{color}_dense", name) for color, name in MULTI_HEAD_OUTPUTS.items()}
+        else:
+            model, prefix = self.get_model(key), f"{key}_lstm"
+            input_dim = self.num_classes(key)
+            heads = {f"{prefix}_output": (f"{prefix}_dense", f"{prefix}_output")}
+        
+        draw = tf.keras.layers.Input(shape=(input_dim,), name=STEP_INPUT)
+        states = {
+            name: tf.keras.layers.Input(shape=(units,), name=name)
+            for name, units in self._state_sizes().items()
+        }
+        
+        outputs = {}
+        x = draw
+        for index, units in ((1, self.lstm_units_1), (2, self.lstm_units_2)):
+            cell = tf.keras.layers.LSTMCell(units, name=f"{prefix}_lstm{index}_cell")
+            x, (h, c) = cell(x, [states[f"lstm{index}_h"], states[f"lstm{index}_c"]])
+            # LSTMCell 与 LSTM 层的权重均为 [kernel, recurrent_kernel, bias]
+            cell.set_weights(model.get_layer(f"{prefix}_lstm{index}").get_weights())
+            outputs[f"lstm{index}_h_out"] = h
+            outputs[f"lstm{index}_c_out"] = c
+        
+        for name, (dense_name, output_name) in heads.items():
+            outputs[name] = model.get_layer(output_name)(model.get_layer(dense_name)(x))
+        
+        return tf.keras.Model(inputs=[draw, *states.values()], outputs=outputs, name=f"{key}_step")
+    
+    def _heads(self, key: str, outputs) -> Dict[str, np.ndarray]:
+        """模型输出转换为各颜色的概率（单步模型的输出为字典）"""
+        if key != 'multi':
+            if isinstance(outputs, dict):
+                outputs = outputs[f"{key}_lstm_output"]
+            return {key: np.asarray(outputs, dtype=np.float32)}
+        if isinstance(outputs, dict):
+            return {color: np.asarray(outputs[name], dtype=np.float32) for color, name in MULTI_HEAD_OUTPUTS.items()}
+        joined = self._join_heads(outputs)
+        return {'red': joined[:, :self.num_red_balls], 'blue': joined[:, self.num_red_balls:]}
+    
+    def replay_steps(self, step_fn, windows: np.ndarray) -> Dict:
+        """
+        从全零状态开始，按窗口位置依次调用单步模型
+        
+        Args:
+            step_fn: 输入 {STEP_INPUT: (n, input_dim), 状态名: (n, units)}，返回输出字典
+            windows: (n, sequence_length, input_dim) 窗口
+        
+        Returns:
+            最后一步的输出字典
+        """
+        feeds = {name: np.zeros((len(windows), units), dtype=np.float32) for name, units in self._state_sizes().items()}
+        outputs = {}
+        for t in range(windows.shape[1]):
+            outputs = step_fn({STEP_INPUT: np.ascontiguousarray(windows[:, t], dtype=np.float32), **feeds})
+            feeds = {name: np.asarray(outputs[f"{name}_out"], dtype=np.float32) for name in STEP_STATE_NAMES}
+        return outputs
+    
+    def export_step_models(
+        self,
+        history_data,
+        output_dir: str,
+        validation_split: float = 0.15,
+        tolerance: float = 1e-4,
+        max_windows: int = 256,
+        latency_runs: int = 200
+    ) -> dict:
+        """
+        导出单步（有状态）TFLite 模型并检查与窗口模型的一致性（先调用 convert_to_tflite）
+        
+        只支持 time_order='oldest_first' 的模型：窗口最后一步为最新一期，状态可以按时间顺序逐期推进。
+        文件名为 lottery_lstm_{red,blue,multi}_oldest_first_step.tflite。在验证窗口（最多 max_windows 个）上检查:
+            replay:  从零状态逐步回放窗口，Keras / TFLite 单步模型与对应的窗口模型对比
+            ring:    按时间顺序逐期输入 StepRing（每期一次批次为 sequence_length 的推理，
+                     计算量与窗口模型相同），每期的输出与窗口模型对最近窗口的输出对比
+        以上误差超过 tolerance 判为不一致。另外报告只延续一个状态（carried，每期批次 1 的一步，
+        唯一比窗口模型省计算的方式）与窗口模型的差异：状态从历史第一期开始累积，
+        包含窗口之外的开奖，不要求一致
+        
+        Returns:
+            报告，passed 为是否全部一致，同时写入 output_dir/step_export_report.json
+        """
+        from tflite_utils import load_interpreter, top_k_agreement
+        
+        if self.time_order != 'oldest_first':
+            raise ValueError("单步导出需要按时间顺序 (oldest_first) 训练的模型，"
+                             "newest_first 窗口中新开奖是第一步，之前的状态无法复用")
+        
+        output_path = Path(output_dir)
+        output_path.mkdir(parents=True, exist_ok=True)
+        report = {
+            'input': STEP_INPUT,
+            'states': self._state_sizes(),
+            'sequence_length': self.sequence_length,
+            'time_order': self.time_order,
+            'tolerance': tolerance,
+            'models': {}
+        }
+        
+        def max_diff(a: Dict[str, np.ndarray], b: Dict[str, np.ndarray]) -> float:
+            return max((float(np.abs(a[color] - b[color]).max()) for color in a if a[color].size), default=0.0)
+        
+        def timed(fn) -> float:
+            timings = []
+            for i in range(latency_runs + 10):
+                start = time.perf_counter()
+                fn()
+                if i >= 10:
+                    timings.append((time.perf_counter() - start) * 1000)
+            return float(np.percentile(timings, 50))
+        
+        for key, model, matrix in self._model_matrices(history_data):
+            X, _ = sliding_windows(matrix, self.sequence_length)
+            split_at = int(len(X) * (1.0 - validation_split))
+            first = max(split_at if split_at < len(X) else 0, len(X) - max_windows, 0)
+            eval_X = np.ascontiguousarray(X[first:], dtype=np.float32)
+            
+            step_model = self.build_step_model(key)
+            print(f"\n导出 {key} 单步模型...")
+            step_path = output_path / tflite_file_name(key, self.time_order, '_step')
+            with open(step_path, 'wb') as f:
+                f.write(self._convert_keras_model(step_model))
+            window_path = output_path / tflite_file_name(key, self.time_order)
+            if not window_path.exists():
+                with open(window_path, 'wb') as f:
+                    f.write(self._convert_keras_model(model))
+            
+            window_interpreter = load_interpreter(model_path=str(window_path), num_threads=4)
+            runner = load_interpreter(model_path=str(step_path), num_threads=4).get_signature_runner()
+            keras_step = lambda feeds: step_model(feeds, training=False)
+            tflite_step = lambda feeds: runner(**feeds)
+            
+            keras_window = self._heads(key, model.predict(eval_X, batch_size=256, verbose=0))
+            tflite_window = self._tflite_heads(window_interpreter, key, eval_X)
+            
+            # 窗口 first + i 的最后一期为第 first + i + sequence_length - 1 行
+            draws = np.asarray(matrix[first:first + len(eval_X) + self.sequence_length - 1], dtype=np.float32)
+            
+            def stream_ring(step_fn) -> Dict[str, np.ndarray]:
+                ring = StepRing(step_fn, self._state_sizes(), self.sequence_length)
+                outputs = [ring.update(draw) for draw in draws]
+                outputs = [self._heads(key, item) for item in outputs if item is not None]
+                return {color: np.concatenate([item[color] for item in outputs]) for color in outputs[0]}
+            
+            # 单个状态从历史第一期一直延续
+            feeds = {name: np.zeros((1, units), dtype=np.float32) for name, units in self._state_sizes().items()}
+            carried = []
+            for row, draw in enumerate(np.asarray(matrix[:first + len(eval_X) + self.sequence_length - 1], dtype=np.float32)):
+                outputs = runner(**{STEP_INPUT: draw[np.newaxis], **feeds})
+                feeds = {name: np.array(outputs[f"{name}_out"], dtype=np.float32) for name in STEP_STATE_NAMES}
+                if row >= first + self.sequence_length - 1:
+                    carried.append(self._heads(key, outputs))
+            carried = {color: np.concatenate([item[color] for item in carried]) for color in carried[0]}
+            
+            ring_feeds = {name: np.zeros((self.sequence_length, units), dtype=np.float32)
+                          for name, units in self._state_sizes().items()}
+            ring_feeds[STEP_INPUT] = np.repeat(draws[-1:], self.sequence_length, axis=0)
+            single_feeds = {name: values[:1] for name, values in ring_feeds.items()}
+            
+            entry = {
+                'path': str(step_path),
+                'size_kb': step_path.stat().st_size / 1024,
+                'eval_windows': int(len(eval_X)),
+                'replay_keras_max_abs_diff': max_diff(keras_window, self._heads(key, self.replay_steps(keras_step, eval_X))),
+                'replay_tflite_max_abs_diff': max_diff(tflite_window, self._heads(key, self.replay_steps(tflite_step, eval_X))),
+                'ring_keras_max_abs_diff': max_diff(keras_window, stream_ring(keras_step)),
+                'ring_tflite_max_abs_diff': max_diff(tflite_window, stream_ring(tflite_step)),
+                'carried_max_abs_diff': max_diff(tflite_window, carried),
+                'carried_top_k_agreement': {
+                    color: top_k_agreement(tflite_window[color], carried[color], 5) for color in carried
+                },
+                'window_p50_ms': timed(lambda: self._tflite_heads(window_interpreter, key, eval_X[-1:])),
+                'ring_update_p50_ms': timed(lambda: runner(**ring_feeds)),
+                'carried_update_p50_ms': timed(lambda: runner(**single_feeds))
+            }
+            diffs = [entry[name] for name in entry if name.startswith(('replay_', 'ring_')) and name.endswith('diff')]
+            entry['passed'] = max(diffs) <= tolerance
+            report['models'][key] = entry
+            print(f"  {'✅' if entry['passed'] else '❌'} 一致性 ({len(eval_X)} 个窗口): "
+                  f"回放 Keras {entry['replay_keras_max_abs_diff']:.2e} / TFLite {entry['replay_tflite_max_abs_diff']:.2e}, "
+                  f"StepRing Keras {entry['ring_keras_max_abs_diff']:.2e} / TFLite {entry['ring_tflite_max_abs_diff']:.2e}")
+            print(f"  延续单个状态: 与窗口模型最大误差 {entry['carried_max_abs_diff']:.3f}, "
+                  f"top-5 一致率 {', '.join(f'{c} {v:.1%}' for c, v in entry['carried_top_k_agreement'].items())}")
+            print(f"  每期 p50: 窗口模型 {entry['window_p50_ms']:.3f} ms, "
+                  f"StepRing {entry['ring_update_p50_ms']:.3f} ms, 延续单个状态 {entry['carried_update_p50_ms']:.3f} ms")
+        
+        report['passed'] = all(entry['passed'] for entry in report['models'].values())
+        report_path = output_path / "step_export_report.json"
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n✅ 单步导出报告已保存: {report_path}")
+        
+        return report
+    
+    def convert_to_tflite(self, output_dir: str):
+        """转换为 TensorFlow Lite 格式"""
+        if self.architecture == 'multi_head':
+            # 单个 TFLite 模型，两个输出张量
+            output_path = Path(output_dir)
+            output_path.mkdir(parents=True, exist_ok=True)
+            
+            print("\n转换多头模型为 TFLite...")
+            tflite_path = output_path / tflite_file_name('multi', self.time_order)
+            with open(tflite_path, 'wb') as f:
+                f.write(self._convert_keras_model(self.model))
+            
+            print(f"\n✅ TFLite 多头模型已保存: {tflite_path} ({tflite_path.stat().st_size / 1024:.2f} KB)")
+            return str(tflite_path)
         
-        blue_tflite_path = output_path / "lottery_lstm_blue.tflite"
-        with open(blue_tflite_path, 'wb') as f:
-            f.write(blue_tflite)
+        print("\n转换红球模型为 TFLite...")
+        red_tflite_path = Path(self.convert_model_to_tflite('red', output_dir))
+        
+        print("转换蓝球模型为 TFLite...")
+        blue_tflite_path = Path(self.convert_model_to_tflite('blue', output_dir))
         
         print(f"\n✅ TFLite 模型已保存:")
         print(f"   红球: {red_tflite_path} ({red_tflite_path.stat().st_size / 1024:.2f} KB)")
@@ -293,20 +1566,6 @@ class LotteryLSTMModel:
         return str(red_tflite_path), str(blue_tflite_path)
 
 
-def load_history_from_json(file_path: str) -> List[dict]:
-    """从 JSON 文件加载历史数据"""
-    with open(file_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    # 假设 JSON 格式为: {"data": [{"red": [...], "blue": [...]}, ...]}
-    if isinstance(data, dict) and 'data' in data:
-        return data['data']
-    elif isinstance(data, list):
-        return data
-    else:
-        raise ValueError("不支持的 JSON 格式")
-
-
 def generate_sample_data(num_samples: int = 200) -> List[dict]:
     """生成示例数据（用于测试）"""
     print(f"⚠️  使用随机生成的示例数据 ({num_samples} 期)")
@@ -321,26 +1580,435 @@ def generate_sample_data(num_samples: int = 200) -> List[dict]:
     return data
 
 
+def draw_issues(history_data) -> Optional[List[str]]:
+    """各期期号（与数据顺序一致），数据没有期号（如张量缓存）时返回 None"""
+    if isinstance(history_data, list):
+        if history_data and all(item.get('issue') for item in history_data):
+            return [str(item['issue']) for item in history_data]
+        return None
+    # history_binary.HistoryArchive
+    header = getattr(history_data, 'header', None)
+    if header and header.get('has_issue'):
+        # 与列表一致：缺少期号的记录（期号列为空）视为整体没有期号
+        issues = [issue.decode('utf-8') for issue in history_data.issues]
+        return issues if issues and all(issues) else None
+    return None
+
+
+def load_training_meta(model_dir: str) -> Optional[Dict]:
+    """读取训练元数据，不存在或无法解析时返回 None"""
+    try:
+        with open(Path(model_dir) / TRAINING_META_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def check_resume_meta(meta: Optional[Dict], model_config: Dict) -> List[str]:
+    """检查已保存的模型能否继续训练，返回问题列表"""
+    if meta is None:
+        return [f"没有 {TRAINING_META_FILE}"]
+    if meta.get('version') != TRAINING_META_VERSION:
+        return [f"训练元数据版本 {meta.get('version')} 不受支持"]
+    problems = [
+        f"{key}: 已保存 {meta.get(key)}, 当前 {value}"
+        for key, value in model_config.items() if meta.get(key, META_DEFAULTS.get(key)) != value
+    ]
+    if not meta.get('last_issue'):
+        problems.append("训练元数据中没有期号（训练时使用了张量缓存或数据没有期号）")
+    return problems
+
+
+def resume_from_checkpoint(args, history_data, config: Dict, profiler: StageProfiler) -> Tuple[Optional[LotteryLSTMModel], Dict]:
+    """
+    加载 args.resume_from 中的模型，只在新开奖期的窗口和回放样本上继续训练
+
+    Returns:
+        (model, result)，result['status'] 不为 resumed 时 model 不应保存
+    """
+    model = LotteryLSTMModel(
+        num_red_balls=config['red'],
+        num_blue_balls=config['blue'],
+        sequence_length=args.sequence_length,
+        architecture=args.architecture,
+        profiler=profiler,
+        learning_rate=args.learning_rate,
+        time_order=args.time_order
+    )
+    meta = load_training_meta(args.resume_from)
+    problems = check_resume_meta(meta, model.model_config())
+    if problems:
+        return None, {'status': 'incompatible', 'reason': '; '.join(problems)}
+
+    finetune_lr = args.finetune_lr or args.learning_rate * 0.1
+    print(f"\n📂 加载已有模型: {args.resume_from} (训练到第 {meta['last_issue']} 期, 学习率 {finetune_lr:g})")
+    with profiler.stage('resume:load_models'):
+        model.load_models(args.resume_from, finetune_lr)
+
+    result = model.resume_training(
+        history_data,
+        meta['last_issue'],
+        epochs=args.finetune_epochs,
+        batch_size=args.batch_size,
+        replay_ratio=args.replay_ratio,
+        min_replay=args.min_replay,
+        tolerance=args.resume_tolerance
+    )
+    result['resumed_from'] = meta['last_issue']
+    return model, result
+
+
+def count_parameters(
+    input_dim: int,
+    output_dims: List[int],
+    lstm_units_1: int = 128,
+    lstm_units_2: int = 64,
+    dense_units: int = 32
+) -> int:
+    """
+    不构建模型计算参数量（与 _build_model / _build_multi_head_model 的结构一致）
+    
+    output_dims 有多个元素时为共享主干的多头模型
+    """
+    def lstm(inputs: int, units: int) -> int:
+        return 4 * ((inputs + units) * units + units)
+    
+    def dense(inputs: int, units: int) -> int:
+        return inputs * units + units
+    
+    backbone = lstm(input_dim, lstm_units_1) + lstm(lstm_units_1, lstm_units_2)
+    heads = sum(dense(lstm_units_2, dense_units) + dense(dense_units, dim) for dim in output_dims)
+    return backbone + heads
+
+
+def _raw_number_check(history_data, field: str, num_classes: int) -> Optional[Dict]:
+    """检查原始号码范围，数据不是开奖字典列表（如缓存）时返回 None"""
+    if not isinstance(history_data, list):
+        return None
+    numbers = [int(num) for item in history_data for num in item[field]]
+    return {
+        # 号码 0 映射到第 -1 列，即最后一列
+        'zero': sum(1 for num in numbers if num == 0),
+        'negative': sum(1 for num in numbers if num < 0),
+        'too_large': sum(1 for num in numbers if num > num_classes)
+    }
+
+
+def inspect_history(
+    history_data,
+    num_red_balls: int,
+    num_blue_balls: int,
+    sequence_length: int,
+    validation_split: float
+) -> List[str]:
+    """
+    检查历史数据并打印概况（不依赖 TensorFlow）
+    
+    Returns:
+        发现的问题列表，为空表示可以训练
+    """
+    problems = []
+    num_draws = len(history_data)
+    print(f"\n🔎 数据概况: {num_draws} 期")
+    
+    if isinstance(history_data, list) and history_data and all(item.get('issue') for item in history_data):
+        issues = [str(item['issue']) for item in history_data]
+        duplicates = num_draws - len(set(issues))
+        print(f"  期号: {issues[0]} ... {issues[-1]}"
+              f"（{'最新一期在前' if issue_sort_key(issues[0]) > issue_sort_key(issues[-1]) else '最早一期在前'}）")
+        if duplicates:
+            problems.append(f"存在 {duplicates} 个重复期号")
+    
+    for color, num_classes in (('red', num_red_balls), ('blue', num_blue_balls)):
+        check = _raw_number_check(history_data, color, num_classes)
+        if check is not None:
+            if check['too_large'] or check['negative']:
+                problems.append(f"{COLOR_NAMES[color]}有 {check['too_large'] + check['negative']} "
+                                f"个号码超出 1..{num_classes}")
+                continue
+            if check['zero']:
+                print(f"  ⚠️  {COLOR_NAMES[color]}中有 {check['zero']} 个号码 0，将编码到最后一列")
+        
+        matrix = encode_draws(history_data, color, num_classes, dtype=np.uint8)
+        per_draw = matrix.sum(axis=1)
+        never_drawn = np.flatnonzero(matrix.sum(axis=0) == 0) + 1
+        print(f"  {COLOR_NAMES[color]}: 每期号码数 最少 {per_draw.min() if num_draws else 0} / "
+              f"中位 {int(np.median(per_draw)) if num_draws else 0} / 最多 {per_draw.max() if num_draws else 0}")
+        if len(never_drawn):
+            print(f"    从未出现的号码: {' '.join(f'{n:02d}' for n in never_drawn[:20])}"
+                  f"{' ...' if len(never_drawn) > 20 else ''}")
+        if num_draws and per_draw.min() == 0:
+            problems.append(f"{COLOR_NAMES[color]}有 {(per_draw == 0).sum()} 期没有号码")
+    
+    num_windows = max(num_draws - sequence_length, 0)
+    split_at = int(num_windows * (1.0 - validation_split))
+    print(f"  训练窗口: {split_at}, 验证窗口: {num_windows - split_at} (sequence_length={sequence_length})")
+    
+    num_classes = num_red_balls + num_blue_balls
+    matrix_mb = num_draws * num_classes * 4 / 1024 / 1024
+    windows_mb = num_windows * sequence_length * num_classes * 4 / 1024 / 1024
+    print(f"  内存估算: one-hot 矩阵 {matrix_mb:.2f} MB, 物化窗口 {windows_mb:.2f} MB (float32, 红+蓝)")
+    
+    if num_draws < sequence_length + 10:
+        problems.append(f"数据量不足: 至少需要 {sequence_length + 10} 期")
+    if split_at == 0:
+        problems.append("没有训练窗口")
+    return problems
+
+
+def dry_run(args, history_data, config: Dict) -> List[str]:
+    """
+    不训练、不导入 TensorFlow，检查数据和配置并打印训练计划
+    
+    Returns:
+        发现的问题列表
+    """
+    problems = inspect_history(
+        history_data, config['red'], config['blue'],
+        args.sequence_length, args.validation_split
+    )
+    
+    num_windows = max(len(history_data) - args.sequence_length, 0)
+    split_at = int(num_windows * (1.0 - args.validation_split))
+    batch_size = args.ht_batch_size if args.high_throughput else args.batch_size
+    steps = -(-split_at // max(batch_size, 1))
+    
+    print("\n📝 训练计划:")
+    if args.architecture == 'multi_head':
+        # 与训练相同的数据准备路径
+        matrix = np.concatenate([
+            encode_draws(history_data, 'red', config['red']),
+            encode_draws(history_data, 'blue', config['blue'])
+        ], axis=1)
+        X, y = sliding_windows(matrix, args.sequence_length)
+        params = count_parameters(config['red'] + config['blue'], [config['red'], config['blue']])
+        print(f"  多头模型: X={X.shape}, y={y.shape}, 参数量 {params:,}")
+        outputs = ['lottery_lstm_multi.h5', tflite_file_name('multi', args.time_order)]
+    else:
+        outputs = []
+        for color in ('red', 'blue'):
+            X, y = sliding_windows(encode_draws(history_data, color, config[color]), args.sequence_length)
+            params = count_parameters(config[color], [config[color]])
+            print(f"  {COLOR_NAMES[color]}模型: X={X.shape}, y={y.shape}, 参数量 {params:,}")
+            outputs += [f"lottery_lstm_{color}.h5", tflite_file_name(color, args.time_order)]
+    if args.distill:
+        keys = ['multi'] if args.architecture == 'multi_head' else ['red', 'blue']
+        outputs += [tflite_file_name(key, args.time_order, '_student') for key in keys] + ['distill_report.json']
+    if args.step_export:
+        keys = ['multi'] if args.architecture == 'multi_head' else ['red', 'blue']
+        outputs += [tflite_file_name(key, args.time_order, '_step') for key in keys] + ['step_export_report.json']
+    print(f"  每轮 {steps} 步 (batch_size={batch_size}), 最多 {args.epochs} 轮")
+    print(f"  输出: {', '.join(str(Path(args.output_dir) / name) for name in outputs)}")
+    
+    if importlib.util.find_spec('tensorflow') is None:
+        print("  ⚠️  未安装 TensorFlow，当前环境只能检查数据，无法训练")
+    return problems
+
+
+
+def scaled_learning_rate(base_learning_rate: float, batch_size: int, base_batch_size: int = BASE_BATCH_SIZE) -> float:
+    """按批次大小的平方根放大学习率，不超过 MAX_LEARNING_RATE"""
+    scale = (max(batch_size, 1) / base_batch_size) ** 0.5
+    return min(base_learning_rate * scale, MAX_LEARNING_RATE)
+
+
+def configure_threads(intra_threads: int = 0, inter_threads: int = 0):
+    """
+    设置 TensorFlow CPU 线程数，必须在 TensorFlow 运行时初始化之前调用
+
+    intra_threads 为 0 时使用全部逻辑核，inter_threads 为 0 时使用 2
+    （LSTM 的训练步基本是串行的算子链，inter-op 并行度收益很小）
+    """
+    intra_threads = intra_threads or os.cpu_count() or 1
+    inter_threads = inter_threads or 2
+    configure_tf_threads(intra_threads, inter_threads)
+    print(f"🧵 TensorFlow 线程: intra={intra_threads}, inter={inter_threads}")
+
+
+def benchmark_throughput(
+    history_data,
+    config: Dict,
+    sequence_length: int,
+    architecture: str,
+    candidates: List[Dict],
+    epochs: int = 3,
+    validation_split: float = 0.15,
+    streaming: bool = False
+) -> List[Dict]:
+    """
+    用相同数据对比多组训练配置的吞吐
+    
+    每组配置新建模型训练 epochs 轮（分开模型时只训练红球），
+    线程数在进程内只能设置一次，各组使用相同的线程设置
+    
+    Args:
+        candidates: [{'name', 'batch_size', 'learning_rate', 'jit_compile'}, ...]
+    
+    Returns:
+        每组配置的吞吐结果，speedup 相对第一组
+    """
+    results = []
+    for candidate in candidates:
+        print(f"\n⏱  吞吐测试: {candidate['name']} (batch_size={candidate['batch_size']}, "
+              f"learning_rate={candidate['learning_rate']:.5f}, jit_compile={candidate['jit_compile']})")
+        model = LotteryLSTMModel(
+            num_red_balls=config['red'],
+            num_blue_balls=config['blue'],
+            sequence_length=sequence_length,
+            architecture=architecture,
+            learning_rate=candidate['learning_rate'],
+            jit_compile=candidate['jit_compile']
+        )
+        if architecture == 'multi_head':
+            history = model.train(history_data, epochs, candidate['batch_size'], validation_split, streaming)
+            key = 'multi'
+        else:
+            history = model.train_color(
+                history_data, 'red', epochs, candidate['batch_size'], validation_split, streaming
+            )
+            key = 'red'
+        record = model.throughput[key]
+        val_loss = history.history.get('val_loss') or [None]
+        results.append({
+            **candidate,
+            'samples_per_sec': record.get('samples_per_sec', 0.0),
+            'first_epoch_seconds': record.get('first_epoch_seconds', 0.0),
+            'epoch_seconds': record['epoch_seconds'],
+            'final_val_loss': val_loss[-1]
+        })
+    
+    baseline = results[0]['samples_per_sec'] if results else 0.0
+    for item in results:
+        item['speedup'] = item['samples_per_sec'] / baseline if baseline else 0.0
+    return results
+
+
+def print_throughput(results: List[Dict]):
+    print("\n" + "="*78)
+    print("⚡ 训练吞吐对比")
+    print("="*78)
+    print(f"{'配置':<18}{'batch':>7}{'lr':>10}{'XLA':>6}{'样本/秒':>12}{'首轮(s)':>10}{'加速比':>8}{'val_loss':>10}")
+    print("-"*78)
+    for item in results:
+        val_loss = f"{item['final_val_loss']:.4f}" if item['final_val_loss'] is not None else '-'
+        print(f"{item['name']:<18}{item['batch_size']:>7}{item['learning_rate']:>10.5f}"
+              f"{'是' if item['jit_compile'] else '否':>6}{item['samples_per_sec']:>12.0f}"
+              f"{item['first_epoch_seconds']:>10.2f}{item['speedup']:>7.2f}x{val_loss:>10}")
+    print("-"*78)
+
+
+def print_next_steps(output_dir: str, lottery_type: str, architecture: str, time_order: str):
+    """
+    训练完成后的提示：只复制 LSTMPredictor 加载的窗口模型，并按 App 的资源名（带彩种后缀）重命名
+    
+    oldest_first 的模型与 LSTMPredictor 的输入顺序相反，不给出复制命令
+    """
+    print("\n下一步：")
+    if time_order != 'newest_first':
+        print(f"⚠️  模型按 {time_order} 训练，LSTMPredictor 按最新一期在前输入窗口，不能直接复制到 App；")
+        print("   可用 prediction_server.py / backtest.py 按 training_meta.json 的 time_order 推理")
+        return
+    keys = ['multi'] if architecture == 'multi_head' else ['red', 'blue']
+    print("1. 将 .tflite 文件复制到 Android 项目:")
+    for key in keys:
+        print(f"   cp {Path(output_dir) / tflite_file_name(key)} "
+              f"../app/src/main/assets/lottery_lstm_{key}_{lottery_type}.tflite")
+    print("2. 在 Android 应用中使用 TensorFlow Lite 加载模型")
+    print("3. 运行预测！")
+
+
 def main():
+    start = time.perf_counter()
     parser = argparse.ArgumentParser(description='训练 LSTM 彩票预测模型')
     parser.add_argument('--lottery_type', type=str, default='ssq', help='彩票类型 (ssq, dlt, etc.)')
-    parser.add_argument('--history_file', type=str, default=None, help='历史数据 JSON 文件路径')
+    parser.add_argument('--history_file', type=str, default=None, help='历史数据文件路径（JSON 或 .lhb 二进制）')
     parser.add_argument('--output_dir', type=str, default='models', help='输出目录')
     parser.add_argument('--epochs', type=int, default=80, help='训练轮数（100期数据推荐50-100轮）')
     parser.add_argument('--batch_size', type=int, default=16, help='批次大小（100期数据推荐8-16）')
     parser.add_argument('--sequence_length', type=int, default=8, help='序列长度（100期数据推荐5-10）')
-    parser.add_argument('--validation_split', type=float, default=0.15, help='验证集比例（默认15%）')
+    parser.add_argument('--validation_split', type=float, default=0.15, help='验证集比例（默认15%%）')
+    parser.add_argument('--streaming', action='store_true', help='使用 tf.data 流式生成训练窗口（节省内存）')
+    parser.add_argument('--tflite_variants', type=str, default='',
+                        help='额外导出并对比的 TFLite 方式，逗号分隔 (builtin, int8)')
+    parser.add_argument('--architecture', type=str, default='separate', choices=['separate', 'multi_head'],
+                        help='模型架构：separate 红蓝球两个模型，multi_head 共享主干的单个模型')
+    parser.add_argument('--shuffle_buffer', type=int, default=1024, help='流式模式打乱缓冲区大小')
+    parser.add_argument('--cache_dir', type=str, default=None,
+                        help='训练张量缓存目录，历史数据内容不变时跳过解析和编码')
+    parser.add_argument('--cache_max_mb', type=int, default=2048, help='张量缓存容量上限 (MB)')
+    parser.add_argument('--profile', type=str, default=None,
+                        help='记录各阶段耗时/内存并保存为 JSON（如 profile_train.json）')
+    parser.add_argument('--chrome_trace', type=str, default=None,
+                        help='同时导出 Chrome Trace 文件（chrome://tracing 打开）')
+    parser.add_argument('--mode', type=str, default='train',
+                        choices=['train', 'inspect', 'prepare', 'dry_run', 'benchmark'],
+                        help='train 训练；inspect 检查数据；prepare 写入张量缓存；dry_run 检查配置不训练'
+                             '（这三种不导入 TensorFlow）；benchmark 对比默认配置与高吞吐配置的训练吞吐')
+    parser.add_argument('--high_throughput', action='store_true',
+                        help='高吞吐模式：XLA 编译 + 大批次 + 按批次放大的学习率 + CPU 线程设置')
+    parser.add_argument('--ht_batch_size', type=int, default=256, help='高吞吐模式的批次大小')
+    parser.add_argument('--learning_rate', type=float, default=0.001,
+                        help='基础学习率（高吞吐模式按批次大小的平方根放大）')
+    parser.add_argument('--jit_compile', action='store_true', help='单独开启 XLA 编译')
+    parser.add_argument('--intra_threads', type=int, default=0,
+                        help='TensorFlow intra-op 线程数（0 表示高吞吐模式下使用全部核心，否则保持默认）')
+    parser.add_argument('--inter_threads', type=int, default=0, help='TensorFlow inter-op 线程数')
+    parser.add_argument('--compare_epochs', type=int, default=3, help='benchmark 模式每组配置训练的轮数')
+    parser.add_argument('--resume_from', type=str, default=None,
+                        help='已有模型目录：只在新开奖期的窗口和旧窗口回放样本上继续训练，'
+                             '旧窗口 loss 退化或模型配置不一致时回退为完整训练')
+    parser.add_argument('--finetune_epochs', type=int, default=5, help='继续训练的轮数')
+    parser.add_argument('--finetune_lr', type=float, default=None, help='继续训练的学习率（默认为 learning_rate 的 1/10）')
+    parser.add_argument('--replay_ratio', type=float, default=1.0, help='回放旧窗口数与新窗口数之比')
+    parser.add_argument('--min_replay', type=int, default=64, help='回放旧窗口数下限')
+    parser.add_argument('--resume_tolerance', type=float, default=0.02,
+                        help='继续训练后旧窗口 loss 允许上升的比例，超过则回退为完整训练')
+    parser.add_argument('--distill', action='store_true',
+                        help='训练后蒸馏小模型（*_student.tflite，签名与原模型相同），并对比大小、延迟和 top-k 一致率')
+    parser.add_argument('--student_type', type=str, default='gru', choices=list(STUDENT_TYPES),
+                        help='学生模型类型：gru 单层窄 GRU，conv 单层 1D 卷积')
+    parser.add_argument('--student_units', type=int, default=32, help='学生模型 GRU 单元数 / 卷积核数')
+    parser.add_argument('--distill_epochs', type=int, default=60, help='蒸馏训练轮数')
+    parser.add_argument('--distill_alpha', type=float, default=0.2,
+                        help='蒸馏目标中真实开奖的权重（其余为教师输出的概率）')
+    parser.add_argument('--time_order', type=str, default='newest_first', choices=list(TIME_ORDERS),
+                        help='窗口内的时间顺序：newest_first 与 LSTMPredictor 一致（最新一期在前）；'
+                             'oldest_first 按期号升序训练，窗口输入需最早一期在前，'
+                             'TFLite 文件名加 _oldest_first，不能直接用于 App')
+    parser.add_argument('--step_export', action='store_true',
+                        help='额外导出 h/c 状态为显式输入输出的单步模型（*_step.tflite），'
+                             '并检查逐期推理与窗口模型的一致性（需要 --time_order oldest_first）')
+    parser.add_argument('--step_tolerance', type=float, default=1e-4, help='单步模型与窗口模型输出允许的最大绝对误差')
     
     args = parser.parse_args()
     
+    if args.mode == 'prepare' and not (args.cache_dir and args.history_file):
+        parser.error("--mode prepare 需要 --history_file 和 --cache_dir")
+    if args.resume_from and not (args.mode == 'train' and args.history_file and Path(args.history_file).exists()):
+        parser.error("--resume_from 只用于 train 模式，且需要存在的 --history_file")
+    if args.step_export and args.time_order != 'oldest_first':
+        parser.error("--step_export 需要 --time_order oldest_first（最新一期在前的窗口无法复用之前的状态）")
+    
+    if args.tflite_variants:
+        variants = [item.strip() for item in args.tflite_variants.split(',') if item.strip()]
+        unknown = [v for v in variants if v not in TFLITE_VARIANTS]
+        if unknown:
+            parser.error(f"不支持的导出方式: {', '.join(unknown)}")
+    
     print("="*60)
-    print("🎲 LSTM 彩票预测模型训练")
+    print(f"🎲 LSTM 彩票预测模型训练{'' if args.mode == 'train' else f' ({args.mode})'}")
     print("="*60)
     print(f"彩票类型: {args.lottery_type}")
     print(f"序列长度: {args.sequence_length}")
     print(f"训练轮数: {args.epochs}")
     print(f"批次大小: {args.batch_size}")
     print(f"验证集比例: {args.validation_split * 100:.0f}%")
+    print(f"流式训练: {'是' if args.streaming else '否'}")
+    print(f"模型架构: {args.architecture}")
+    print(f"时间顺序: {args.time_order}")
+    if args.high_throughput:
+        print(f"高吞吐模式: batch_size={args.ht_batch_size}, "
+              f"learning_rate={scaled_learning_rate(args.learning_rate, args.ht_batch_size):.5f}, XLA")
     print("="*60)
     
     # 数据量检查和建议
@@ -351,54 +2019,186 @@ def main():
     if args.history_file:
         print(f"  数据文件: {args.history_file}")
     
-    # 加载历史数据
-    if args.history_file and Path(args.history_file).exists():
-        print(f"从文件加载历史数据: {args.history_file}")
-        history_data = load_history_from_json(args.history_file)
-    else:
-        history_data = generate_sample_data(200)
-    
-    # 根据彩票类型设置球号范围
-    lottery_config = {
-        'ssq': {'red': 33, 'blue': 16},  # 双色球: 红球1-33选6, 蓝球1-16选1
-        'dlt': {'red': 35, 'blue': 12},  # 大乐透: 红球1-35选5, 蓝球1-12选2
-        'qlc': {'red': 30, 'blue': 30},  # 七乐彩: 基本号1-30选7, 特别号1-30选1
-        'fc3d': {'red': 10, 'blue': 10},  # 福彩3D: 百位、十位、个位各0-9
-        'qxc': {'red': 10, 'blue': 15},   # 七星彩: 前6位0-9, 第7位0-14
-        'pl3': {'red': 10, 'blue': 10},   # 排列3: 百位、十位、个位各0-9
-        'pl5': {'red': 10, 'blue': 10},   # 排列5: 5位数字，每位0-9
-        'kl8': {'red': 80, 'blue': 1},    # 快乐8: 1-80选20个号码
-    }
+    config = LOTTERY_CONFIG.get(args.lottery_type, LOTTERY_CONFIG['ssq'])
+    profiler = StageProfiler(
+        enabled=bool(args.profile or args.chrome_trace),
+        name=f"train_lstm_model {args.lottery_type}"
+    )
+    
+    if args.mode == 'inspect' and not (args.history_file and Path(args.history_file).exists()):
+        parser.error("--mode inspect 需要存在的 --history_file")
+    
+    # 加载历史数据（inspect、继续训练和 oldest_first 需要期号等原始字段，不使用缓存）
+    with profiler.stage('load_history'):
+        if args.history_file and Path(args.history_file).exists():
+            print(f"从文件加载历史数据: {args.history_file}")
+            if args.cache_dir and args.mode != 'inspect' and not args.resume_from and args.time_order == 'newest_first':
+                cache = TensorCache(args.cache_dir, max_bytes=args.cache_max_mb * 1024 * 1024)
+                history_data = cache.load_or_prepare(
+                    args.history_file, config['red'], config['blue'], load_history_file
+                )
+            else:
+                history_data = load_history_file(args.history_file)
+        else:
+            history_data = generate_sample_data(200)
+        if args.time_order == 'oldest_first':
+            history_data = sort_chronologically(history_data)
+    
+    wants_threads = args.high_throughput or args.mode == 'benchmark' or args.intra_threads or args.inter_threads
+    if args.mode in ('train', 'benchmark') and wants_threads:
+        configure_threads(args.intra_threads, args.inter_threads)
+    
+    if args.mode == 'benchmark':
+        results = benchmark_throughput(
+            history_data,
+            config,
+            args.sequence_length,
+            args.architecture,
+            candidates=[
+                {
+                    'name': 'default',
+                    'batch_size': args.batch_size,
+                    'learning_rate': args.learning_rate,
+                    'jit_compile': False
+                },
+                {
+                    'name': 'high_throughput',
+                    'batch_size': args.ht_batch_size,
+                    'learning_rate': scaled_learning_rate(args.learning_rate, args.ht_batch_size),
+                    'jit_compile': True
+                }
+            ],
+            epochs=args.compare_epochs,
+            validation_split=args.validation_split,
+            streaming=args.streaming
+        )
+        print_throughput(results)
+        report_path = Path(args.output_dir) / 'throughput_report.json'
+        report_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'lottery_type': args.lottery_type,
+                'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'cpu_count': os.cpu_count(),
+                'results': results
+            }, f, ensure_ascii=False, indent=2)
+        print(f"\n✅ 吞吐对比已保存到: {report_path}")
+        return
+    
+    if args.mode != 'train':
+        problems = []
+        if args.mode == 'inspect':
+            problems = inspect_history(
+                history_data, config['red'], config['blue'],
+                args.sequence_length, args.validation_split
+            )
+        elif args.mode == 'dry_run':
+            problems = dry_run(args, history_data, config)
+        
+        profiler.save(args.profile, args.chrome_trace)
+        print("\n" + "="*60)
+        for problem in problems:
+            print(f"❌ {problem}")
+        if not problems:
+            print(f"✅ {args.mode} 完成")
+        print(f"耗时 {time.perf_counter() - start:.2f}s, "
+              f"TensorFlow {'已' if 'tensorflow' in sys.modules else '未'}导入")
+        if problems:
+            sys.exit(1)
+        return
     
-    config = lottery_config.get(args.lottery_type, lottery_config['ssq'])
+    if args.resume_from:
+        model, result = resume_from_checkpoint(args, history_data, config, profiler)
+        if result['status'] == 'up_to_date':
+            print(f"\n✅ 没有新开奖数据（已训练到第 {result['resumed_from']} 期），无需继续训练")
+            profiler.save(args.profile, args.chrome_trace)
+            return
+        if result['status'] == 'resumed':
+            for key, metrics in result['metrics'].items():
+                print(f"  {key}: 旧窗口 loss {metrics['eval_loss_before']:.4f} -> {metrics['eval_loss_after']:.4f}"
+                      if metrics['eval_loss_before'] is not None else f"  {key}: 没有可评估的旧窗口")
+            with profiler.stage('save_models'):
+                model.save_models(args.output_dir)
+                model.save_training_meta(args.output_dir, history_data, mode='resume', extra={'resume': result})
+            with profiler.stage('convert_to_tflite'):
+                model.convert_to_tflite(args.output_dir)
+            profiler.save(args.profile, args.chrome_trace)
+            print("\n" + "="*60)
+            print(f"✅ 继续训练完成！新开奖 {result['new_draws']} 期")
+            print("="*60)
+            return
+        print(f"\n⚠️  无法继续训练（{result['reason']}），回退为完整训练")
+    
+    batch_size = args.batch_size
+    learning_rate = args.learning_rate
+    if args.high_throughput:
+        batch_size = args.ht_batch_size
+        learning_rate = scaled_learning_rate(args.learning_rate, batch_size)
     
     # 创建模型
     model = LotteryLSTMModel(
         num_red_balls=config['red'],
         num_blue_balls=config['blue'],
-        sequence_length=args.sequence_length
+        sequence_length=args.sequence_length,
+        architecture=args.architecture,
+        profiler=profiler,
+        learning_rate=learning_rate,
+        jit_compile=args.high_throughput or args.jit_compile,
+        time_order=args.time_order
     )
     
     # 训练模型
     model.train(
         history_data=history_data,
         epochs=args.epochs,
-        batch_size=args.batch_size,
-        validation_split=args.validation_split
+        batch_size=batch_size,
+        validation_split=args.validation_split,
+        streaming=args.streaming,
+        shuffle_buffer=args.shuffle_buffer
     )
     
     # 保存模型
-    model.save_models(args.output_dir)
-    model.convert_to_tflite(args.output_dir)
+    with profiler.stage('save_models'):
+        model.save_models(args.output_dir)
+        model.save_training_meta(args.output_dir, history_data)
+    with profiler.stage('convert_to_tflite'):
+        model.convert_to_tflite(args.output_dir)
+    
+    if args.tflite_variants:
+        variants = [item.strip() for item in args.tflite_variants.split(',') if item.strip()]
+        with profiler.stage('export_variants'):
+            model.export_variants(history_data, args.output_dir, variants)
+    
+    if args.distill:
+        model.distill(
+            history_data,
+            student_type=args.student_type,
+            units=args.student_units,
+            epochs=args.distill_epochs,
+            batch_size=batch_size,
+            validation_split=args.validation_split,
+            alpha=args.distill_alpha
+        )
+        with profiler.stage('export_students'):
+            model.export_students(history_data, args.output_dir, args.validation_split)
+    
+    step_report = None
+    if args.step_export:
+        with profiler.stage('export_step_models'):
+            step_report = model.export_step_models(
+                history_data, args.output_dir, args.validation_split, args.step_tolerance
+            )
+    
+    profiler.save(args.profile, args.chrome_trace)
     
     print("\n" + "="*60)
     print("✅ 训练完成！")
     print("="*60)
-    print("\n下一步：")
-    print("1. 将 .tflite 文件复制到 Android 项目:")
-    print(f"   cp {args.output_dir}/lottery_lstm_*.tflite ../app/src/main/assets/")
-    print("2. 在 Android 应用中使用 TensorFlow Lite 加载模型")
-    print("3. 运行预测！")
+    print_next_steps(args.output_dir, args.lottery_type, args.architecture, args.time_order)
+    
+    if step_report is not None and not step_report['passed']:
+        print(f"\n❌ 单步模型与窗口模型输出不一致（容差 {args.step_tolerance:g}），见 step_export_report.json")
+        sys.exit(1)
 
 
 if __name__ == '__main__':